@@ -1,9 +1,20 @@
 import streamlit as st
+import os
+import threading
 import time
-import pandas as pd
-import streamlit.components.v1 as components 
+import uuid
+import metrics
 from rl_agent import AdaptiveDifficultyAgent
-from tasks import CognitiveTaskGenerator
+from policy_store import SharedPolicyStore
+from user_policy import UserPolicyStore
+from replay import ReplayTrainer
+from frozen import FrozenPolicy
+from tasks import CognitiveTaskGenerator, task_id
+from templates import load_registry
+from seen import SeenStore
+from prefetch import TaskPrefetcher
+from events import USER_ID, AnswerEventLog, EventBuffer
+from styles import apply_custom_styles, icon, show_question_card, timer
 
 # Fallback for tutor if file missing
 try:
@@ -16,67 +27,107 @@ except ImportError:
 # 1. CONFIG & STYLES
 # ---------------------------------------------------------
 st.set_page_config(page_title="SwasthManas", page_icon="🧠", layout="centered")
+render_start = time.perf_counter()  # Opt-in metrics: see metrics.py
 
-st.markdown("""
-    <style>
-        h1, h2, h3, h4, h5, h6, p, span, div, caption, label { color: #333333 !important; }
-        .stSuccess, .stSuccess p { color: #065f46 !important; }
-        .stError, .stError p { color: #991b1b !important; }
-        .stInfo, .stInfo p { color: #1e40af !important; }
-        .stApp { background-color: #f8f9fa; }
-        .question-card {
-            background-color: white; padding: 40px; border-radius: 20px;
-            box-shadow: 0 4px 10px rgba(0,0,0,0.1); margin-bottom: 20px;
-            text-align: center; border: 2px solid #e0e0e0;
-        }
-        .question-text { font-size: 36px !important; font-weight: 700; color: #111827; }
-        div.stButton > button {
-            font-size: 24px !important; height: 100px !important; font-weight: 600 !important;
-            white-space: normal !important; background-color: #ffffff; color: #333333;
-            border: 3px solid #4F8BF9; border-radius: 12px;
-        }
-        div.stButton > button:hover {
-            background-color: #4F8BF9; color: white; border-color: #4F8BF9;
-        }
-    </style>
-""", unsafe_allow_html=True)
-
-def show_question_card(question_text):
-    st.markdown(f"""
-        <div class="question-card">
-            <div class="question-text">{question_text}</div>
-        </div>
-    """, unsafe_allow_html=True)
+apply_custom_styles()  # static/style.css, fetched once by the browser
+
+# FIXED 10 Seconds for all levels (the countdown runs in the browser)
+MEMORIZE_SECONDS = 10
+
+# --- CHANGE: Reduced game length to 5 ---
+GAME_LENGTH = 5
+
+# Categories with their titles and icons, from the task-template file (see templates.py)
+TEMPLATES = load_registry()
+
+# Every session and replica learns into one shared policy (seeded once from the old snapshot)
+POLICY_DB = "q_table.db"
+POLICY_REFRESH_SECONDS = 5
+
+# Each user's own copy-on-write policy; only the most recently active stay in RAM
+USER_POLICY_DB = "user_policies.db"
+USER_POLICY_CACHE = 10_000
+
+# Kiosk mode: serve a vetted snapshot (python frozen.py ...) read-only and never learn;
+# SWASTHMANAS_FROZEN_TEMPERATURE=t samples a softmax over its Q-values instead of the best action
+FROZEN_POLICY = os.environ.get("SWASTHMANAS_FROZEN_POLICY")
+FROZEN_TEMPERATURE = os.environ.get("SWASTHMANAS_FROZEN_TEMPERATURE")
+
+# Per-user no-repeat filters (fixed 16 KB each), kept across sessions
+SEEN_DIR = "seen"
+
+# Every answer as a typed event, appended to columnar .npy segments
+EVENTS_DIR = "events"
+
+def get_user_id():
+    # The id lives in the URL (?uid=...), so it survives page refreshes.
+    # Anything else there (an edited or mangled link) gets a fresh id.
+    uid = st.query_params.get("uid")
+    if not uid or not USER_ID.fullmatch(uid):
+        uid = uuid.uuid4().hex
+        st.query_params["uid"] = uid
+    return uid
 
 # ---------------------------------------------------------
-# 2. INIT SESSION STATE
+# 2. SHARED RESOURCES (once per process) & SESSION STATE
 # ---------------------------------------------------------
-if 'generator' not in st.session_state: st.session_state.generator = CognitiveTaskGenerator()
-if 'tutor' not in st.session_state: st.session_state.tutor = CognitiveTutor()
-if 'agent' not in st.session_state:
-    st.session_state.agent = AdaptiveDifficultyAgent()
-    st.session_state.agent.load_agent()
+@st.cache_resource
+def get_tutor():
+    # Read-only strategy data, shared by every session
+    return CognitiveTutor()
+
+@st.cache_resource
+def get_agent():
+    # One policy per process, following the shared store; the lock serialises
+    # choose_action/learn across the sessions sharing it
+    agent = AdaptiveDifficultyAgent()
+    agent.attach_store(SharedPolicyStore.for_file(
+        POLICY_DB, refresh_interval=POLICY_REFRESH_SECONDS, seed_from="q_table.qtab"))
+    return agent, threading.Lock()
+
+@st.cache_resource
+def get_frozen_policy():
+    # Compiled once per process; choose_action needs no lock
+    temperature = float(FROZEN_TEMPERATURE) if FROZEN_TEMPERATURE else None
+    return FrozenPolicy.load(FROZEN_POLICY, temperature=temperature)
+
+@st.cache_resource
+def get_trainer():
+    # Answers are replayed into the shared agent off the request thread
+    agent, agent_lock = get_agent()
+    return ReplayTrainer(agent, agent_lock)
+
+@st.cache_resource
+def get_user_policies():
+    # Per-user tables over the shared agent (use it under the agent lock)
+    agent, _ = get_agent()
+    return UserPolicyStore.for_file(USER_POLICY_DB, base=agent, capacity=USER_POLICY_CACHE)
+
+# Only small mutable per-user state lives in the session: the seeded task stream
+# (a whole round is drawn per level in one batch), levels and the seen-set
+if 'generator' not in st.session_state: st.session_state.generator = CognitiveTaskGenerator(batch_size=GAME_LENGTH)
+if 'prefetcher' not in st.session_state: st.session_state.prefetcher = TaskPrefetcher(st.session_state.generator)
 
 # Vars
 if 'page' not in st.session_state: st.session_state.page = "onboarding"
 if 'selected_category' not in st.session_state: st.session_state.selected_category = None
 if 'current_difficulty' not in st.session_state: st.session_state.current_difficulty = 1
-if 'history' not in st.session_state: st.session_state.history = []
+if 'events' not in st.session_state: st.session_state.events = EventBuffer()  # This round's answers
 if 'current_task' not in st.session_state: st.session_state.current_task = None
 if 'feedback_msg' not in st.session_state: st.session_state.feedback_msg = None
 if 'questions_played' not in st.session_state: st.session_state.questions_played = 0
 if 'hint_visible' not in st.session_state: st.session_state.hint_visible = False
-if 'played_ids' not in st.session_state: st.session_state.played_ids = []
+if 'user_id' not in st.session_state: st.session_state.user_id = get_user_id()
+if 'seen' not in st.session_state:
+    st.session_state.seen = SeenStore.for_file(SEEN_DIR).load(st.session_state.user_id)
 
 # Tracks individual user levels in THIS session only (RAM only)
 if 'user_levels' not in st.session_state:
-    st.session_state.user_levels = {"math": 1, "memory": 1}
+    st.session_state.user_levels = {category: 1 for category in TEMPLATES.categories()}
     
 # Track memory phase state
 if 'memory_shown' not in st.session_state: st.session_state.memory_shown = False
-
-# --- CHANGE: Reduced game length to 5 ---
-GAME_LENGTH = 5
+if 'memorize_started_at' not in st.session_state: st.session_state.memorize_started_at = None
 
 # ---------------------------------------------------------
 # 3. HELPER FUNCTIONS
@@ -86,25 +137,24 @@ def map_comfort_to_level(choice):
     elif choice == "Not sure": return 3
     else: return 2
 
-def save_onboarding(math_choice, mem_choice):
+def save_onboarding(choices):
     # Save to session state only (will reset on refresh)
-    st.session_state.user_levels["math"] = map_comfort_to_level(math_choice)
-    st.session_state.user_levels["memory"] = map_comfort_to_level(mem_choice)
+    for category, choice in choices.items():
+        st.session_state.user_levels[category] = map_comfort_to_level(choice)
     st.session_state.page = "menu"
     st.rerun()
 
 def start_game(category):
-    st.session_state.selected_category = category.lower()
+    st.session_state.selected_category = category
     st.session_state.page = "game"
     
     # Load from temporary session memory
-    start_level = st.session_state.user_levels.get(category.lower(), 1)
+    start_level = st.session_state.user_levels.get(category, 1)
     
     st.session_state.current_difficulty = start_level
     st.session_state.feedback_msg = None
     st.session_state.questions_played = 0
-    st.session_state.history = []
-    st.session_state.played_ids = []
+    st.session_state.events.clear()
     
     # Reset memory flag
     st.session_state.memory_shown = False
@@ -116,8 +166,10 @@ def return_to_menu():
     st.session_state.page = "menu"
     st.session_state.selected_category = None
     st.session_state.current_task = None
+    st.session_state.prefetcher.clear()
     st.rerun()
 
+@metrics.timed("generate_new_task_seconds")
 def generate_new_task():
     if st.session_state.questions_played >= GAME_LENGTH:
         # Update session memory before showing score
@@ -125,31 +177,46 @@ def generate_new_task():
             cat = st.session_state.selected_category
             st.session_state.user_levels[cat] = st.session_state.current_difficulty
             
+        st.session_state.prefetcher.clear()  # Nothing pre-built is kept between rounds
         st.session_state.page = "score"
         return
     
     diff = st.session_state.current_difficulty
     cat = st.session_state.selected_category
     
-    # Generate task
-    task = st.session_state.generator.generate_task(
-        category=cat, 
-        difficulty=diff,
-        exclude_questions=st.session_state.played_ids
-    )
+    # Take the task prefetched while the last question was on screen (built now on a miss)
+    prefetcher = st.session_state.prefetcher
+    task = prefetcher.take(cat, diff, exclude_questions=st.session_state.seen)
     
     st.session_state.current_task = task
-    # Use memorize content as ID if available, else question
-    t_id = task.get('memorize_content', task['question'])
-    st.session_state.played_ids.append(t_id)
+    st.session_state.seen.add(task_id(task))
+    SeenStore.for_file(SEEN_DIR).save(st.session_state.user_id, st.session_state.seen)
+    
+    # Prepare the -1/0/+1 candidates for the next question in the background
+    if st.session_state.questions_played + 1 < GAME_LENGTH:
+        prefetcher.prefetch(cat, diff, exclude_questions=st.session_state.seen)
     
     st.session_state.start_time = time.time()
+    st.session_state.memorize_started_at = None
     st.session_state.feedback_msg = None
     st.session_state.hint_visible = False
     
     # IMPORTANT: Reset memory flag for new task
     st.session_state.memory_shown = False
 
+def reveal_question():
+    # End of the memorize phase: the answer timer starts when the question is revealed
+    st.session_state.memory_shown = True
+    st.session_state.start_time = time.time()
+
+def show_memorize_countdown(sequence, seconds_left):
+    # Sequence + countdown live in the browser; at zero the component reports
+    # back and the script hides the sequence, so the server never waits on a timer.
+    # Returns True once this task's countdown has finished.
+    token = f"{st.session_state.memorize_started_at:.6f}"
+    return timer("countdown", seconds_left, token, content=sequence, key="memorize_timer") == token
+
+@metrics.timed("process_answer_seconds")
 def process_answer(selected_option):
     end_time = time.time()
     duration = end_time - st.session_state.start_time
@@ -176,29 +243,46 @@ def process_answer(selected_option):
     current_diff = st.session_state.current_difficulty
     current_cat = task['category']  
     
-    action = st.session_state.agent.choose_action(current_cat, current_diff, tier)
+    user_id = st.session_state.user_id
+    if FROZEN_POLICY:
+        action = get_frozen_policy().choose_action(current_cat, current_diff, tier)
+    else:
+        agent, agent_lock = get_agent()
+        user_policies = get_user_policies()
+        with agent_lock:
+            action = user_policies.choose_action(user_id, current_cat, current_diff, tier)
     next_diff = max(1, min(5, current_diff + action))
     
     # Notification
     if action == 1: st.toast("Level Up! ⬆️", icon="🔥")
     elif action == -1: st.toast("Easing down. ⬇️", icon="🛡️")
+    metrics.inc("answers_total", category=current_cat, correct=str(is_correct).lower())
+    if action != 0: metrics.inc("level_changes_total", direction="up" if action == 1 else "down")
 
     # 4. Learn
     state = (current_cat, current_diff, tier)
     next_state = (current_cat, next_diff, tier)
     
-    st.session_state.agent.learn(state, action, reward, next_state)
+    if not FROZEN_POLICY:
+        with agent_lock:
+            user_policies.learn(user_id, state, action, reward, next_state)
+        get_trainer().add(state, action, reward, next_state)  # The cohort policy new users start from
+        if metrics.ENABLED:
+            stats = user_policies.stats()
+            metrics.set_gauge("user_policies_cached", stats["cached"])
+            metrics.set_gauge("user_policy_rows", stats["rows"])
+            metrics.set_gauge("user_policy_bytes", stats["bytes"])
     
     st.session_state.current_difficulty = next_diff
     st.session_state.questions_played += 1
     
-    st.session_state.history.append({
-        "Question": task['question'], "Result": "✅" if is_correct else "❌",
-        "Diff": current_diff, "Time": f"{duration:.1f}s", "Hint": "Yes" if used_hint else "No"
-    })
+    row = st.session_state.events.append(
+        user_id, current_cat, current_diff, tier, action, reward,
+        is_correct, duration, used_hint)
+    AnswerEventLog.for_file(EVENTS_DIR).record(row)
     
     # 5. Tutor
-    txt, tip = st.session_state.tutor.generate_feedback(task, selected_option, is_correct)
+    txt, tip = get_tutor().generate_feedback(task, selected_option, is_correct)
     st.session_state.feedback_msg = {"text": txt, "tip": tip, "type": "success" if is_correct else "error"}
 
 # ---------------------------------------------------------
@@ -210,44 +294,42 @@ if st.session_state.page == "onboarding":
     c1, c2, c3 = st.columns([1,2,1])
     with c2:
         st.markdown("""
-            <div style="text-align: center;">
-                <h1 style="color: #1f2937; margin: 0;">SwasthManas</h1>
-                <p style="color: #666;">Let's customize your training plan.</p>
+            <div class="onboarding-header">
+                <h1>SwasthManas</h1>
+                <p>Let's customize your training plan.</p>
             </div>
         """, unsafe_allow_html=True)
         st.markdown("---")
         
-        st.markdown("##### 1. How comfortable are you with **Math**?")
-        math_choice = st.radio("Math Comfort", ["Comfortable", "Not sure", "Not comfortable"], key="m_conf", label_visibility="collapsed")
-        st.markdown("<br>", unsafe_allow_html=True)
-
-        st.markdown("##### 2. How comfortable are you with your **Memory**?")
-        mem_choice = st.radio("Memory Comfort", ["Comfortable", "Not sure", "Not comfortable"], key="mem_conf", label_visibility="collapsed")
-        st.markdown("<br>", unsafe_allow_html=True)
+        choices = {}
+        for number, category in enumerate(TEMPLATES.categories(), 1):
+            title = TEMPLATES.titles[category]
+            st.markdown(f"##### {number}. How comfortable are you with **{title}**?")
+            choices[category] = st.radio(f"{title} Comfort", ["Comfortable", "Not sure", "Not comfortable"],
+                                         key=f"{category}_conf", label_visibility="collapsed")
+            st.markdown("<br>", unsafe_allow_html=True)
         
         if st.button("Create My Plan 🚀", type="primary", use_container_width=True):
-            save_onboarding(math_choice, mem_choice)
+            save_onboarding(choices)
 
 # --- B. MENU ---
 elif st.session_state.page == "menu":
     c1, c2 = st.columns([1.2, 4])
-    with c1: st.markdown("""<svg width="100" height="100" viewBox="0 0 100 100" xmlns="http://www.w3.org/2000/svg"><circle cx="50" cy="50" r="45" fill="#E0F2FE" stroke="#4F8BF9" stroke-width="3"/><path d="M35 50 C 35 30, 65 30, 65 50" stroke="white" stroke-width="3" stroke-linecap="round"/><path d="M50 25 V 45" stroke="#4F8BF9" stroke-width="4"/><path d="M30 55 C 30 40, 70 40, 70 55 C 70 70, 30 70, 30 55" fill="#4F8BF9" opacity="0.8"/></svg>""", unsafe_allow_html=True)
+    with c1: icon("logo", size=100)
     with c2: 
-        st.markdown("<div style='padding-top:10px;'><h1 style='margin:0; font-size: 64px;'>SwasthManas</h1><h4 style='margin:0; font-weight:400;'>Daily Brain Training</h4></div>", unsafe_allow_html=True)
+        st.markdown("<div class='app-title'><h1>SwasthManas</h1><h4>Daily Brain Training</h4></div>", unsafe_allow_html=True)
     st.markdown("---")
     
-    math_lvl = st.session_state.user_levels["math"]
-    mem_lvl = st.session_state.user_levels["memory"]
+    categories = TEMPLATES.categories()
+    progress = " | ".join(f"{TEMPLATES.titles[category]} (Lvl {st.session_state.user_levels.get(category, 1)})"
+                          for category in categories)
+    st.info(f"**Your Progress:** {progress}")
     
-    st.info(f"**Your Progress:** Math (Lvl {math_lvl}) | Memory (Lvl {mem_lvl})")
-    
-    c1, c2 = st.columns(2)
-    with c1: 
-        st.image("https://img.icons8.com/fluency/96/calculator.png", width=80)
-        if st.button("Math", use_container_width=True): start_game("math")
-    with c2: 
-        st.image("https://img.icons8.com/fluency/96/brain.png", width=80)
-        if st.button("Memory", use_container_width=True): start_game("memory")
+    for column, category in zip(st.columns(len(categories)), categories):
+        with column:
+            icon(TEMPLATES.icons[category])
+            if st.button(TEMPLATES.titles[category], key=f"play_{category}", use_container_width=True):
+                start_game(category)
 
 # --- C. GAME ---
 elif st.session_state.page == "game":
@@ -257,22 +339,9 @@ elif st.session_state.page == "game":
     with c2: 
         st.progress(st.session_state.questions_played / GAME_LENGTH)
     
-    # --- VISUAL TIMER (JS Injection) ---
-    components.html(
-        """
-        <div style="font-family: sans-serif; font-size: 18px; color: #555; text-align: right; padding-right: 20px;">
-            ⏱️ <span id="time">0</span>s
-        </div>
-        <script>
-            var sec = 0;
-            setInterval(function(){
-                sec += 1;
-                document.getElementById("time").innerHTML = sec;
-            }, 1000);
-        </script>
-        """, 
-        height=40
-    )
+    # --- VISUAL TIMER (counts in the browser; stops once answered) ---
+    timer("elapsed", time.time() - st.session_state.start_time, f"{st.session_state.start_time:.6f}",
+          paused=st.session_state.feedback_msg is not None, key="game_timer")
 
     # 1. SHOW FEEDBACK IF ANSWERED
     if st.session_state.feedback_msg:
@@ -293,22 +362,17 @@ elif st.session_state.page == "game":
             
             # --- MEMORY SPECIFIC LOGIC ---
             if task.get('memorize_content') and not st.session_state.memory_shown:
-                # PHASE 1: MEMORIZE
-                st.info("🧠 **Memorize this sequence!**")
-                show_question_card(task['memorize_content']) 
+                # PHASE 1: MEMORIZE (server only records when it started)
+                if st.session_state.memorize_started_at is None:
+                    st.session_state.memorize_started_at = time.time()
+                elapsed = time.time() - st.session_state.memorize_started_at
+                seconds_left = max(0, MEMORIZE_SECONDS - int(elapsed))
                 
-                # FIXED 10 Seconds for all levels
-                memorize_time = 10
-                
-                # Display countdown
-                timer_text = st.empty()
-                for i in range(memorize_time, 0, -1):
-                    timer_text.markdown(f"<h3 style='text-align: center; color: #4F8BF9;'>⏳ Time remaining: {i}s</h3>", unsafe_allow_html=True)
-                    time.sleep(1)
-                
-                timer_text.empty()
-                st.session_state.memory_shown = True
-                st.rerun()
+                st.info("🧠 **Memorize this sequence!**")
+                finished = show_memorize_countdown(task['memorize_content'], seconds_left)
+                if st.button("I'm ready ➡️", type="primary", use_container_width=True) or finished:
+                    reveal_question()
+                    st.rerun()
 
             # --- STANDARD OR MEMORY RECALL PHASE ---
             else:
@@ -318,7 +382,10 @@ elif st.session_state.page == "game":
                 # Hint Logic
                 hint = task.get('hint', "No hint.")
                 if not st.session_state.hint_visible:
-                    if st.button("💡 Hint"): st.session_state.hint_visible = True; st.rerun()
+                    if st.button("💡 Hint"):
+                        st.session_state.hint_visible = True
+                        metrics.inc("hints_total")
+                        st.rerun()
                 else: st.info(f"**Hint:** {hint}")
                 
                 st.markdown("<br>", unsafe_allow_html=True)
@@ -335,19 +402,22 @@ elif st.session_state.page == "game":
 elif st.session_state.page == "score":
     st.title("🎉 Session Complete!")
     st.markdown("---")
-    df = pd.DataFrame(st.session_state.history)
-    acc = (len(df[df['Result']=="✅"]) / GAME_LENGTH) * 100
+    events = st.session_state.events
+    acc = (int(events["correct"].sum()) / GAME_LENGTH) * 100
     
-    st.markdown(f"<div style='background-color:#d1fae5;padding:20px;border-radius:15px;text-align:center;border:2px solid #10b981;'><h1 style='color:#047857;margin:0;'>{acc:.0f}% Accuracy</h1></div>", unsafe_allow_html=True)
+    st.markdown(f"<div class='score-banner'><h1>{acc:.0f}% Accuracy</h1></div>", unsafe_allow_html=True)
     
-    if not df.empty:
+    if len(events):
         st.markdown("### 📈 Difficulty Adaptation")
-        chart_data = df.reset_index()[['index', 'Diff']]
-        chart_data.columns = ['Question', 'Level']
+        # Plain columns: Streamlit only loads its dataframe stack when the chart is drawn
+        chart_data = {'Question': list(range(len(events))), 'Level': events["difficulty"].tolist()}
         st.line_chart(chart_data, x='Question', y='Level')
         
     c1, c2 = st.columns(2)
     with c1: 
         if st.button("🏠 Menu", type="primary", use_container_width=True): return_to_menu()
     with c2: 
-        if st.button("🔄 Play Again", use_container_width=True): start_game(st.session_state.selected_category)
\ No newline at end of file
+        if st.button("🔄 Play Again", use_container_width=True): start_game(st.session_state.selected_category)
+
+# Only reruns that reach the end are timed (st.rerun() cuts a run short)
+metrics.observe("page_render_seconds", time.perf_counter() - render_start, page=st.session_state.page)
@@ -0,0 +1,4 @@
+"""
+Runnable benchmarks and stress checks. Run from the repository root, e.g.
+`python -m benchmarks.stress_policy_store`.
+"""
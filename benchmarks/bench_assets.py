@@ -0,0 +1,185 @@
+"""
+Bytes the server sends per rerun, per page, and how soon the first element
+is out, for one scripted player.
+
+The app runs headless through AppTest. AppTest records the same ForwardMsg
+protos a browser would receive over the websocket, so this counts their
+serialized size per rerun. Messages of at least 10 kB that repeat count as
+a cache reference (Streamlit's message cache).
+
+The player goes through onboarding, the menu, one round of math and one of
+memory, and the score pages, as in a real visit. The report gives:
+- bytes per rerun for each page, and how many of them are HTML, CSS or
+  component payloads
+- remote URLs the page makes the browser fetch
+- the one-time size of the local static files (fetched once, then cached)
+- time to the first delta of the first run, a server-side proxy for first
+  paint
+
+Pass `--app` to measure another checkout, e.g. the previous commit:
+
+    git worktree add /tmp/before HEAD~1
+    python -m benchmarks.bench_assets --app /tmp/before/app.py
+    python -m benchmarks.bench_assets
+"""
+import argparse
+import atexit
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tomllib
+from collections import defaultdict
+
+from streamlit import config
+from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+from streamlit.testing.v1 import AppTest, local_script_runner
+
+CACHED_MESSAGE_SIZE = 10_000
+CACHE_REFERENCE_BYTES = 40
+GAME_LENGTH = 5
+# Namespaces and schema ids are not fetched by the browser
+REMOTE_URL = re.compile(r"https?://(?!www\.w3\.org/|vega\.github\.io/schema/)[^\s\"')\\]+")
+ASSET_ELEMENTS = ("html", "markdown", "iframe", "component_instance", "imgs")
+
+_runs = []          # The ForwardMsgs of each script run
+_first_delta = []   # perf_counter() of each run's first delta
+
+
+def _recording_parse(parse):
+    def wrapper(messages):
+        _runs.append(list(messages))
+        return parse(messages)
+    return wrapper
+
+
+def _recording_enqueue(enqueue):
+    def wrapper(self, msg):
+        if msg.WhichOneof("type") == "delta" and len(_first_delta) < len(_runs) + 1:
+            _first_delta.append(time.perf_counter())
+        return enqueue(self, msg)
+    return wrapper
+
+
+def measure_run(messages, seen_large):
+    total = 0
+    by_element = defaultdict(int)
+    urls = set()
+    for msg in messages:
+        data = msg.SerializeToString()
+        size = len(data)
+        if size >= CACHED_MESSAGE_SIZE:
+            if data in seen_large:
+                size = CACHE_REFERENCE_BYTES
+            seen_large.add(data)
+        total += size
+        if msg.WhichOneof("type") == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            element = msg.delta.new_element
+            kind = element.WhichOneof("type")
+            if kind in ASSET_ELEMENTS:
+                by_element[kind] += size
+            urls.update(REMOTE_URL.findall(str(element)))
+    return total, by_element, urls
+
+
+def play(app_path):
+    """
+    Yields (page, AppTest) after every rerun of one scripted visit.
+    """
+    at = AppTest.from_file(app_path, default_timeout=60)
+    yield "onboarding (first load)", at.run()
+    yield "menu", at.button[0].click().run()
+    for category in ("Math", "Memory"):
+        at = [b for b in at.button if b.label == category][0].click().run()
+        for _ in range(GAME_LENGTH):
+            ready = [b for b in at.button if b.label.startswith("I'm ready")]
+            if ready:
+                yield "game: memorize", at
+                at = ready[0].click().run()
+            yield "game: question", at
+            at = [b for b in at.button if b.key in ("o0", "o1", "o2", "o3")][0].click().run()
+            yield "game: feedback", at
+            at = [b for b in at.button if b.label.startswith("Next")][0].click().run()
+        yield "score", at
+        at = [b for b in at.button if "Menu" in b.label][0].click().run()
+        yield "menu", at
+
+
+def apply_app_config(app_dir):
+    """
+    AppTest only reads the config of the working directory, while
+    `streamlit run app.py` also reads the one next to the script.
+    """
+    path = os.path.join(app_dir, ".streamlit", "config.toml")
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        sections = tomllib.load(f)
+    for section, options in sections.items():
+        for name, value in options.items():
+            config.set_option(f"{section}.{name}", value)
+
+
+def static_bytes(app_dir):
+    total = 0
+    for folder in ("static", os.path.join("components", "timer")):
+        for root, _, files in os.walk(os.path.join(app_dir, folder)):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                       "app.py"))
+    args = parser.parse_args()
+    app_path = os.path.abspath(args.app)
+    app_dir = os.path.dirname(app_path)
+    sys.path.insert(0, app_dir)
+    apply_app_config(app_dir)
+
+    local_script_runner.parse_tree_from_messages = _recording_parse(local_script_runner.parse_tree_from_messages)
+    ForwardMsgQueue.enqueue = _recording_enqueue(ForwardMsgQueue.enqueue)
+
+    # The app's databases go to a scratch directory, removed at exit after
+    # its write-behind writers (registered later, so closed first) flush
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory, True)
+    os.chdir(directory)
+    start = time.perf_counter()
+    pages = []
+    for page, at in play(app_path):
+        assert not at.exception, at.exception
+        pages.append((page, len(_runs) - 1))
+        if len(pages) == 1:
+            first_delta = _first_delta[0] - start
+            first_run = time.perf_counter() - start
+
+    seen_large = set()
+    per_run = [measure_run(messages, seen_large) for messages in _runs]
+    stats = defaultdict(lambda: [0, 0, defaultdict(int), set()])  # runs, bytes, by element, urls
+    for page, index in pages:
+        total, by_element, urls = per_run[index]
+        entry = stats[page]
+        entry[0] += 1
+        entry[1] += total
+        for kind, size in by_element.items():
+            entry[2][kind] += size
+        entry[3].update(urls)
+
+    all_urls = set()
+    print(f"{app_path}: {len(_runs)} reruns, {sum(t for t, _, _ in per_run):,} bytes sent")
+    print(f"{'page':<24} {'runs':>5} {'bytes/rerun':>12} {'html/css/js/img':>16}  remote URLs")
+    for page, (runs, total, by_element, urls) in stats.items():
+        assets = sum(by_element.values())
+        all_urls |= urls
+        print(f"{page:<24} {runs:>5} {total / runs:>12,.0f} {assets / runs:>16,.0f}  {len(urls)}")
+    print(f"remote URLs referenced: {sorted(all_urls) or 'none'}")
+    print(f"local static files (fetched once, cached): {static_bytes(app_dir):,} bytes")
+    print(f"first load: first delta after {first_delta * 1e3:.0f} ms, full run {first_run * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
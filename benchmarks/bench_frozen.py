@@ -0,0 +1,106 @@
+"""
+Decisions per second of the frozen policy against the learning agent.
+
+The agent is trained by simulation (`--train` simulated answers) so its
+table is not just the instincts. It is frozen through a .qtab snapshot, as a
+deployment would be, and every state's frozen greedy action is checked
+against `choose_action` at epsilon = 0 before anything is timed.
+
+    agent              AdaptiveDifficultyAgent.choose_action (epsilon 0.2)
+    agent + lock       the same under a threading.Lock, as app.py serves it
+    frozen greedy      FrozenPolicy.choose_action
+    frozen soft        FrozenPolicy with a softmax temperature (CDF lookup)
+    *_batch            choose_actions over `--batch` encoded states
+
+    python -m benchmarks.bench_frozen --decisions 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from frozen import FrozenPolicy
+from rl_agent import DIFFICULTIES, TIERS, AdaptiveDifficultyAgent
+from simulation import simulate
+
+
+def check_identical(agent, policy):
+    epsilon, agent.epsilon = agent.epsilon, 0.0
+    mismatches = [state for state in agent.q_table
+                  if agent.choose_action(*state) != policy.choose_action(*state)]
+    agent.epsilon = epsilon
+    codes = np.arange(len(agent._flat))
+    batch_equal = np.array_equal(policy.choose_actions(codes), agent._action_values[agent._flat.argmax(axis=1)])
+    if mismatches or not batch_equal:
+        raise SystemExit(f"frozen policy differs from the greedy agent: {mismatches[:5]} batch_equal={batch_equal}")
+    print(f"identical greedy decisions for all {len(codes)} states")
+
+
+def rate(decide, states):
+    start = time.perf_counter()
+    for state in states:
+        decide(*state)
+    return len(states) / (time.perf_counter() - start)
+
+
+def batch_rate(decide, codes, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        decide(codes)
+    return len(codes) * repeats / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decisions", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--train", type=int, default=200_000, help="simulated answers before freezing")
+    parser.add_argument("--temperature", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    agent = AdaptiveDifficultyAgent(autosave=False, seed=args.seed)
+    for category in agent.categories:
+        simulate(1000, max(1, args.train // 1000 // len(agent.categories)), agent=agent, category=category, seed=args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "vetted.qtab")
+        agent.snapshot().write(filename)
+        start = time.perf_counter()
+        greedy = FrozenPolicy.load(filename)
+        print(f"loaded and compiled in {(time.perf_counter() - start) * 1e3:.2f} ms")
+        soft = FrozenPolicy.load(filename, temperature=args.temperature, seed=args.seed)
+    check_identical(agent, greedy)
+
+    random.seed(args.seed)
+    states = [(random.choice(agent.categories), random.choice(DIFFICULTIES), random.choice(TIERS))
+              for _ in range(args.decisions)]
+    lock = threading.Lock()
+
+    def locked(category, difficulty, tier):
+        with lock:
+            return agent.choose_action(category, difficulty, tier)
+
+    rng = np.random.default_rng(args.seed)
+    codes = rng.integers(0, len(agent._flat), args.batch)
+    repeats = max(1, args.decisions // args.batch)
+    results = [
+        ("agent", rate(agent.choose_action, states)),
+        ("agent + lock", rate(locked, states)),
+        ("frozen greedy", rate(greedy.choose_action, states)),
+        ("frozen soft", rate(soft.choose_action, states)),
+        ("agent_batch", batch_rate(agent.choose_actions, codes, repeats)),
+        ("frozen greedy_batch", batch_rate(greedy.choose_actions, codes, repeats)),
+        ("frozen soft_batch", batch_rate(soft.choose_actions, codes, repeats)),
+    ]
+    base = results[1][1]
+    for name, per_sec in results:
+        print(f"{name:>20}: {per_sec:>14,.0f} decisions/s  ({per_sec / base:.1f}x agent + lock)")
+
+
+if __name__ == "__main__":
+    main()
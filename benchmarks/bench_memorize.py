@@ -0,0 +1,115 @@
+"""
+Server cost of the memorize phase of the real app: no rerun may sleep.
+
+app.py runs headless through AppTest and plays --rounds rounds of the Memory
+game, one memorize -> reveal -> quiz cycle per question:
+
+- memorize: the run that shows the sequence and the components/timer countdown
+- reveal:   odd questions press "I'm ready"; even ones get the countdown
+            component's value (its token), as the browser sends it at zero
+- quiz:     the run that answers the question
+
+time.sleep is wrapped for the whole run, and any call from the app's own
+files fails the benchmark (the old memorize loop slept 10 s per question on
+the script thread). The report gives the server time of each kind of run.
+
+    python -m benchmarks.bench_memorize --rounds 4
+"""
+import argparse
+import atexit
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAME_LENGTH = 5
+
+_sleeps = []  # (file, line, seconds) of sleeps called from the app's files
+
+
+def _recording_sleep(sleep):
+    def wrapper(seconds):
+        caller = sys._getframe(1)
+        filename = caller.f_code.co_filename
+        if os.path.isabs(filename) and filename.startswith(APP_DIR + os.sep):
+            _sleeps.append((filename, caller.f_lineno, seconds))
+        return sleep(seconds)
+    return wrapper
+
+
+def timed(at, action=None):
+    start = time.perf_counter()
+    at = (action or at).run()
+    elapsed = time.perf_counter() - start
+    assert not at.exception, at.exception
+    return at, elapsed
+
+
+def button(at, predicate):
+    return next(b for b in at.button if predicate(b.label))
+
+
+def play(rounds):
+    runs = {"memorize": [], "reveal (I'm ready)": [], "reveal (countdown)": [], "quiz": []}
+    at, _ = timed(AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=60))
+    at, _ = timed(at, at.button[0].click())  # Create plan
+    for _ in range(rounds):
+        for question in range(GAME_LENGTH):
+            # The run that shows the sequence: Memory on the menu, then Next
+            shows = (lambda label: label.startswith("Next")) if question else (lambda label: label == "Memory")
+            at, elapsed = timed(at, button(at, shows).click())
+            ready = [b for b in at.button if b.label.startswith("I'm ready")]
+            assert ready, "no memorize phase on a Memory question"
+            runs["memorize"].append(elapsed)
+
+            if question % 2:
+                at, elapsed = timed(at, ready[0].click())
+                runs["reveal (I'm ready)"].append(elapsed)
+            else:
+                at.session_state["memorize_timer"] = f"{at.session_state['memorize_started_at']:.6f}"
+                at, elapsed = timed(at)
+                runs["reveal (countdown)"].append(elapsed)
+            options = [b for b in at.button if b.key in ("o0", "o1", "o2", "o3")]
+            assert options and not any(b.label.startswith("I'm ready") for b in at.button), \
+                "the reveal did not show the question"
+
+            at, elapsed = timed(at, options[0].click())
+            runs["quiz"].append(elapsed)
+        at, _ = timed(at, button(at, lambda label: label.startswith("Next")).click())  # Score page
+        at, _ = timed(at, button(at, lambda label: "Menu" in label).click())
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=4, help=f"Memory rounds of {GAME_LENGTH} questions")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    sys.path.insert(0, APP_DIR)
+    time.sleep = _recording_sleep(time.sleep)
+    # The app's databases go to a scratch directory, removed at exit after
+    # its write-behind writers (registered later, so closed first) flush
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory, True)
+    os.chdir(directory)
+
+    runs = play(args.rounds)
+    per_question = sum(sum(samples) for samples in runs.values()) / (args.rounds * GAME_LENGTH)
+    for name, samples in runs.items():
+        samples = sorted(samples)
+        print(f"{name:>20}: {len(samples):3d} runs  p50 {samples[len(samples) // 2] * 1e3:6.1f}ms  "
+              f"max {samples[-1] * 1e3:6.1f}ms")
+    print(f"server time per memory question: {per_question * 1e3:.1f}ms (the old loop held the thread 10 s)")
+    if _sleeps:
+        sys.exit(f"time.sleep called from the app: {_sleeps[:5]}")
+    print("no rerun slept")
+
+
+if __name__ == "__main__":
+    main()
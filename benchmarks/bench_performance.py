@@ -0,0 +1,151 @@
+"""
+Equivalence and speed of performance.py's vectorized functions against the
+scalar originals.
+
+"check" compares both versions on randomized inputs plus the edge cases
+(every correct/total pair up to 200 questions and for 2000 and 4000, where
+the rounding ties differ; tier boundaries, zero totals, NaN and negative
+times) and exits non-zero on the first mismatch. tests/test_performance.py
+asserts the same properties under pytest. "speed" scores `--rows` answers both ways, then times
+generate_session_reports on `--report-rows` answer rows.
+
+    python -m benchmarks.bench_performance --rows 1000000 --report-rows 10000000
+"""
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+
+from performance import (TIER_LABELS, calculate_accuracies, calculate_accuracy, compute_reward,
+                         compute_rewards, generate_session_report, generate_session_reports,
+                         get_performance_tier, get_performance_tiers)
+
+
+def same(a, b):
+    return a == b or (isinstance(a, float) and math.isnan(a) and math.isnan(b))
+
+
+def expect(name, scalar, vectorized, inputs):
+    for i, (want, got) in enumerate(zip(scalar, vectorized)):
+        if not same(want, got):
+            print(f"MISMATCH in {name} for {inputs[i]}: scalar {want!r}, vectorized {got!r}")
+            sys.exit(1)
+    print(f"  {name:<26} {len(scalar):>9} cases equal")
+
+
+def check(rng, n):
+    # 1. Accuracy: every pair up to 200 questions and for 2000 and 4000, plus random large ones
+    totals = np.array(list(range(201)) + [2000, 4000])
+    total = np.concatenate([np.repeat(totals, totals + 1), rng.integers(0, 10**6, n)])
+    correct = np.concatenate([np.concatenate([np.arange(t + 1) for t in totals]),
+                              (rng.random(n) * total[-n:]).astype(np.int64)])
+    pairs = list(zip(correct.tolist(), total.tolist()))
+    expect("calculate_accuracies", [calculate_accuracy(c, t) for c, t in pairs],
+           calculate_accuracies(correct, total).tolist(), pairs)
+
+    # 2. Tiers: boundaries, NaN and random accuracies
+    accuracy = np.concatenate([[59.9, 60.0, 60.1, 84.9, 85.0, 85.1, 0.0, 100.0, -1.0, np.nan],
+                               rng.uniform(0, 100, n), calculate_accuracies(correct, total)])
+    expect("get_performance_tiers", [get_performance_tier(a) for a in accuracy.tolist()],
+           TIER_LABELS[get_performance_tiers(accuracy)].tolist(), accuracy.tolist())
+
+    # 3. Rewards: zero totals, fast/slow/NaN/negative times, integer and float times
+    total = rng.integers(0, 20, n)
+    correct = (rng.random(n) * (total + 1)).astype(np.int64)
+    avg_time = rng.uniform(-5, 90, n)
+    avg_time[::7] = np.round(avg_time[::7])
+    avg_time[::101] = np.nan
+    difficulty = rng.integers(1, 6, n)
+    rows = list(zip(correct.tolist(), total.tolist(), avg_time.tolist(), difficulty.tolist()))
+    expect("compute_rewards", [compute_reward(*row) for row in rows],
+           compute_rewards(correct, total, avg_time, difficulty).tolist(), rows)
+
+    # 4. Bulk reports: each session at one level, compared with the per-session scalar report.
+    # Few users/sessions take the dense counting path, many take the sorting path
+    for n_users, n_sessions in ((50, 40), (n, n)):
+        user_ids = rng.integers(0, n_users, n)
+        sessions = rng.integers(0, n_sessions, n)
+        level = (user_ids * 31 + sessions * 17) % 5 + 1
+        check_reports(user_ids.astype("U8"), sessions, rng.random(n) < 0.7, rng.uniform(1, 60, n), level)
+
+
+def check_reports(users, sessions, answers, times, level):
+    reports = generate_session_reports(users, sessions, answers, times, level)
+
+    groups = {}
+    for key in zip(users.tolist(), sessions.tolist(), answers.tolist(), times.tolist(), level.tolist()):
+        groups.setdefault(key[:2], []).append(key[2:])
+    scalar, vectorized, keys = [], [], []
+    for i, key in enumerate(zip(reports["user"].tolist(), reports["session"].tolist())):
+        rows = groups.pop(key)
+        hits = sum(a for a, _, _ in rows)
+        avg = sum(t for _, t, _ in rows) / len(rows)
+        want = generate_session_report(hits, len(rows), avg, rows[0][2])
+        want["average_time"] = avg
+        scalar.append(want)
+        vectorized.append({
+            "total_questions": int(reports["total_questions"][i]),
+            "correct_answers": int(reports["correct_answers"][i]),
+            "accuracy_percent": float(reports["accuracy_percent"][i]),
+            "performance_tier": TIER_LABELS[reports["performance_tier"][i]],
+            "average_time": float(reports["average_time"][i]),
+            "difficulty_level": float(reports["difficulty_level"][i]),
+            "total_score": int(reports["total_score"][i]),
+        })
+        keys.append(key)
+    if groups:
+        print(f"MISMATCH in generate_session_reports: {len(groups)} sessions missing")
+        sys.exit(1)
+    expect("generate_session_reports", scalar, vectorized, keys)
+
+
+def speed(rng, n_rows, n_report_rows):
+    total = np.full(n_rows, 5)
+    correct = rng.integers(0, 6, n_rows)
+    avg_time = rng.uniform(5, 60, n_rows)
+    difficulty = rng.integers(1, 6, n_rows)
+
+    start = time.perf_counter()
+    for c, t, a, d in zip(correct.tolist(), total.tolist(), avg_time.tolist(), difficulty.tolist()):
+        get_performance_tier(calculate_accuracy(c, t))
+        compute_reward(c, t, a, d)
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_performance_tiers(calculate_accuracies(correct, total))
+    compute_rewards(correct, total, avg_time, difficulty)
+    vectorized = time.perf_counter() - start
+    print(f"  {n_rows} sessions scored: scalar loop {scalar:.2f}s, vectorized {vectorized:.3f}s "
+          f"({scalar / vectorized:.0f}x)")
+
+    users = rng.integers(0, 100_000, n_report_rows)
+    sessions = rng.integers(0, 200, n_report_rows)
+    answers = rng.random(n_report_rows) < 0.7
+    times = rng.uniform(1, 60, n_report_rows)
+    level = rng.integers(1, 6, n_report_rows)
+    start = time.perf_counter()
+    reports = generate_session_reports(users, sessions, answers, times, level)
+    elapsed = time.perf_counter() - start
+    print(f"  generate_session_reports: {n_report_rows} answer rows -> {len(reports['user'])} sessions "
+          f"in {elapsed:.2f}s ({n_report_rows / elapsed / 1e6:.1f}M rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=200_000, help="random cases per equivalence check")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--report-rows", type=int, default=10_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print("check:")
+    check(rng, args.cases)
+    print("speed:")
+    speed(rng, args.rows, args.report_rows)
+
+
+if __name__ == "__main__":
+    main()
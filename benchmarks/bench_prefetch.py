@@ -0,0 +1,111 @@
+"""
+Latency of the "Next" rerun with and without speculative prefetch, while
+many sessions share the process-wide prefetch pool.
+
+Each of --sessions threads plays --questions questions on its own generator,
+picking a random -1/0/+1 action after each answer and "thinking" for an
+exponential --think-ms between questions. All threads submit to the same
+prefetch.EXECUTOR as the app does, so with enough of them the pool has a
+queue. The timed step is what app.py does when Next is pressed: get the next
+task, then queue the candidates for the question after it.
+
+- sync:      build the task on the spot (the old generate_new_task)
+- wait:      the first prefetcher: always queues three candidates, and take()
+             waits for its candidate's future
+- prefetch:  TaskPrefetcher: take() builds inline when the candidate is still
+             queued, and prefetch() skips queueing while the pool is behind
+
+    python -m benchmarks.bench_prefetch --sessions 64 --think-ms 2
+"""
+import argparse
+import random
+import threading
+import time
+
+from prefetch import TaskPrefetcher
+from seen import SeenFilter
+from tasks import CognitiveTaskGenerator, task_id
+
+
+class WaitingPrefetcher(TaskPrefetcher):
+    """
+    The prefetcher as it was first written: always queues the candidates, and
+    take() waits on the future however long it is queued.
+    """
+
+    def prefetch(self, category, difficulty, exclude_questions=None):
+        candidates = {max(1, difficulty - 1), difficulty, min(5, difficulty + 1)}
+        self.pending = {(category, d): self.executor.submit(self._build, category, d, exclude_questions)
+                        for d in sorted(candidates)}
+
+    def take(self, category, difficulty, exclude_questions=None):
+        future = self.pending.pop((category, difficulty), None)
+        self.pending = {}
+        if future is not None:
+            return future.result()
+        return self._build(category, difficulty, exclude_questions)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6
+    return f"mean {sum(samples) / len(samples) * 1e6:8.1f}us  p50 {pick(0.5):8.1f}us  " \
+           f"p95 {pick(0.95):8.1f}us  p99 {pick(0.99):8.1f}us"
+
+
+def play(mode, seed, questions, think, samples, start):
+    rng = random.Random(seed)
+    generator = CognitiveTaskGenerator(seed=seed)
+    prefetcher = (WaitingPrefetcher if mode == "wait" else TaskPrefetcher)(generator)
+    seen = SeenFilter()
+    category = rng.choice(["math", "memory"])
+    difficulty = rng.randint(1, 5)
+    start.wait()
+    for question in range(questions):
+        # User presses Next: this rerun is the critical path being measured
+        began = time.perf_counter()
+        if mode == "sync":
+            task = generator.generate_task(category, difficulty, seen)
+        else:
+            task = prefetcher.take(category, difficulty, seen)
+        seen.add(task_id(task))
+        if mode != "sync":
+            prefetcher.prefetch(category, difficulty, seen)
+        elapsed = time.perf_counter() - began
+        if question > 0:  # The first task comes from start_game, not Next
+            samples.append(elapsed)
+
+        # Question on screen; other sessions keep the pool busy meanwhile
+        time.sleep(rng.expovariate(1 / think) if think else 0)
+        difficulty = max(1, min(5, difficulty + rng.choice([-1, 0, 1])))
+
+
+def run(mode, sessions, questions, think, seed):
+    samples = []
+    start = threading.Barrier(sessions)
+    threads = [threading.Thread(target=play, args=(mode, seed + s, questions, think, samples, start))
+               for s in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=64, help="concurrent sessions")
+    parser.add_argument("--questions", type=int, default=50, help="questions per session")
+    parser.add_argument("--think-ms", type=float, default=2.0, help="mean time a question is on screen")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run("prefetch", 4, 5, 0.0, args.seed)  # Warm up imports and the executor
+    print(f"{args.sessions} sessions sharing the prefetch pool, think time {args.think_ms} ms")
+    for mode in ("sync", "wait", "prefetch"):
+        samples = run(mode, args.sessions, args.questions, args.think_ms / 1000, args.seed)
+        print(f"{mode:>9}: {percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    main()
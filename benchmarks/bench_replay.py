@@ -0,0 +1,109 @@
+"""
+Sample efficiency of experience replay: how close the Q-table gets to its
+converged values after N real sessions, learning online (one `learn` per
+answer, as app.py used to) versus through ReplayTrainer.
+
+Virtual seniors (simulation.SeniorModel) play 5-question sessions one after
+another. The reference is the table `simulate` reaches after `--reference`
+simulated answers. After every `--every` sessions the error is the RMS
+difference from it over the states the reference learned (tiers Excellent
+and Needs Practice), and "agree" the share of those states whose greedy
+action matches. Training is synchronous (`train()` after each answer), so
+runs are reproducible.
+
+    python -m benchmarks.bench_replay --sessions 200 --seeds 5
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from performance import compute_rewards
+from replay import ReplayTrainer
+from rl_agent import AdaptiveDifficultyAgent
+from simulation import SeniorModel, simulate
+
+GAME_LENGTH = 5
+
+
+def reference_table(model, n_transitions, seed=0):
+    agent = AdaptiveDifficultyAgent(epsilon=0.2, autosave=False, seed=seed)
+    n_users = 1000
+    simulate(n_users, max(1, n_transitions // n_users), agent=agent, model=model, seed=seed)
+    tiers = [agent.tiers.index("Excellent"), agent.tiers.index("Needs Practice")]
+    return agent.q_values[0][:, tiers]
+
+
+def evaluate(agent, reference):
+    tiers = [agent.tiers.index("Excellent"), agent.tiers.index("Needs Practice")]
+    learned = agent.q_values[0][:, tiers]
+    error = float(np.sqrt(((learned - reference) ** 2).mean()))
+    decisive = np.ptp(reference, axis=-1) > 1.0  # Ties (e.g. all -50) have no right answer
+    agree = float((learned.argmax(-1) == reference.argmax(-1))[decisive].mean())
+    return error, agree
+
+
+def play(agent, model, rng, learn):
+    # One session from level 1, answering as the simulated senior would
+    difficulty = 1
+    for _ in range(GAME_LENGTH):
+        is_correct, time_taken = model.respond(np.array([difficulty]), np.zeros(1), rng)
+        tier = "Excellent" if is_correct[0] else "Needs Practice"
+        reward = float(compute_rewards(1, 1, time_taken, difficulty)[0]) if is_correct[0] else -10.0
+        action = agent.choose_action("math", difficulty, tier)
+        next_difficulty = max(1, min(5, difficulty + action))
+        learn(("math", difficulty, tier), action, reward, ("math", next_difficulty, tier))
+        difficulty = next_difficulty
+
+
+def run(mode, args, seed, reference):
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    model = SeniorModel()
+    agent = AdaptiveDifficultyAgent(epsilon=0.2, autosave=False, seed=seed)
+    if mode == "online":
+        learn = agent.learn
+    else:
+        trainer = ReplayTrainer(agent, minibatch=args.minibatch, replay_ratio=args.replay_ratio,
+                                train_interval=None, seed=seed)
+
+        def learn(*transition):
+            trainer._write_batch([transition])  # Synchronous: no writer-thread timing
+            trainer.train()
+
+    curve = []
+    for session in range(1, args.sessions + 1):
+        play(agent, model, rng, learn)
+        if session % args.every == 0:
+            curve.append(evaluate(agent, reference))
+    if mode != "online":
+        trainer.close()
+    return np.array(curve)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--every", type=int, default=20)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--reference", type=int, default=200_000, help="simulated answers behind the reference")
+    parser.add_argument("--minibatch", type=int, default=32)
+    parser.add_argument("--replay-ratio", type=float, default=8)
+    args = parser.parse_args()
+
+    reference = reference_table(SeniorModel(), args.reference)
+    results = {}
+    for mode in ("online", "replay"):
+        start = time.perf_counter()
+        results[mode] = np.mean([run(mode, args, seed, reference) for seed in range(args.seeds)], axis=0)
+        print(f"{mode:>6}: {time.perf_counter() - start:.1f}s")
+
+    print(f"{'sessions':>8}  {'online error':>12} {'agree':>6}  {'replay error':>12} {'agree':>6}")
+    for i, sessions in enumerate(range(args.every, args.sessions + 1, args.every)):
+        (o_error, o_agree), (r_error, r_agree) = results["online"][i], results["replay"][i]
+        print(f"{sessions:>8}  {o_error:>12.1f} {o_agree:>6.0%}  {r_error:>12.1f} {r_agree:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Per-session memory footprint and first-load latency of app.py's session state.
+
+"per-session" builds everything the app used to keep in st.session_state for
+each visitor: its own task generator, tutor, agent (attached to the shared
+policy store, which copies the whole policy view in) and no-repeat filter.
+"shared" builds the tutor and agent once, as the @st.cache_resource helpers
+do, and only the mutable per-user state per session: the seeded task stream,
+prefetcher, seen filter and levels. It also drops the round's leftover
+pre-built tasks when the round ends, as app.py now does.
+
+Each session has played one round per category. Memory is counted with
+tracemalloc.
+
+    python -m benchmarks.bench_session_memory --sessions 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from policy_store import SharedPolicyStore
+from prefetch import TaskPrefetcher
+from rl_agent import AdaptiveDifficultyAgent
+from seen import SeenFilter
+from tasks import CognitiveTaskGenerator, task_id
+from tutor import CognitiveTutor
+
+GAME_LENGTH = 5
+
+
+def play_round(session, agent, clear_after):
+    # One round per category, as a visitor would on first load
+    for category in ("math", "memory"):
+        difficulty = session["user_levels"][category]
+        for _ in range(GAME_LENGTH):
+            task = session["prefetcher"].take(category, difficulty, session["seen"])
+            session["seen"].add(task_id(task))
+            action = agent.choose_action(category, difficulty, "Excellent")
+            difficulty = max(1, min(5, difficulty + action))
+        session["user_levels"][category] = difficulty
+        if clear_after:
+            session["prefetcher"].clear()
+
+
+def new_session(store, shared_agent=None):
+    generator = CognitiveTaskGenerator(batch_size=GAME_LENGTH)
+    session = {
+        "generator": generator,
+        "prefetcher": TaskPrefetcher(generator),
+        "seen": SeenFilter(),
+        "user_levels": {"math": 1, "memory": 1},
+    }
+    if shared_agent is None:
+        session["tutor"] = CognitiveTutor()
+        session["agent"] = AdaptiveDifficultyAgent(autosave=False)
+        session["agent"].attach_store(store)
+    play_round(session, shared_agent or session["agent"], clear_after=shared_agent is not None)
+    return session
+
+
+def measure(n_sessions, store, shared):
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    shared_agent = None
+    if shared:
+        CognitiveTutor()
+        shared_agent = AdaptiveDifficultyAgent(autosave=False)
+        shared_agent.attach_store(store)
+    sessions = [new_session(store, shared_agent) for _ in range(n_sessions)]
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sessions
+    return current - base, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "q_table.db")
+        # A learned policy: every state/action has a row, as in a long-running deployment
+        writer = SharedPolicyStore(filename)
+        seed_agent = AdaptiveDifficultyAgent(autosave=False)
+        for state in seed_agent.q_table:
+            for action_idx in range(3):
+                writer.record_update(state, action_idx, 0.0, seed_agent.q_table[state])
+        writer.close()
+        store = SharedPolicyStore(filename)  # Loads the full table on open
+
+        measure(10, store, False)  # Warm up imports and the executor
+        for name, shared in (("per-session", False), ("shared", True)):
+            used, elapsed = measure(args.sessions, store, shared)
+            print(f"{name:>11}: {args.sessions} sessions  {used / 1024 / 1024:7.2f} MB total  "
+                  f"{used / args.sessions / 1024:6.1f} KB/session  "
+                  f"first load {elapsed / args.sessions * 1e3:6.2f} ms/session")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Cold-start cost of app.py: what its imports cost and how long a fresh
+process takes to render the onboarding page.
+
+"imports" runs `python -X importtime` over app.py's module-level imports (read
+from the file, so it follows the app) and lists the most expensive top-level
+packages. "first render" starts a fresh interpreter per repeat, runs app.py
+once through Streamlit's AppTest and reports the median wall-clock from process
+start to the rendered onboarding page. Heavy packages that are meant to load
+lazily must not be imported by then.
+
+The run fails (exit status 1) when the median exceeds `--max-render` or a
+deferred package was loaded, so it can gate CI.
+
+    python -m benchmarks.bench_startup --repeats 5 --max-render 1.5
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+# Only needed on later pages, so the onboarding render must not import them
+DEFERRED = ("pandas", "pyarrow", "matplotlib")
+
+RENDER = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60)
+at.run()
+assert not at.exception, at.exception
+print(json.dumps({{"done": time.time(), "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def app_imports():
+    tree = ast.parse(open(APP, encoding="utf-8").read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    return sorted(set(names))
+
+
+def import_breakdown(top):
+    """
+    Returns (total_seconds, [(package, seconds)]) for app.py's imports.
+    """
+    interpreter = {package for package, _ in _importtime("pass")}  # site, encodings, ...: paid by any script
+    per_package = {}
+    for package, seconds in _importtime("import " + ", ".join(app_imports())):
+        if package not in interpreter:
+            per_package[package] = per_package.get(package, 0.0) + seconds
+    ranked = sorted(per_package.items(), key=lambda item: -item[1])
+    return sum(per_package.values()), ranked[:top]
+
+
+def _importtime(code):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):  # Nested: already counted in its importer
+            continue
+        yield name.strip().split(".")[0], int(cumulative) / 1e6
+
+
+def first_render():
+    """
+    Seconds from interpreter start to the rendered onboarding page, plus any
+    deferred packages that were loaded on the way.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    with tempfile.TemporaryDirectory() as tmp:  # The app creates its data files in its cwd
+        start = time.time()
+        proc = subprocess.run([sys.executable, "-c", RENDER.format(app=APP, deferred=DEFERRED)],
+                              cwd=tmp, env=env, capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result["done"] - start, result["loaded"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="packages to list in the import breakdown")
+    parser.add_argument("--max-render", type=float, default=1.5,
+                        help="fail if the median first render takes longer (seconds)")
+    args = parser.parse_args()
+
+    total, ranked = import_breakdown(args.top)
+    print(f"imports: {total * 1e3:7.1f} ms for app.py's module-level imports")
+    for package, seconds in ranked:
+        print(f"  {package:<24} {seconds * 1e3:7.1f} ms")
+
+    samples, loaded = [], set()
+    for _ in range(args.repeats):
+        seconds, modules = first_render()
+        samples.append(seconds)
+        loaded.update(modules)
+    median = statistics.median(samples)
+    print(f"first render: median {median:.2f}s  min {min(samples):.2f}s  max {max(samples):.2f}s "
+          f"over {args.repeats} fresh processes (threshold {args.max_render:.2f}s)")
+
+    failed = False
+    if median > args.max_render:
+        print(f"REGRESSION: first render {median:.2f}s > {args.max_render:.2f}s")
+        failed = True
+    if loaded:
+        print(f"REGRESSION: deferred packages imported before onboarding rendered: {', '.join(sorted(loaded))}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Memory of a simulation run as it gets longer: the notebook's history list,
+simulate()'s per-step arrays, and the streaming pipeline.
+
+"history" appends one dict per answer (Session, Difficulty, Accuracy,
+Action, Reward) and builds a DataFrame for plotting, as the notebook does.
+"simulate" keeps per-step aggregates over all users in a SimulationResult.
+"stream" keeps only StreamingStats. All three run the same vectorized
+pipeline over `--users` users. The peak Python heap is counted with
+tracemalloc, and the history list is skipped once it would pass
+`--history-limit` answers.
+
+    python -m benchmarks.bench_stream --users 100 --steps 1000,10000,100000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from rl_agent import AdaptiveDifficultyAgent
+from simulation import SeniorModel, StreamingStats, agent_steps, senior_answers, simulate, stream
+
+
+def run_history(n_users, n_steps, seed):
+    rng = np.random.default_rng(seed)
+    agent = AdaptiveDifficultyAgent(autosave=False, seed=seed)
+    history = []
+    for batch in agent_steps(senior_answers(n_users, n_steps, SeniorModel(), rng), agent):
+        for difficulty, correct, action, reward in zip(batch.difficulty.tolist(), batch.is_correct.tolist(),
+                                                       batch.actions.tolist(), batch.reward.tolist()):
+            history.append({"Session": batch.step + 1, "Difficulty": difficulty, "Accuracy": 100 if correct else 0,
+                            "Action": action, "Reward": reward})
+    return pd.DataFrame(history)
+
+
+def run_simulate(n_users, n_steps, seed):
+    agent = AdaptiveDifficultyAgent(autosave=False, seed=seed)
+    return simulate(n_users, n_steps, agent=agent, seed=seed)
+
+
+def run_stream(n_users, n_steps, seed):
+    agent = AdaptiveDifficultyAgent(autosave=False, seed=seed)
+    stats = StreamingStats()
+    for _ in stream(n_users, n_steps, agent=agent, seed=seed, stats=stats):
+        pass
+    return stats
+
+
+def measure(run, n_users, n_steps, seed):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run(n_users, n_steps, seed)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--steps", default="1000,10000,100000", help="comma-separated run lengths")
+    parser.add_argument("--history-limit", type=int, default=2_000_000, help="max answers for the history list")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.users} users; peak traced heap and wall time per run")
+    print(f"{'steps':>10} {'answers':>12}  {'history':>20}  {'simulate':>20}  {'stream':>20}")
+    for n_steps in (int(s) for s in args.steps.split(",")):
+        cells = []
+        for name, run in (("history", run_history), ("simulate", run_simulate), ("stream", run_stream)):
+            if name == "history" and n_steps * args.users > args.history_limit:
+                cells.append("-")
+                continue
+            peak, elapsed = measure(run, args.users, n_steps, args.seed)
+            cells.append(f"{peak / 2**20:8.2f} MB {elapsed:7.2f}s")
+        print(f"{n_steps:>10,} {n_steps * args.users:>12,}  " + "  ".join(f"{c:>20}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Task rendering: the template registry against the if/elif generator it
+replaced, kept below as LegacyTaskGenerator.
+
+First checks that both produce identical tasks from the same seed for every
+(category, difficulty). Then times generate_tasks at several batch sizes;
+n=20 is what a session's buffer refill draws (tasks.TASK_BATCH).
+
+    python -m benchmarks.bench_tasks --repeat 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from tasks import CognitiveTaskGenerator
+from templates import LEVELS, ORDINALS
+
+ITEMS = ["Apples", "Milk", "Bread", "Tea", "Coffee", "Rice", "Oil", "Soap"]
+
+
+class LegacyTaskGenerator(CognitiveTaskGenerator):
+    """
+    The generator before templates: a hand-written branch per level.
+    """
+
+    def _generate_math_live(self, difficulty, n, rng):
+        """
+        Draws `n` math questions for one difficulty.
+        Returns (questions, answers[n], options[n, 4], hints); options[:, 0] is the answer.
+        """
+        if difficulty == 1:
+            # Simple Subtraction (Change)
+            item = rng.integers(0, len(ITEMS), n)
+            price = rng.integers(3, 16, n) * 5 # 15 to 75
+            note = rng.choice([100, 200], n)
+            correct = note - price
+            options = np.stack([correct, correct + 5, correct - 5, correct + 10], axis=1)
+            questions = [f"You buy {ITEMS[i]} for ₹{p}. You pay with a ₹{m} note. What is your change?"
+                         for i, p, m in zip(item.tolist(), price.tolist(), note.tolist())]
+            hints = ["Subtract the price from the note."] * n
+
+        elif difficulty == 2:
+            # Addition of two items (two different items: offset the second one)
+            i1 = rng.integers(0, len(ITEMS), n)
+            i2 = (i1 + rng.integers(1, len(ITEMS), n)) % len(ITEMS)
+            p1 = rng.integers(2, 11, n) * 10
+            p2 = rng.integers(2, 11, n) * 10
+            correct = p1 + p2
+            options = np.stack([correct, correct + 10, correct - 10, correct + 20], axis=1)
+            questions = [f"You buy {ITEMS[a]} for ₹{x} and {ITEMS[b]} for ₹{y}. What is the total?"
+                         for a, b, x, y in zip(i1.tolist(), i2.tolist(), p1.tolist(), p2.tolist())]
+            hints = ["Add the two prices together."] * n
+
+        elif difficulty == 3:
+            # Multiplication (Simple Quantity)
+            item = rng.integers(0, len(ITEMS), n)
+            price = rng.integers(15, 46, n)
+            qty = rng.integers(3, 7, n)
+            correct = price * qty
+            options = np.stack([correct, correct + price, correct - price, correct + 10], axis=1)
+            questions = [f"One pack of {ITEMS[i]} costs ₹{p}. How much do {q} packs cost?"
+                         for i, p, q in zip(item.tolist(), price.tolist(), qty.tolist())]
+            hints = [f"Try adding {p} to itself {q} times." for p, q in zip(price.tolist(), qty.tolist())]
+
+        elif difficulty == 4:
+            # Two-step: Multiply and Subtract
+            item = rng.integers(0, len(ITEMS), n)
+            price = rng.integers(60, 121, n)
+            qty = 2
+            note = 500
+            total = price * qty
+            correct = note - total
+            options = np.stack([correct, correct + 20, total, correct - 10], axis=1)
+            questions = [f"You buy {qty} units of {ITEMS[i]} at ₹{p} each. You pay with ₹{note}. What is the change?"
+                         for i, p in zip(item.tolist(), price.tolist())]
+            hints = [f"First find the total (2 x {p}), then subtract from {note}." for p in price.tolist()]
+
+        elif difficulty == 5:
+            # LEVEL 5: Hard Multi-step Logic
+            # Percentage Discount + Remaining Budget
+            item = "Premium Grains"
+            price = rng.integers(800, 1501, n)
+            discount_pct = rng.choice([10, 20, 25], n)
+            budget = 2000
+
+            discount_amt = price * discount_pct // 100
+            final_price = price - discount_amt
+            remaining = budget - final_price
+
+            correct = remaining
+            options = np.stack([remaining, final_price, remaining - 50, remaining + 100], axis=1)
+            questions = [f"A sack of {item} is priced at ₹{p}. There is a {d}% discount today. If you have ₹{budget}, how much money will you have LEFT after buying it?"
+                         for p, d in zip(price.tolist(), discount_pct.tolist())]
+            hints = [f"1. Find the discount. 2. Subtract it from {p}. 3. Subtract that from {budget}."
+                     for p in price.tolist()]
+
+        else:
+            raise ValueError(f"Unknown math difficulty: {difficulty}")
+
+        return questions, correct, options, hints
+
+    def _generate_memory_tasks(self, level, n, rng):
+        """
+        Draws `n` sequence-recall tasks for one level (level + 4 digits).
+        Returns (memorize_contents, questions, answers[n], options[n, 4]).
+        """
+        num_digits = level + 4
+        rows = np.arange(n)
+        digits = rng.integers(0, 10, (n, num_digits))
+        idx = rng.integers(0, num_digits, n)
+        answers = digits[rows, idx]
+
+        # Three distinct wrong digits per task: random sort keys, answer pushed last
+        keys = rng.random((n, 10))
+        keys[rows, answers] = 2.0
+        distractors = keys.argsort(axis=1)[:, :3]
+        options = np.concatenate([answers[:, None], distractors], axis=1)
+
+        contents = [" - ".join(map(str, row)) for row in digits.tolist()]
+        questions = [f"Which number was {ORDINALS[i + 1]}?" for i in idx.tolist()]
+        return contents, questions, answers, options
+
+    def generate_tasks(self, category, difficulty, n, rng=None):
+        rng = self.rng if rng is None else rng
+
+        if category == "math":
+            questions, answers, options, hints = self._generate_math_live(difficulty, n, rng)
+            contents = [None] * n
+            money = True
+        else:
+            contents, questions, answers, options = self._generate_memory_tasks(difficulty, n, rng)
+            hints = ["Try to group the numbers in your head."] * n
+            money = False
+
+        # Shuffle each row's options independently
+        order = rng.random(options.shape).argsort(axis=1)
+        options = np.take_along_axis(options, order, axis=1)
+
+        fmt = "₹{}".format if money else str
+        return [{
+            'question': questions[i],
+            'memorize_content': contents[i],
+            'options': [fmt(o) for o in opts],
+            'correct_answer': fmt(answer),
+            'category': category,
+            'difficulty': difficulty,
+            'hint': hints[i]
+        } for i, (answer, opts) in enumerate(zip(answers.tolist(), options.tolist()))]
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20,1000", help="comma-separated batch sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=200, help="batches per timing")
+    args = parser.parse_args()
+
+    # 1. Same seed, same tasks
+    for category in ("math", "memory"):
+        for level in LEVELS:
+            for seed in range(20):
+                new = CognitiveTaskGenerator(seed=seed).generate_tasks(category, level, 50)
+                old = LegacyTaskGenerator(seed=seed).generate_tasks(category, level, 50)
+                if new != old:
+                    raise SystemExit(f"{category} L{level} seed {seed}: registry output differs from legacy")
+    print("identical output for every category/level over 20 seeds")
+
+    # 2. Throughput
+    print(f"{'case':<18} {'legacy':>14} {'registry':>14} {'ratio':>7}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        rounds = max(1, args.rounds * 20 // n)
+        for category in ("math", "memory"):
+            for level in LEVELS:
+                timings = []
+                for cls in (LegacyTaskGenerator, CognitiveTaskGenerator):
+                    generator = cls(seed=0)
+                    run = lambda: [generator.generate_tasks(category, level, n) for _ in range(rounds)]
+                    timings.append(best_of(run, args.repeat) / (rounds * n))
+                legacy, registry = timings
+                print(f"{category + f' L{level} n={n}':<18} {n and 1 / legacy:>10,.0f}/s {1 / registry:>10,.0f}/s "
+                      f"{legacy / registry:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Strategy retrieval at scale: index build time and per-answer latency of the
+tutor with a corpus of `--strategies` entries.
+
+The corpus is the shipped data/strategies.json plus synthetic strategies
+drawn from its vocabulary, with random categories, levels and error tags.
+"cold" clears the query cache before every lookup; "warm" is the answer path
+in steady state, where questions differ only in their numbers and hit the
+cache.
+
+    python -m benchmarks.bench_tutor --strategies 5000
+"""
+import argparse
+import json
+import random
+import time
+
+from tasks import CognitiveTaskGenerator
+from tutor import STRATEGIES_FILE, CognitiveTutor, StrategyIndex, error_pattern, load_index, tokenize
+
+ERRORS = ("off_by_5", "off_by_10", "off_by_20", "off_by_50", "off_by_100", "miscounted_quantity",
+          "stopped_early", "wrong_position", "not_in_sequence")
+
+
+def corpus(n, rng):
+    with open(STRATEGIES_FILE, encoding="utf-8") as f:
+        strategies = json.load(f)
+    vocabulary = sorted({word for s in strategies for word in tokenize(s["text"])})
+    for i in range(len(strategies), n):
+        strategies.append({
+            "id": f"synthetic-{i}",
+            "category": rng.choice(["math", "memory"]),
+            "levels": rng.sample(range(1, 6), rng.randint(0, 2)),
+            "errors": rng.sample(ERRORS, rng.randint(0, 2)),
+            "text": " ".join(rng.choices(vocabulary, k=rng.randint(12, 30))),
+        })
+    return strategies
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6
+    return f"mean {sum(samples) / len(samples) * 1e6:7.1f}us  p50 {pick(0.5):7.1f}us  p99 {pick(0.99):7.1f}us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategies", type=int, default=5000)
+    parser.add_argument("--answers", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    strategies = corpus(args.strategies, rng)
+    start = time.perf_counter()
+    index = StrategyIndex(strategies)
+    print(f"index: {len(strategies)} strategies, {len(index.index)} terms, built in "
+          f"{(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    # Wrong answers to real tasks, as the answer path sees them
+    generator = CognitiveTaskGenerator(seed=args.seed)
+    answers = []
+    for _ in range(args.answers):
+        task = generator.generate_task(rng.choice(["math", "memory"]), rng.randint(1, 5))
+        wrong = rng.choice([o for o in task["options"] if o != task["correct_answer"]])
+        answers.append((task, wrong))
+
+    cold, warm = [], []
+    for task, wrong in answers:
+        index.search.cache_clear()
+        start = time.perf_counter()
+        index.search(task["category"], StrategyIndex.query_terms(task, error_pattern(task, wrong)))
+        cold.append(time.perf_counter() - start)
+
+    tutor = CognitiveTutor()
+    tutor.index = index
+    for task, wrong in answers:
+        start = time.perf_counter()
+        tutor.generate_feedback(task, wrong, False)
+        warm.append(time.perf_counter() - start)
+
+    print(f"  cold search:              {percentiles(cold)}")
+    print(f"  warm generate_feedback:   {percentiles(warm)}  (cache {index.search.cache_info()})")
+    load_index.cache_clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Per-user policies at scale: LRU hit rate, answer latency on hits and misses,
+and what eviction costs, with `--users` registered users on disk.
+
+The store is pre-populated with one table per registered user (a handful of
+owned rows each, as after a few sessions). Answers (choose_action + learn)
+then arrive for users drawn from a Zipf distribution, so a small set of
+regulars dominates the traffic the way active seniors do. Each `--capacity`
+is measured on a fresh store over the same request sequence.
+
+    python -m benchmarks.bench_user_policy --users 100000 --capacity 1000,10000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.load_test import rss_bytes
+from rl_agent import DIFFICULTIES, TIERS, AdaptiveDifficultyAgent
+from templates import load_registry
+from user_policy import UserPolicyStore, UserTable
+
+
+def populate(store, n_users, rng):
+    base = store.base
+    states = [base.decode_state(code) for code in range(base.q_values.size // store.n_actions)]
+    conn = store._connect()
+    conn.execute("BEGIN")
+    state_ids = store._number_states(conn, states)
+    for start in range(0, n_users, 10_000):
+        rows = []
+        for u in range(start, min(n_users, start + 10_000)):
+            picked = rng.choice(len(states), size=rng.integers(3, 12), replace=False)
+            table = UserTable({states[i]: base.get_q_values(states[i]) + rng.normal(0, 1, store.n_actions)
+                               for i in picked.tolist()})
+            rows.append((f"user-{u}", *table.to_blobs(state_ids)))
+        conn.executemany("INSERT OR REPLACE INTO user_q VALUES (?, ?, ?)", rows)
+    conn.execute("COMMIT")
+    conn.close()
+
+
+def percentiles(samples):
+    if not samples:
+        return "-"
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6
+    return f"p50 {pick(0.5):7.1f}us  p99 {pick(0.99):7.1f}us  (n={len(samples)})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000, help="registered users on disk")
+    parser.add_argument("--capacity", default="1000,10000", help="comma-separated LRU sizes to compare")
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--zipf", type=float, default=1.2, help="skew of user activity")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    base = AdaptiveDifficultyAgent(autosave=False, seed=args.seed)
+    random.seed(args.seed)
+    ranks = rng.zipf(args.zipf, args.requests * 2)
+    users = ranks[ranks <= args.users][:args.requests] - 1
+    categories = load_registry().categories()
+    requests = [(f"user-{u}", random.choice(categories), random.choice(DIFFICULTIES), random.choice(TIERS))
+                for u in users.tolist()]
+    print(f"{args.users} registered users, {len(requests)} answers from {len(set(users.tolist()))} distinct users")
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "user_policies.db")
+        store = UserPolicyStore(filename, base)
+        start = time.perf_counter()
+        populate(store, args.users, rng)
+        store.close()
+        print(f"  populated in {time.perf_counter() - start:.1f}s, "
+              f"{os.path.getsize(filename) / 2**20:.1f} MB on disk")
+
+        for capacity in (int(c) for c in args.capacity.split(",")):
+            rss_before = rss_bytes()
+            store = UserPolicyStore(filename, base, capacity=capacity)
+            hits, misses, evicting = [], [], []
+            start = time.perf_counter()
+            for user, category, level, tier in requests:
+                before = (store.misses, store.evictions)
+                t0 = time.perf_counter()
+                action = store.choose_action(user, category, level, tier)
+                next_level = max(1, min(5, level + action))
+                store.learn(user, (category, level, tier), action, 10, (category, next_level, tier))
+                elapsed = time.perf_counter() - t0
+                if store.misses == before[0]:
+                    hits.append(elapsed)
+                elif store.evictions == before[1]:
+                    misses.append(elapsed)
+                else:
+                    evicting.append(elapsed)
+            wall = time.perf_counter() - start
+            stats = store.stats()
+            rss = rss_bytes() - rss_before
+            flush_start = time.perf_counter()
+            store.close()
+            # Per answer: its second lookup (learn) always hits
+            print(f"capacity {capacity}: hit rate {len(hits) / len(requests):.1%}, {stats['evictions']} evictions, "
+                  f"{len(requests) / wall:,.0f} answers/s, RSS +{rss / 2**20:.1f} MB, "
+                  f"close {time.perf_counter() - flush_start:.2f}s")
+            print(f"  hit:              {percentiles(hits)}")
+            print(f"  miss (disk read): {percentiles(misses)}")
+            print(f"  miss + eviction:  {percentiles(evicting)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Headless load test: many simulated seniors playing app.py at once.
+
+Each user goes onboarding -> "Create My Plan" -> menu -> start a game -> five
+answers (pressing "I'm ready" on memory tasks, then an option, then Next) ->
+score page, driven through Streamlit's AppTest. No browser or network.
+
+AppTest keeps a process-global runtime and is not thread-safe, so a worker
+process interleaves its live sessions: it keeps `--concurrency` users mid-game
+and advances them round-robin, one interaction each. That is one app process
+serving that many sessions, sharing its cached resources, background writers
+and policy store, the way script threads would (they take turns on the GIL
+anyway). `--workers` runs several such processes on one shared data
+directory, like replicas behind a load balancer.
+
+Reported: latency percentiles per interaction type (server script time as
+seen by the driver, including AppTest's own overhead), throughput, and RSS
+growth per live session (an upper bound: it includes each AppTest's element
+tree).
+
+    python -m benchmarks.load_test --users 200 --concurrency 50 --workers 2
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import random
+import statistics
+import tempfile
+import time
+
+GAME_LENGTH = 5
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, not current
+
+
+def _button(at, prefix):
+    for button in at.button:
+        if button.label.startswith(prefix):
+            return button
+    return None
+
+
+def journey(category, rng):
+    """
+    One user's game as a sequence of (interaction, action) pairs; each action
+    is one rerun of the script.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    yield "load", at.run
+    yield "create_plan", lambda: _button(at, "Create My Plan").click().run()
+    yield "start_game", lambda: _button(at, category.title()).click().run()
+    for _ in range(GAME_LENGTH):
+        if _button(at, "I'm ready") is not None:
+            yield "reveal", lambda: _button(at, "I'm ready").click().run()
+        options = [b for b in at.button if b.key in ("o0", "o1", "o2", "o3")]
+        yield "answer", lambda: rng.choice(options).click().run()
+        yield "next", lambda: _button(at, "Next").click().run()
+    if not any("Session Complete" in title.value for title in at.title):
+        raise RuntimeError(f"expected the score page, got {[t.value for t in at.title]}")
+
+
+def worker(args):
+    worker_id, n_users, concurrency, seed, directory = args
+    os.chdir(directory)
+    logging.disable(logging.WARNING)  # Streamlit's "no ScriptRunContext" noise
+    rng = random.Random(seed + worker_id)
+
+    # Warm-up: imports, cached resources and writer threads exist before measuring
+    for _, action in journey("math", rng):
+        action()
+    baseline = rss_bytes()
+
+    latencies = {}
+    errors = []
+    peak = baseline
+    peak_live = 0
+    started = 0
+    live = []
+    start = time.perf_counter()
+    while live or started < n_users:
+        # Keep `concurrency` users in flight
+        while len(live) < concurrency and started < n_users:
+            live.append(journey(rng.choice(["math", "memory"]), rng))
+            started += 1
+        for game in list(live):
+            try:
+                step, action = next(game)
+                t0 = time.perf_counter()
+                action()
+                latencies.setdefault(step, []).append(time.perf_counter() - t0)
+            except StopIteration:
+                live.remove(game)
+            except Exception as exc:
+                errors.append(f"{type(exc).__name__}: {exc}")
+                live.remove(game)
+        rss = rss_bytes()
+        if rss > peak:
+            peak, peak_live = rss, len(live)
+    elapsed = time.perf_counter() - start
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed,
+            "rss_baseline": baseline, "rss_peak": peak, "peak_live": peak_live}
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="users per worker")
+    parser.add_argument("--concurrency", type=int, default=25, help="live sessions per worker")
+    parser.add_argument("--workers", type=int, default=1, help="app processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the summary as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:  # q_table.db, seen/, events/
+        jobs = [(w, args.users, args.concurrency, args.seed, directory) for w in range(args.workers)]
+        with mp.get_context("spawn").Pool(args.workers) as pool:
+            results = pool.map(worker, jobs)
+
+    latencies = {}
+    for result in results:
+        for step, samples in result["latencies"].items():
+            latencies.setdefault(step, []).extend(samples)
+    interactions = sum(len(s) for s in latencies.values())
+    wall = max(r["elapsed"] for r in results)
+    errors = [e for r in results for e in r["errors"]]
+    per_session = [(r["rss_peak"] - r["rss_baseline"]) / max(1, r["peak_live"]) for r in results]
+
+    summary = {"workers": args.workers, "users": args.users * args.workers,
+               "concurrency_per_worker": args.concurrency, "seconds": round(wall, 2),
+               "interactions_per_sec": round(interactions / wall, 1),
+               "games_per_min": round((args.users * args.workers - len(errors)) / wall * 60, 1),
+               "rss_per_session_kb": round(statistics.mean(per_session) / 1024, 1),
+               "errors": len(errors), "latency_ms": {}}
+    print(f"{summary['users']} users, {args.concurrency} live sessions x {args.workers} process(es), "
+          f"{wall:.1f}s wall")
+    print(f"  {'interaction':<12} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for step in ("load", "create_plan", "start_game", "reveal", "answer", "next"):
+        samples = sorted(latencies.get(step, []))
+        if not samples:
+            continue
+        row = {q: round(percentile(samples, p) * 1e3, 1) for q, p in (("p50", .5), ("p95", .95), ("p99", .99))}
+        row["max"] = round(samples[-1] * 1e3, 1)
+        summary["latency_ms"][step] = row
+        print(f"  {step:<12} {len(samples):>7} {row['p50']:>8} {row['p95']:>8} {row['p99']:>8} {row['max']:>8}")
+    print(f"  throughput: {summary['interactions_per_sec']} interactions/s, {summary['games_per_min']} games/min")
+    print(f"  RSS growth per live session: {summary['rss_per_session_kb']} KB")
+    if errors:
+        print(f"  {len(errors)} failed game(s), e.g. {errors[0]}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Microbenchmarks for the hot paths, with JSON baselines and a regression gate.
+
+Each case is timed with timeit: the loop count is auto-ranged to ~0.2s and
+the loop is repeated `--repeat` times. Results are nanoseconds per call
+(fastest repeat). Shared and frequency-scaled machines drift by tens of
+percent within seconds, so every repeat also times a fixed reference workload
+right before the case. The gate compares the median case/reference ratio
+("ref" units), which cancels out how fast the machine happens to be running.
+
+    python -m benchmarks.micro                                  # print results
+    python -m benchmarks.micro --save benchmarks/baselines/micro.json
+    python -m benchmarks.micro --compare benchmarks/baselines/micro.json --tolerance 0.25
+    python -m benchmarks.micro --filter agent.learn
+
+`--compare` exits with status 1 if any case is slower than its baseline by
+more than `--tolerance` (0.25 = 25%) on its first run and on each of
+`--retries` re-timings. The ref units absorb clock speed but not cache sizes
+or library builds, so baselines are machine-specific: before comparing on a
+new machine, regenerate the baseline there from the commit to compare against:
+
+    git checkout <base> && python -m benchmarks.micro --save /tmp/micro.json
+    git checkout - && python -m benchmarks.micro --compare /tmp/micro.json
+
+Everything runs offline.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+import performance
+from rl_agent import DIFFICULTIES, AdaptiveDifficultyAgent
+from tasks import TASK_BATCH, CognitiveTaskGenerator
+from tutor import CognitiveTutor
+
+# Q-table sizes as number of categories (x 5 levels x 4 tiers states each)
+TABLE_CATEGORIES = (2, 50, 500)
+
+# Rows per call for the vectorized scoring functions
+SCORING_ROWS = 10_000
+
+
+def _agent(n_categories, directory=None):
+    agent = AdaptiveDifficultyAgent(autosave=False, seed=0)
+    for i in range(len(agent.categories), n_categories):
+        agent.encode_state(f"category-{i}", 1, agent.tiers[0])
+    if directory is not None:
+        agent.filename = os.path.join(directory, f"q_table_{n_categories}.qtab")
+    return agent
+
+
+def cases(directory):
+    """
+    Yields (name, setup) pairs; setup() returns the zero-argument callable to time.
+    """
+    for category in ("math", "memory"):
+        for level in DIFFICULTIES:
+            def setup(category=category, level=level):
+                generator = CognitiveTaskGenerator(seed=0)
+                return lambda: generator.generate_task(category, level)
+            yield f"tasks.generate_task[{category},L{level}]", setup
+
+    for category in ("math", "memory"):
+        for level in DIFFICULTIES:
+            def setup(category=category, level=level):
+                generator = CognitiveTaskGenerator(seed=0)
+                template = generator.registry.template(category, level)
+                return lambda: template.render(TASK_BATCH, generator.rng)
+            yield f"templates.render[{category},L{level},n={TASK_BATCH}]", setup
+
+    for n_categories in TABLE_CATEGORIES:
+        states = n_categories * len(DIFFICULTIES) * 4
+
+        def setup(n_categories=n_categories):
+            agent = _agent(n_categories)
+            return lambda: agent.choose_action("math", 3, "Excellent")
+        yield f"agent.choose_action[states={states}]", setup
+
+        def setup(n_categories=n_categories):
+            agent = _agent(n_categories)
+            return lambda: agent.learn(("math", 3, "Excellent"), 1, 10, ("math", 4, "Excellent"))
+        yield f"agent.learn[states={states}]", setup
+
+        def setup(n_categories=n_categories):
+            agent = _agent(n_categories, directory)
+            return agent.save_agent
+        yield f"agent.save_agent[states={states}]", setup
+
+        def setup(n_categories=n_categories):
+            agent = _agent(n_categories, directory)
+            agent.save_agent()
+            filename = agent.filename
+            return lambda: agent.load_agent(filename)
+        yield f"agent.load_agent[states={states}]", setup
+
+    task = CognitiveTaskGenerator(seed=0).generate_task("math", 3)
+    tutor = CognitiveTutor()
+    yield "tutor.generate_feedback[correct]", lambda: lambda: tutor.generate_feedback(task, task["correct_answer"], True)
+    yield "tutor.generate_feedback[wrong]", lambda: lambda: tutor.generate_feedback(task, "₹0", False)
+
+    yield "performance.calculate_accuracy", lambda: lambda: performance.calculate_accuracy(4, 5)
+    yield "performance.get_performance_tier", lambda: lambda: performance.get_performance_tier(80.0)
+    yield "performance.compute_reward", lambda: lambda: performance.compute_reward(4, 5, 12.5, 3)
+    yield "performance.generate_session_report", lambda: lambda: performance.generate_session_report(4, 5, 12.5, 3)
+
+    rng = np.random.default_rng(0)
+    total = np.full(SCORING_ROWS, 5)
+    correct = rng.integers(0, 6, SCORING_ROWS)
+    avg_time = rng.uniform(5, 60, SCORING_ROWS)
+    difficulty = rng.integers(1, 6, SCORING_ROWS)
+    accuracy = performance.calculate_accuracies(correct, total)
+    users = rng.integers(0, SCORING_ROWS // 10, SCORING_ROWS)
+    sessions = rng.integers(0, 20, SCORING_ROWS)
+    n = f"n={SCORING_ROWS}"
+    yield f"performance.calculate_accuracies[{n}]", lambda: lambda: performance.calculate_accuracies(correct, total)
+    yield f"performance.get_performance_tiers[{n}]", lambda: lambda: performance.get_performance_tiers(accuracy)
+    yield f"performance.compute_rewards[{n}]", lambda: lambda: performance.compute_rewards(correct, total, avg_time, difficulty)
+    yield f"performance.generate_session_reports[{n}]", \
+        lambda: lambda: performance.generate_session_reports(users, sessions, correct > 2, avg_time, difficulty)
+
+
+def reference():
+    # Fixed mix of interpreter work and a small NumPy call, like the cases above
+    total = 0
+    for i in range(200):
+        total += i * i
+    return np.arange(64).sum() + total
+
+
+REFERENCE = timeit.Timer(reference)
+
+
+def measure(fn, repeat):
+    """
+    Returns (best ns per call, median ratio to the reference) over `repeat`
+    auto-ranged loops.
+    """
+    timer = timeit.Timer(fn)
+    number = max(1, timer.autorange()[0])
+    ref_number = max(1, REFERENCE.autorange()[0] // 4)
+    per_call, ratios = [], []
+    for _ in range(repeat):
+        ref = REFERENCE.timeit(ref_number) / ref_number
+        seconds = timer.timeit(number) / number
+        per_call.append(seconds * 1e9)
+        ratios.append(seconds / ref)
+    return min(per_call), statistics.median(ratios)
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints each case against the baseline; returns the names that regressed.
+    """
+    regressed = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name:<52} {result['ns']:>14,.0f} ns {result['ref']:>12,.3f} ref  (no baseline)")
+            continue
+        ratio = result["ref"] / base["ref"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"  {name:<52} {result['ns']:>14,.0f} ns {result['ref']:>12,.3f} ref  {ratio:5.2f}x baseline {flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="only run cases whose name matches this regex")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="JSON", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="fail on regressions against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--retries", type=int, default=2, help="times a flagged case is re-timed before it fails")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="micro-")
+    try:
+        # 1. Time every selected case
+        setups, results = {}, {}
+        for name, setup in cases(directory):
+            if args.filter and not re.search(args.filter, name):
+                continue
+            setups[name] = setup
+            best, ratio = measure(setup(), args.repeat)
+            results[name] = {"ns": round(best, 1), "ref": round(ratio, 4)}
+            if not args.compare:
+                print(f"  {name:<52} {best:>14,.0f} ns {ratio:>12,.3f} ref")
+
+        # 2. Compare, re-timing flagged cases: a real regression is slow on every
+        #    run, a noisy neighbour rarely is. Each case keeps its best run.
+        status = 0
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("environment") != environment():
+                print(f"note: baseline was recorded on {saved.get('environment')}; regenerate it on this "
+                      f"machine with --save {args.compare}")
+            regressed = compare(results, saved["results"], args.tolerance)
+            for _ in range(args.retries):
+                if not regressed:
+                    break
+                print(f"re-timing {len(regressed)} flagged case(s)")
+                for name in regressed:
+                    best, ratio = measure(setups[name](), args.repeat)
+                    results[name] = {"ns": min(results[name]["ns"], round(best, 1)),
+                                     "ref": min(results[name]["ref"], round(ratio, 4))}
+                regressed = compare({name: results[name] for name in regressed}, saved["results"], args.tolerance)
+            if regressed:
+                print(f"{len(regressed)} case(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressed)}",
+                      file=sys.stderr)
+                status = 1
+            else:
+                print(f"no regressions beyond {args.tolerance:.0%} ({len(results)} cases)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.save}")
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Multi-process stress check for SharedPolicyStore: several processes apply
+deltas to the same SQLite file concurrently, then every (state, action) is
+checked against the exact number of updates sent to it. Exits non-zero if
+any update was lost.
+
+    python -m benchmarks.stress_policy_store --procs 8 --updates 5000
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from policy_store import SharedPolicyStore
+from rl_agent import DIFFICULTIES, TIERS, AdaptiveDifficultyAgent
+from templates import load_registry
+
+STATES = [(c, d, t) for c in load_registry().categories() for d in DIFFICULTIES for t in TIERS]
+
+
+def worker(path, n_updates, seed):
+    rng = random.Random(seed)
+    # Tiny flush interval and batch size: many small, contending transactions
+    store = SharedPolicyStore(path, refresh_interval=0.01, flush_interval=0.001, batch_size=16)
+    agent = AdaptiveDifficultyAgent(autosave=False)
+    sent = Counter()
+    for _ in range(n_updates):
+        state = rng.choice(STATES)
+        action_idx = rng.randrange(3)
+        q_values = agent.get_q_values(state).copy()
+        q_values[action_idx] += 1.0
+        store.record_update(state, action_idx, 1.0, q_values)
+        sent[state + (action_idx,)] += 1
+        store.view()  # Readers run alongside the writers
+    store.flush()
+    store.close()
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--updates", type=int, default=5000, help="updates per process")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "policy.db")
+        start = time.perf_counter()
+        with mp.get_context("spawn").Pool(args.procs) as pool:
+            results = pool.starmap(worker, [(path, args.updates, seed) for seed in range(args.procs)])
+        elapsed = time.perf_counter() - start
+
+        sent = Counter()
+        for counts in results:
+            sent.update(counts)
+
+        store = SharedPolicyStore(path)
+        _, table = store.view()
+        store.close()
+
+    instincts = AdaptiveDifficultyAgent(autosave=False)
+    lost = 0
+    for (c, d, t, a), n in sent.items():
+        applied = table[(c, d, t)][a] - instincts.get_q_values((c, d, t))[a]
+        if round(applied) != n:
+            lost += n - round(applied)
+            print(f"MISMATCH {(c, d, t, a)}: sent {n}, applied {applied}")
+
+    total = sum(sent.values())
+    print(f"{args.procs} processes x {args.updates} updates = {total} deltas in {elapsed:.2f}s "
+          f"({total / elapsed:,.0f}/s); lost updates: {lost}")
+    return 1 if lost else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
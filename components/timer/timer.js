@@ -0,0 +1,77 @@
+// The app's one browser-side clock (styles.timer). Args from Python:
+//   mode     "elapsed" counts up from `seconds`, "countdown" counts down to 0
+//   seconds  the value at the time of the rerun
+//   token    restarts the clock when it changes; reruns with the same token
+//            leave the running clock alone, so only the args cross the wire
+//   content  text shown above a countdown (the sequence to memorize)
+//   paused   show `seconds` without counting
+// A countdown reaching 0 sends `token` back as the component value.
+// Speaks Streamlit's component protocol directly, so nothing is fetched from a CDN.
+
+var state = { token: null, seconds: 0, startedAt: 0, timer: null, done: false, args: {} };
+
+function send(type, data) {
+  data = data || {};
+  data.isStreamlitMessage = true;
+  data.type = type;
+  window.parent.postMessage(data, "*");
+}
+
+function resize() {
+  send("streamlit:setFrameHeight", { height: document.documentElement.scrollHeight });
+}
+
+function current() {
+  var passed = Math.floor((Date.now() - state.startedAt) / 1000);
+  if (state.args.mode === "countdown") return Math.max(state.seconds - passed, 0);
+  return state.seconds + passed;
+}
+
+function show(value) {
+  var clock = document.getElementById("clock");
+  if (state.args.mode === "countdown") {
+    clock.textContent = "⏳ Time remaining: " + value + "s";
+    if (value <= 0 && !state.done) {
+      state.done = true;
+      stop();
+      document.getElementById("content").textContent = "⏳ Time's up!";
+      send("streamlit:setComponentValue", { value: state.token, dataType: "json" });
+    }
+  } else {
+    clock.textContent = "⏱️ " + value + "s";
+  }
+}
+
+function stop() {
+  if (state.timer !== null) {
+    clearInterval(state.timer);
+    state.timer = null;
+  }
+}
+
+function render(args) {
+  state.args = args;
+  document.body.className = args.mode;
+  if (args.token !== state.token) {
+    state.token = args.token;
+    state.seconds = args.seconds;
+    state.startedAt = Date.now();
+    state.done = false;
+    var content = document.getElementById("content");
+    content.hidden = !args.content;
+    content.textContent = args.content || "";
+  }
+  if (args.paused) {
+    stop();
+    show(args.seconds);
+  } else if (state.timer === null && !state.done) {
+    state.timer = setInterval(function () { show(current()); }, 250);
+    show(current());
+  }
+  resize();
+}
+
+window.addEventListener("message", function (event) {
+  if (event.data && event.data.type === "streamlit:render") render(event.data.args);
+});
+send("streamlit:componentReady", { apiVersion: 1 });
@@ -0,0 +1,231 @@
+"""
+Typed answer events: a columnar buffer per session and an append-only log on disk.
+
+Every answer becomes one row of SCHEMA. Sessions keep their rows in an
+EventBuffer (one NumPy array per field) and hand them to the process-wide
+AnswerEventLog, which writes each batch as a segment directory of `.npy`
+files, one per column:
+
+    events/<segment>/{timestamp,user,category,...}.npy
+
+Segments are written under a temporary name and renamed into place, so
+readers only ever see complete ones, and are read back memory-mapped, so a
+query touches only the columns it asks for.
+
+    python events.py events --compact
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+
+import numpy as np
+
+import metrics
+from persistence import WriteBehindWriter
+from rl_agent import DIFFICULTIES, TIERS
+from templates import load_registry
+
+# Field name -> dtype. Categories are stored as their position in the
+# task-template registry (new ones are appended, so codes stay put), tiers
+# as their index in rl_agent.TIERS (-1 for anything else).
+SCHEMA = (
+    ("timestamp", "float64"),   # Unix seconds
+    ("user", "S32"),            # uuid4 hex from the ?uid= query parameter (see user_key)
+    ("category", "int8"),
+    ("difficulty", "int8"),
+    ("tier", "int8"),
+    ("action", "int8"),         # -1 / 0 / +1 chosen after this answer
+    ("reward", "float32"),
+    ("correct", "bool"),
+    ("duration_ms", "uint32"),
+    ("hint", "bool"),
+)
+FIELDS = tuple(name for name, _ in SCHEMA)
+
+# A user id as app.py hands them out (uuid4 hex), stored as is in `user`
+USER_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _code(values, value):
+    return values.index(value) if value in values else -1
+
+
+def user_key(user):
+    """
+    The `user` field for a user id: a 32-hex id as is, anything else as the
+    32-hex BLAKE2b digest of it, so no id is truncated into another's.
+    """
+    if USER_ID.fullmatch(user):
+        return user.encode("ascii")
+    return hashlib.blake2b(user.encode("utf-8"), digest_size=16).hexdigest().encode("ascii")
+
+
+class EventBuffer:
+    """
+    Answer events held column-wise in preallocated arrays (doubled when full).
+    `buffer["correct"]` returns the filled part of a column as an array view.
+    """
+
+    def __init__(self, capacity=8):
+        self.size = 0
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in SCHEMA}
+
+    def append(self, user, category, difficulty, tier, action, reward, correct, duration, hint,
+               timestamp=None):
+        """
+        Adds one answer (`duration` in seconds) and returns it as a row tuple in
+        SCHEMA order, ready for AnswerEventLog.record(). Raises ValueError for
+        a category the task-template registry does not define.
+        """
+        categories = load_registry().categories()
+        if category not in categories:
+            raise ValueError(f"Unknown category: {category!r}")
+        row = (time.time() if timestamp is None else timestamp, user_key(user),
+               categories.index(category), difficulty, _code(TIERS, tier), action,
+               reward, bool(correct), max(0, int(round(duration * 1000))), bool(hint))
+        if self.size == len(self.columns["timestamp"]):
+            for name, column in self.columns.items():
+                self.columns[name] = np.concatenate([column, np.zeros_like(column)])
+        for name, value in zip(FIELDS, row):
+            self.columns[name][self.size] = value
+        self.size += 1
+        return row
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.size = 0
+
+
+class AnswerEventLog(WriteBehindWriter):
+    """
+    Append-only, process-wide event log in `directory`. `record()` takes the
+    row tuples from EventBuffer.append(); each flushed batch becomes one segment.
+
+    Segments are named `<ns>-<pid>`: wall-clock nanoseconds, bumped so they
+    never repeat or go backwards within a process. Listing order is write
+    order per process, and wall-clock order across processes.
+    """
+
+    _last_ns = 0
+    _name_lock = threading.Lock()
+
+    def __init__(self, directory, flush_interval=5.0, batch_size=4096):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(flush_interval, batch_size)
+
+    def _write_batch(self, batch):
+        table = np.array(batch, dtype=list(SCHEMA))
+        self._write_segment({name: table[name] for name in FIELDS})
+
+    @classmethod
+    def _next_name(cls):
+        with cls._name_lock:
+            cls._last_ns = max(time.time_ns(), cls._last_ns + 1)  # The clock can step back
+            return f"{cls._last_ns:020d}-{os.getpid()}"
+
+    def _write_segment(self, columns, name=None):
+        name = name or self._next_name()
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        os.makedirs(tmp_path)
+        written = 0
+        for field in FIELDS:
+            with open(os.path.join(tmp_path, field + ".npy"), "wb") as f:
+                np.save(f, np.ascontiguousarray(columns[field]))
+                written += f.tell()
+        os.replace(tmp_path, os.path.join(self.directory, name))
+        metrics.inc("persistence_bytes_written_total", written, store="events")
+        return name
+
+    @staticmethod
+    def segments(directory):
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if not name.startswith("."))
+
+    @staticmethod
+    def scan(directory, columns=FIELDS):
+        """
+        Yields one {column: memory-mapped array} dict per segment, oldest first.
+        """
+        for segment in AnswerEventLog.segments(directory):
+            path = os.path.join(directory, segment)
+            yield {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in columns}
+
+    @staticmethod
+    def read(directory, columns=FIELDS):
+        """
+        Returns every event as {column: array}, concatenated across segments.
+        """
+        parts = list(AnswerEventLog.scan(directory, columns))
+        if not parts:
+            return {name: np.zeros(0, dtype=dict(SCHEMA)[name]) for name in columns}
+        return {name: np.concatenate([part[name] for part in parts]) for name in columns}
+
+    def compact(self):
+        """
+        Merges all segments written so far into one. Run it from one process
+        only; readers listing the directory mid-compaction may briefly see
+        the merged segment next to the ones it replaces.
+
+        The merged segment is named after the oldest one plus `-c<n>`, so it
+        sorts where its first events were written: before segments other
+        processes wrote meanwhile, not after them.
+        """
+        self.flush()
+        old = self.segments(self.directory)
+        if len(old) < 2:
+            return
+        merged = {name: [] for name in FIELDS}
+        for segment in old:
+            path = os.path.join(self.directory, segment)
+            for name in FIELDS:
+                merged[name].append(np.load(os.path.join(path, name + ".npy")))
+        base, _, generation = old[0].partition("-c")
+        self._write_segment({name: np.concatenate(parts) for name, parts in merged.items()},
+                            f"{base}-c{int(generation or 0) + 1}")
+        for segment in old:
+            shutil.rmtree(os.path.join(self.directory, segment))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise (and optionally compact) an answer-event log.")
+    parser.add_argument("directory", nargs="?", default="events")
+    parser.add_argument("--compact", action="store_true", help="merge all segments into one first")
+    args = parser.parse_args(argv)
+
+    if args.compact:
+        log = AnswerEventLog(args.directory)
+        log.compact()
+        log.close()
+
+    # Only the three columns the summary needs are mapped in
+    categories = load_registry().categories()
+    answers = 0
+    correct = np.zeros((len(categories), len(DIFFICULTIES)))
+    total = np.zeros((len(categories), len(DIFFICULTIES)))
+    for part in AnswerEventLog.scan(args.directory, ("category", "difficulty", "correct")):
+        known = (np.asarray(part["category"]) >= 0) & (np.asarray(part["category"]) < len(categories))
+        cells = (np.asarray(part["category"])[known], np.asarray(part["difficulty"])[known] - 1)
+        np.add.at(total, cells, 1)
+        np.add.at(correct, cells, np.asarray(part["correct"])[known])
+        answers += len(part["category"])
+
+    print(f"{answers} answers in {len(AnswerEventLog.segments(args.directory))} segments")
+    for c, category in enumerate(categories):
+        cells = " ".join(f"L{d}={correct[c, i] / total[c, i]:.0%} ({int(total[c, i])})" if total[c, i] else f"L{d}=-"
+                         for i, d in enumerate(DIFFICULTIES))
+        print(f"{category:>8} accuracy: {cells}")
+
+
+if __name__ == "__main__":
+    main()
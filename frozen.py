@@ -0,0 +1,207 @@
+"""
+Frozen, inference-only policy for kiosks and read-heavy deployments.
+
+A vetted Q-table snapshot is compiled once, at startup, into a static lookup:
+the greedy action per state (the learned policy with epsilon = 0), or, for a
+soft policy, each state's cumulative action distribution. Deciding is then
+one dict lookup (plus one random number for a soft policy): no exploration
+state, no table growth, no locking and no I/O.
+
+Freeze the live policy into a standalone snapshot for review:
+
+    python frozen.py q_table.qtab vetted.qtab     # snapshot + journal
+    python frozen.py q_table.db vetted.qtab       # the shared SQLite policy
+
+and serve it with SWASTHMANAS_FROZEN_POLICY=vetted.qtab (see app.py).
+"""
+import argparse
+import bisect
+import random
+
+import numpy as np
+
+from policy_store import SharedPolicyStore
+from rl_agent import DEFAULT_INSTINCT, DIFFICULTIES, INSTINCTS, AdaptiveDifficultyAgent
+from snapshot import Snapshot, SnapshotError
+
+
+class FrozenPolicy:
+    """
+    Read-only policy compiled from Q-values shaped [n_cat, 5, n_tier, n_actions].
+
+    With the defaults every decision is the greedy action, identical to
+    `AdaptiveDifficultyAgent.choose_action` at epsilon = 0 (ties go to the
+    first action, as `argmax` does). `temperature` makes it a softmax policy
+    over the Q-values and `epsilon` mixes in uniform exploration; both are
+    folded into a per-state cumulative distribution at construction.
+    States outside the table (a new category or tier) get the greedy action
+    of their tier's instinct, as a fresh agent row would.
+    """
+
+    def __init__(self, q_values, categories, tiers, actions, instincts=None, default_instinct=None,
+                 temperature=None, epsilon=0.0, seed=None):
+        q_values = np.asarray(q_values, dtype=np.float64)
+        if q_values.shape != (len(categories), len(DIFFICULTIES), len(tiers), len(actions)):
+            raise ValueError(f"Q-values shaped {q_values.shape} do not match the layout")
+        if not 0.0 <= epsilon <= 1.0:
+            raise ValueError(f"epsilon must be in [0, 1], got {epsilon}")
+        if temperature is not None and temperature <= 0:
+            raise ValueError(f"temperature must be positive, got {temperature}")
+        self.categories = list(categories)
+        self.tiers = list(tiers)
+        self.actions = list(actions)
+        self.temperature = temperature
+        self.epsilon = epsilon
+        self.soft = temperature is not None or epsilon > 0
+        self.rng = np.random.default_rng(seed)  # For the batch API
+        self._random = random.Random(seed).random
+        self._action_values = np.array(self.actions)
+        instincts = INSTINCTS if instincts is None else instincts
+        default_instinct = DEFAULT_INSTINCT if default_instinct is None else default_instinct
+
+        # 1. Greedy action index and cumulative distribution per flat state code
+        self.greedy, self.cdf = self._compile(q_values.reshape(-1, len(self.actions)))
+
+        # 2. Per-decision lookups keyed like choose_action's arguments
+        self._greedy_lookup = {}
+        self._cdf_lookup = {}
+        for code, state in enumerate(self._states()):
+            self._greedy_lookup[state] = self.actions[self.greedy[code]]
+            self._cdf_lookup[state] = tuple(self.cdf[code, :-1].tolist())
+
+        # 3. Unknown states, per tier: what a fresh instinct row would choose
+        fallback_tiers = list(instincts) + [None]
+        rows = np.array([instincts[tier] for tier in fallback_tiers[:-1]] + [default_instinct], dtype=np.float64)
+        greedy, cdf = self._compile(rows)
+        self._fallback = {tier: (self.actions[greedy[i]], tuple(cdf[i, :-1].tolist()))
+                          for i, tier in enumerate(fallback_tiers)}
+
+    def _compile(self, flat):
+        greedy = flat.argmax(axis=1).astype(np.int8)
+        if self.temperature is not None:
+            probs = np.exp((flat - flat.max(axis=1, keepdims=True)) / self.temperature)
+            probs /= probs.sum(axis=1, keepdims=True)
+        else:
+            probs = np.eye(len(self.actions))[greedy]
+        probs = (1 - self.epsilon) * probs + self.epsilon / len(self.actions)
+        cdf = np.cumsum(probs, axis=1)
+        cdf[:, -1] = 1.0  # No gap at the top from rounding
+        greedy.setflags(write=False)
+        cdf.setflags(write=False)
+        return greedy, cdf
+
+    def _states(self):
+        for category in self.categories:
+            for difficulty in DIFFICULTIES:
+                for tier in self.tiers:
+                    yield (category, difficulty, tier)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, **options):
+        hyperparameters = snapshot.hyperparameters or {}
+        instincts = hyperparameters.get("instincts", INSTINCTS)
+        default_instinct = hyperparameters.get("default_instinct", DEFAULT_INSTINCT)
+        q_values = np.array(snapshot.values, dtype=np.float64)
+        if not snapshot.complete:
+            # States the snapshot does not hold are at their instincts
+            for t, tier in enumerate(snapshot.tiers):
+                rows = q_values[:, :, t]
+                rows[np.isnan(rows).any(axis=-1)] = instincts.get(tier, default_instinct)
+        return cls(q_values, snapshot.categories, snapshot.tiers, snapshot.actions,
+                   instincts=instincts, default_instinct=default_instinct, **options)
+
+    @classmethod
+    def from_agent(cls, agent, **options):
+        return cls(agent.q_values, agent.categories, agent.tiers, agent.actions,
+                   instincts=agent.instincts, default_instinct=agent.default_instinct, **options)
+
+    @classmethod
+    def load(cls, filename, **options):
+        """
+        Compiles a .qtab snapshot, opened read-only. Raises SnapshotError if
+        it is unreadable or encodes other difficulty levels.
+        """
+        snapshot = Snapshot.read(filename, mode="r")
+        if snapshot.difficulties != list(DIFFICULTIES):
+            raise SnapshotError(f"snapshot encodes difficulties {snapshot.difficulties}, "
+                                f"expected {list(DIFFICULTIES)}")
+        return cls.from_snapshot(snapshot, **options)
+
+    def _unknown_state(self, category, difficulty, tier):
+        if not 1 <= difficulty <= len(DIFFICULTIES):
+            raise ValueError(f"difficulty must be 1-{len(DIFFICULTIES)}, got {difficulty}")
+        return self._fallback.get(tier, self._fallback[None])
+
+    def choose_action(self, category, difficulty, tier):
+        """
+        The action (-1/0/+1) for one state; same arguments as the agent's.
+        """
+        state = (category, difficulty, tier)
+        if not self.soft:
+            action = self._greedy_lookup.get(state)
+            return action if action is not None else self._unknown_state(*state)[0]
+        cdf = self._cdf_lookup.get(state)
+        if cdf is None:
+            cdf = self._unknown_state(*state)[1]
+        return self.actions[bisect.bisect_right(cdf, self._random())]
+
+    def choose_actions(self, states):
+        """
+        Actions for an array of encoded states (the agent's `encode_codes`).
+        """
+        states = np.asarray(states)
+        if not self.soft:
+            return self._action_values[self.greedy[states]]
+        draws = self.rng.random(states.shape)
+        action_idx = (draws[..., None] >= self.cdf[states, :-1]).sum(axis=-1)
+        return self._action_values[action_idx]
+
+    def encode_codes(self, category_idx, difficulty, tier_idx):
+        return (category_idx * len(DIFFICULTIES) + (difficulty - 1)) * len(self.tiers) + tier_idx
+
+    def table(self):
+        """
+        {(category, difficulty, tier): greedy action} for review.
+        """
+        return dict(self._greedy_lookup)
+
+
+def freeze(source, destination):
+    """
+    Writes the current policy at `source` (a .qtab snapshot with its journal,
+    or a shared-policy .db) to `destination` as one complete snapshot.
+    Returns the agent it was read into.
+    """
+    agent = AdaptiveDifficultyAgent(autosave=False)
+    if source.endswith(".db"):
+        store = SharedPolicyStore(source)
+        try:
+            agent.attach_store(store)
+        finally:
+            store.close()
+        agent.store = agent.shared = None
+    else:
+        agent.load_agent(source)
+    agent.snapshot().write(destination)
+    return agent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="q_table.qtab (plus its journal) or the shared q_table.db")
+    parser.add_argument("destination", help="the frozen .qtab to write")
+    args = parser.parse_args(argv)
+
+    freeze(args.source, args.destination)
+    policy = FrozenPolicy.load(args.destination)
+    names = {-1: "down", 0: "stay", 1: "up"}
+    print(f"Froze {args.source} into {args.destination}; greedy action per state:")
+    for category in policy.categories:
+        print(f"  {category}")
+        for tier in policy.tiers:
+            row = " ".join(f"L{d}:{names[policy.choose_action(category, d, tier)]:<4}" for d in DIFFICULTIES)
+            print(f"    {tier:<15} {row}".rstrip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Opt-in hot-path metrics in Prometheus text format.
+
+Off unless one of these is set when the process starts:
+
+    SWASTHMANAS_METRICS_FILE=/var/lib/node_exporter/swasthmanas.prom   # rewritten every few seconds
+    SWASTHMANAS_METRICS_PORT=9464                                      # GET http://127.0.0.1:9464/metrics
+
+When off, `timed` returns the function unchanged and `inc`/`observe`/`set_gauge`
+return immediately, so instrumented code pays (almost) nothing. Metrics are
+per process; give each replica its own file or port.
+"""
+import atexit
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "swasthmanas_"
+METRICS_FILE = os.environ.get("SWASTHMANAS_METRICS_FILE")
+METRICS_PORT = os.environ.get("SWASTHMANAS_METRICS_PORT")
+ENABLED = bool(METRICS_FILE or METRICS_PORT)
+FILE_INTERVAL = 5.0  # Seconds between rewrites of METRICS_FILE
+
+# Latency buckets in seconds (upper bounds; +Inf is implied)
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HELP = {
+    "generate_new_task_seconds": "Time to serve the next task.",
+    "process_answer_seconds": "Time to score an answer, update the policy and build feedback.",
+    "agent_choose_seconds": "Time for a user's policy to pick the next action.",
+    "agent_learn_seconds": "Time of one Q-learning update.",
+    "agent_save_seconds": "Time of a full Q-table snapshot.",
+    "policy_store_write_seconds": "Time of one SQLite transaction of a policy store's writer.",
+    "replay_train_seconds": "Time of one background replay training pass.",
+    "replay_transitions_total": "Answers added to the replay buffer.",
+    "page_render_seconds": "Script run time of a completed page render.",
+    "answers_total": "Answers submitted.",
+    "level_changes_total": "Difficulty changes chosen by the agent.",
+    "hints_total": "Hints revealed.",
+    "persistence_bytes_written_total": "Bytes written by the background persistence writers "
+                                       "(row payload for the SQLite stores).",
+    "user_policies_cached": "Per-user Q-tables in the LRU.",
+    "user_policy_rows": "States owned by the per-user Q-tables in the LRU.",
+    "user_policy_bytes": "Memory used by the Q-values of the per-user tables in the LRU.",
+}
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """
+    Counters, gauges and histograms keyed by (name, labels).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, value, labels):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, labels):
+        with self.lock:
+            self.gauges[(name, labels)] = value
+
+    def observe(self, name, value, labels):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self):
+        """
+        Returns everything recorded so far in Prometheus text exposition format.
+        """
+        lines = []
+        with self.lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in series}):
+                    _header(lines, name, kind)
+                    for (n, labels), value in sorted(series.items()):
+                        if n == name:
+                            lines.append(f"{PREFIX}{name}{_labels(labels)} {_number(value)}")
+            for name in sorted({name for name, _ in self.histograms}):
+                _header(lines, name, "histogram")
+                for (n, labels), histogram in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+                    lines.append(f"{PREFIX}{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _header(lines, name, kind):
+    lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+    lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry() if ENABLED else None
+
+
+# ---------------------------------------------------------
+# Recording API (no-ops when disabled)
+# ---------------------------------------------------------
+def inc(name, value=1, **labels):
+    if REGISTRY is not None:
+        REGISTRY.inc(name, value, tuple(sorted(labels.items())))
+
+
+def set_gauge(name, value, **labels):
+    if REGISTRY is not None:
+        REGISTRY.set_gauge(name, value, tuple(sorted(labels.items())))
+
+
+def observe(name, seconds, **labels):
+    if REGISTRY is not None:
+        REGISTRY.observe(name, seconds, tuple(sorted(labels.items())))
+
+
+def timed(name):
+    """
+    Decorator recording the function's latency into histogram `name`.
+    Returns the function itself when metrics are disabled.
+    """
+    def decorate(func):
+        if REGISTRY is None:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start, ())
+        return wrapper
+    return decorate
+
+
+class _Track:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start, self.labels)
+
+
+_NOOP = nullcontext()
+
+
+def track(name, **labels):
+    """
+    Context manager version of `timed` for a block of code.
+    """
+    if REGISTRY is None:
+        return _NOOP
+    return _Track(name, tuple(sorted(labels.items())))
+
+
+# ---------------------------------------------------------
+# Export
+# ---------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Scrapes are not worth a log line each
+
+
+def write_file(path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)  # Scrapers never see a half-written file
+
+
+def _file_loop(path):
+    while True:
+        time.sleep(FILE_INTERVAL)
+        try:
+            write_file(path)
+        except OSError:
+            pass
+
+
+def _start_exporters():
+    if METRICS_PORT:
+        server = ThreadingHTTPServer(("127.0.0.1", int(METRICS_PORT)), _Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    if METRICS_FILE:
+        threading.Thread(target=_file_loop, args=(METRICS_FILE,), name="metrics-file", daemon=True).start()
+        atexit.register(write_file, METRICS_FILE)
+
+
+if ENABLED:
+    _start_exporters()
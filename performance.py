@@ -1,3 +1,17 @@
+import numpy as np
+
+# Every performance tier, in code order. The agent's state space and the
+# event log use this order too (rl_agent imports it from here), so the
+# vectorized functions' int8 codes match theirs. "Average" is the tier
+# app.py gives a slow or hinted answer.
+TIERS = ("Needs Practice", "Average", "Good Job", "Excellent")
+
+# Vectorized functions return tiers as int8 codes: indexes into TIER_LABELS
+TIER_LABELS = np.array(TIERS, dtype=object)
+NEEDS_PRACTICE = TIERS.index("Needs Practice")
+GOOD_JOB = TIERS.index("Good Job")
+EXCELLENT = TIERS.index("Excellent")
+
 def calculate_accuracy(correct_count, total_questions):
     """
     Calculates the percentage of correct answers.
@@ -83,6 +97,111 @@ def generate_session_report(correct, total, avg_time, difficulty):
         "total_score": score
     }
 
+
+# ---------------------------------------------------------
+# VECTORIZED (NumPy arrays in, arrays out; same results as above)
+# ---------------------------------------------------------
+def calculate_accuracies(correct_count, total_questions):
+    """
+    Array version of calculate_accuracy (0.0 where total is 0).
+    """
+    correct_count = np.asarray(correct_count)
+    total_questions = np.asarray(total_questions)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        accuracy = (correct_count / total_questions) * 100
+
+    # round(x, 1) rounds the exact binary value; np.round goes through x * 10,
+    # which can land exactly on a .5 tie, so those few values use round() itself
+    scaled = accuracy * 10
+    rounded = np.rint(scaled) / 10
+    ties = (scaled - np.floor(scaled)) == 0.5
+    if ties.any():
+        rounded[ties] = [round(value, 1) for value in accuracy[ties].tolist()]
+    return np.where(total_questions == 0, 0.0, rounded)
+
+
+def get_performance_tiers(accuracy):
+    """
+    Array version of get_performance_tier. Returns int8 codes; TIER_LABELS[codes]
+    gives the strings.
+    """
+    accuracy = np.asarray(accuracy)
+    codes = np.full(accuracy.shape, NEEDS_PRACTICE, dtype=np.int8)
+    codes[accuracy >= 60] = GOOD_JOB
+    codes[accuracy >= 85] = EXCELLENT
+    return codes
+
+
+def _speed_bonus(correct, avg_time_sec):
+    # int(max(0, 30 - t) * correct); NaN times get no bonus, as max() gives 0
+    time_saved = 30 - np.asarray(avg_time_sec, dtype=np.float64)
+    time_saved = np.where(time_saved > 0, time_saved, 0.0)
+    return np.trunc(time_saved * correct).astype(np.int64)
+
+
+def compute_rewards(correct, total, avg_time_sec, difficulty=1):
+    """
+    Array version of compute_reward; returns int64 scores.
+    """
+    correct = np.asarray(correct, dtype=np.int64)
+    base_score = correct * (10 * np.asarray(difficulty, dtype=np.int64))
+    return np.where(np.asarray(total) == 0, 0, base_score + _speed_bonus(correct, avg_time_sec))
+
+
+def generate_session_reports(users, sessions, correct, time_sec, difficulty):
+    """
+    Scores many sessions at once from per-answer rows (e.g. events.py columns).
+
+    Rows are grouped by (user, session) with one sort and summed with bincount,
+    so tens of millions of rows need no Python loop. Returns a dict of arrays,
+    one entry per session, ordered by user then session. For a session played
+    at one level, every field equals generate_session_report (with
+    `average_time` as seconds and `performance_tier` as codes). A session
+    that changes level scores 10 x level per correct answer, and its
+    `difficulty_level` is the mean level.
+    """
+    correct = np.asarray(correct)
+    difficulty = np.asarray(difficulty, dtype=np.int64)
+
+    # 1. One integer key per (user, session)
+    user_values, user_codes = np.unique(users, return_inverse=True)
+    session_values, session_codes = np.unique(sessions, return_inverse=True)
+    span = len(user_values) * len(session_values)
+    keys = user_codes.astype(np.int64) * len(session_values) + session_codes
+    if span <= 4 * len(keys):
+        # Dense key space: count the keys instead of sorting them again
+        present = np.bincount(keys, minlength=span)
+        groups = np.flatnonzero(present)
+        total = present[groups]
+        position = np.zeros(span, dtype=np.int64)
+        position[groups] = np.arange(len(groups))
+        inverse = position[keys]
+    else:
+        groups, inverse, total = np.unique(keys, return_inverse=True, return_counts=True)
+
+    # 2. Per-session sums
+    n = len(groups)
+    correct_count = np.bincount(inverse, weights=correct, minlength=n).astype(np.int64)
+    avg_time = np.bincount(inverse, weights=time_sec, minlength=n) / total
+    level_sum = np.bincount(inverse, weights=difficulty, minlength=n)
+    correct_level_sum = np.bincount(inverse, weights=np.where(correct, difficulty, 0), minlength=n)
+
+    # 3. Scores, exactly as the scalar functions compute them
+    accuracy = calculate_accuracies(correct_count, total)
+    score = 10 * correct_level_sum.astype(np.int64) + _speed_bonus(correct_count, avg_time)
+
+    return {
+        "user": user_values[groups // len(session_values)],
+        "session": session_values[groups % len(session_values)],
+        "total_questions": total,
+        "correct_answers": correct_count,
+        "accuracy_percent": accuracy,
+        "performance_tier": get_performance_tiers(accuracy),
+        "average_time": avg_time,
+        "difficulty_level": level_sum / total,
+        "total_score": score,
+    }
+
 # ---------------------------------------------------------
 # EXECUTION EXAMPLE
 # ---------------------------------------------------------
@@ -0,0 +1,213 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+import metrics
+from snapshot import Snapshot, read_table
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindWriter:
+    """
+    Collects records in memory and writes them from a background thread.
+
+    Writes are coalesced: a batch is written once `flush_interval` seconds have
+    passed since its first record, or as soon as `batch_size` records are queued,
+    whichever comes first. `record()` never touches the disk. If `tick_interval`
+    is set, `_tick()` also runs on the writer thread at least that often.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, flush_interval=1.0, batch_size=256, tick_interval=None):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.tick_interval = tick_interval
+        self._pending = []
+        self._cond = threading.Condition()
+        self._submitted = 0  # Records handed to record()
+        self._written = 0    # Records handed to _write_batch()
+        self._force = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def for_file(cls, filename, **kwargs):
+        """
+        Returns the process-wide writer for `filename`, so sessions writing the
+        same file share one writer thread instead of racing each other.
+        """
+        key = (cls, os.path.abspath(filename))
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(filename, **kwargs)
+            return cls._instances[key]
+
+    def record(self, item):
+        with self._cond:
+            self._pending.append(item)
+            self._submitted += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Blocks until everything recorded so far has been written.
+        """
+        with self._cond:
+            target = self._submitted
+            self._force = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # 1. Sleep until there is something to write (or a tick is due)
+                self._cond.wait_for(lambda: self._pending or self._closed or self._force,
+                                    self.tick_interval)
+
+                # 2. Coalesce until the interval expires or the batch is full
+                deadline = time.monotonic() + self.flush_interval
+                while (self._pending and len(self._pending) < self.batch_size
+                       and not (self._closed or self._force)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch, self._pending = self._pending, []
+                self._force = False
+                closing = self._closed
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+                if self.tick_interval is not None:
+                    self._tick()
+            except Exception:
+                logger.exception("%s failed to write %d records", type(self).__name__, len(batch))
+
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+                if closing and not self._pending:
+                    return
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def _tick(self):
+        pass
+
+
+class QTableJournal(WriteBehindWriter):
+    """
+    Write-behind persistence for a Q-table.
+
+    Every update is appended to `<name>.journal` as one JSON line holding the
+    state's new Q-values (absolute, not deltas), so replaying it twice is
+    harmless. Once the journal holds `compact_every` records it is folded into
+    the `.qtab` snapshot (see snapshot.py) and truncated. A crash loses at most
+    the last `flush_interval` seconds of updates. `layout` gives the
+    difficulties, actions and hyperparameters to record in snapshots built
+    from the journal alone.
+    """
+
+    def __init__(self, filename, flush_interval=1.0, batch_size=256, compact_every=5000, layout=None):
+        self.filename = filename
+        self.journal_path = os.path.splitext(filename)[0] + ".journal"
+        self.compact_every = compact_every
+        self.layout = dict(layout or {})
+        self._io_lock = threading.Lock()
+        self._journal_records = None  # Counted by the writer thread, before its first append
+        super().__init__(flush_interval, batch_size)
+
+    def record_update(self, state, action_idx, delta, q_values):
+        category, difficulty, tier = state
+        self.record((category, difficulty, tier, [float(q) for q in q_values]))
+
+    def _write_batch(self, batch):
+        lines = "".join(json.dumps(rec) + "\n" for rec in batch)
+        with self._io_lock:
+            if self._journal_records is None:
+                self._journal_records = self._count_lines(self.journal_path)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            metrics.inc("persistence_bytes_written_total", len(lines), store="journal")  # JSON is ASCII
+            self._journal_records += len(batch)
+            if self._journal_records >= self.compact_every:
+                self._write_snapshot(self.replay(self.filename))
+
+    def compact(self, q_table):
+        """
+        Writes `q_table` (a Snapshot or a {state: [q, ...]} mapping) as the new
+        snapshot and empties the journal.
+        """
+        self.flush()
+        with self._io_lock:
+            self._write_snapshot(q_table)
+
+    def _write_snapshot(self, q_table):
+        if not isinstance(q_table, Snapshot):
+            q_table = Snapshot.from_table(q_table, **self.layout)
+        written = q_table.write(self.filename)
+        metrics.inc("persistence_bytes_written_total", written, store="snapshot")
+        open(self.journal_path, "w").close()
+        self._journal_records = 0
+
+    @staticmethod
+    def _count_lines(path):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            return sum(1 for _ in f)
+
+    @staticmethod
+    def journal_entries(filename):
+        """
+        Yields the (state, q_values) updates journaled since the last snapshot.
+        """
+        journal_path = os.path.splitext(filename)[0] + ".journal"
+        if not os.path.exists(journal_path):
+            return
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    category, difficulty, tier, q_values = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line from a crash mid-write
+                yield (category, difficulty, tier), q_values
+
+    @staticmethod
+    def replay(filename):
+        """
+        Rebuilds a Q-table dict from the snapshot plus any journaled updates.
+        A legacy pickled snapshot next to it (`<name>.pkl`) is read when the
+        `.qtab` does not exist yet. Unreadable snapshots raise SnapshotError.
+        """
+        q_table = {}
+        legacy_path = os.path.splitext(filename)[0] + ".pkl"
+        if os.path.exists(filename):
+            q_table = read_table(filename)
+        elif os.path.exists(legacy_path):
+            q_table = read_table(legacy_path)
+        q_table.update(QTableJournal.journal_entries(filename))
+        return q_table
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+
+import metrics
+from persistence import QTableJournal, WriteBehindWriter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS q_values (
+    category   TEXT    NOT NULL,
+    difficulty INTEGER NOT NULL,
+    tier       TEXT    NOT NULL,
+    action     INTEGER NOT NULL,
+    value      REAL    NOT NULL,
+    PRIMARY KEY (category, difficulty, tier, action)
+)
+"""
+
+
+class SharedPolicyStore(WriteBehindWriter):
+    """
+    A Q-table shared by every session, process and replica pointing at the same
+    SQLite file (WAL mode, so readers never block the writer).
+
+    Sessions send per-(state, action) deltas rather than whole tables: each
+    batch is summed per key and applied in one `BEGIN IMMEDIATE` transaction as
+    `value = value + delta`, so concurrent learners never overwrite each other.
+    Rows that do not exist yet start from the agent's instinct values.
+
+    The writer thread re-reads the table every `refresh_interval` seconds when
+    another connection has committed, and publishes it as `view()`; agents copy
+    that view in memory, so answering a question never waits on SQLite.
+    """
+
+    def __init__(self, filename, refresh_interval=5.0, flush_interval=1.0, batch_size=256,
+                 seed_from=None, timeout=30.0):
+        self.filename = filename
+        self.timeout = timeout
+        self.version = 0  # Bumped whenever a fresher view is published
+        self._view = {}
+        self._view_lock = threading.Lock()
+        self._data_version = None
+        self._conn = None  # Owned by the writer thread
+
+        # Initial load happens on the caller's thread, once per process
+        conn = self._connect()
+        try:
+            if seed_from is not None:
+                self._seed(conn, seed_from)
+            self._publish(self._read_all(conn))
+        finally:
+            conn.close()
+
+        super().__init__(flush_interval, batch_size, tick_interval=refresh_interval)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.filename, timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(SCHEMA)
+        return conn
+
+    def _seed(self, conn, seed_from):
+        """
+        One-time import of an existing snapshot/journal Q-table (or a legacy
+        pickle next to it) into an empty store.
+        """
+        stem = os.path.splitext(seed_from)[0]
+        if not any(os.path.exists(path) for path in (seed_from, stem + ".pkl", stem + ".journal")):
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT COUNT(*) FROM q_values").fetchone()[0] == 0:
+                conn.executemany(
+                    "INSERT INTO q_values VALUES (?, ?, ?, ?, ?)",
+                    [(c, d, t, a, float(v))
+                     for (c, d, t), q in QTableJournal.replay(seed_from).items()
+                     for a, v in enumerate(q)])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ---------------------------------------------------------
+    # Request path (memory only)
+    # ---------------------------------------------------------
+    def record_update(self, state, action_idx, delta, q_values):
+        """
+        Queues a delta; `q_values` supplies the instinct base for unseen states.
+        """
+        category, difficulty, tier = state
+        base = float(q_values[action_idx]) - float(delta)
+        self.record((category, difficulty, tier, action_idx, float(delta), base))
+
+    def view(self):
+        """
+        Returns (version, {state: {action_idx: q}}) for the latest published
+        table. Actions that were never updated are absent (still at instinct).
+        """
+        with self._view_lock:
+            return self.version, self._view
+
+    # ---------------------------------------------------------
+    # Writer thread
+    # ---------------------------------------------------------
+    def _write_batch(self, batch):
+        # Coalesce: one row update per key, however many answers touched it
+        deltas = {}
+        bases = {}
+        for category, difficulty, tier, action_idx, delta, base in batch:
+            key = (category, difficulty, tier, action_idx)
+            deltas[key] = deltas.get(key, 0.0) + delta
+            bases.setdefault(key, base)
+
+        conn = self._thread_conn()
+        with metrics.track("policy_store_write_seconds", store="policy"):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR IGNORE INTO q_values VALUES (?, ?, ?, ?, ?)",
+                                 [key + (bases[key],) for key in deltas])
+                conn.executemany(
+                    "UPDATE q_values SET value = value + ? "
+                    "WHERE category = ? AND difficulty = ? AND tier = ? AND action = ?",
+                    [(delta,) + key for key, delta in deltas.items()])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        # Row payload: the two text columns plus three 8-byte numbers
+        metrics.inc("persistence_bytes_written_total", sum(len(category.encode()) + len(tier.encode()) + 24
+                                                           for category, _, tier, _ in deltas), store="policy")
+        self._data_version = None  # Our own commit: force a re-read
+
+    def _tick(self):
+        conn = self._thread_conn()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._publish(self._read_all(conn))
+
+    def _thread_conn(self):
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    @staticmethod
+    def _read_all(conn):
+        table = {}
+        for category, difficulty, tier, action_idx, value in conn.execute(
+                "SELECT category, difficulty, tier, action, value FROM q_values"):
+            table.setdefault((category, difficulty, tier), {})[action_idx] = value
+        return table
+
+    def _publish(self, table):
+        with self._view_lock:
+            self._view = table
+            self.version += 1
@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from rl_agent import DIFFICULTIES
+
+# One small pool per process; generating a task takes microseconds
+EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="task-prefetch")
+# Past this many unfinished candidates the pool is behind: skip prefetching,
+# take() then builds inline, which is what it would end up doing anyway
+MAX_BACKLOG = 6
+
+
+class TaskPrefetcher:
+    """
+    Speculatively builds the next task while the current one is on screen.
+
+    The agent can only move the level by -1, 0 or +1, so `prefetch()` queues
+    all (up to) three candidates in the background; once the action is known
+    `take()` is a dictionary lookup and the other candidates are cancelled.
+    """
+
+    _backlog = 0  # Unfinished candidates across all sessions
+    _backlog_lock = threading.Lock()
+
+    def __init__(self, generator, executor=EXECUTOR, max_backlog=MAX_BACKLOG):
+        self.generator = generator
+        self.executor = executor
+        self.max_backlog = max_backlog
+        self.lock = threading.Lock()  # The generator's RNG stream is not thread-safe
+        self.pending = {}             # (category, difficulty) -> Future[task]
+
+    def _build(self, category, difficulty, exclude_questions):
+        with self.lock:
+            return self.generator.generate_task(category, difficulty, exclude_questions)
+
+    def prefetch(self, category, difficulty, exclude_questions=None):
+        candidates = {max(DIFFICULTIES[0], difficulty - 1), difficulty, min(DIFFICULTIES[-1], difficulty + 1)}
+        self._cancel_pending()
+        cls = type(self)
+        with cls._backlog_lock:
+            if cls._backlog + len(candidates) > self.max_backlog:
+                return  # Pool is behind other sessions; take() will build inline
+            cls._backlog += len(candidates)
+        for d in sorted(candidates):
+            future = self.executor.submit(self._build, category, d, exclude_questions)
+            future.add_done_callback(self._finished)  # Also runs when cancelled
+            self.pending[(category, d)] = future
+
+    @classmethod
+    def _finished(cls, future):
+        with cls._backlog_lock:
+            cls._backlog -= 1
+
+    def take(self, category, difficulty, exclude_questions=None):
+        """
+        Returns the prefetched task for this level, or builds one now when it
+        is not ready. The pool is shared by every session, so a candidate still
+        queued behind other sessions' builds is cancelled rather than waited on.
+        """
+        future = self.pending.pop((category, difficulty), None)
+        self._cancel_pending()  # The other candidates are no longer needed
+        if future is not None and (future.done() or not future.cancel()):
+            # Finished, or already running (it holds the lock, so it is the quickest way)
+            try:
+                return future.result()
+            except Exception:
+                pass  # Fall back to building it synchronously
+        return self._build(category, difficulty, exclude_questions)
+
+    def _cancel_pending(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending = {}
+
+    def clear(self):
+        """
+        Cancels pending candidates and empties the generator's buffers, so an
+        idle session holds no pre-built tasks between rounds.
+        """
+        self._cancel_pending()
+        with self.lock:  # Waits for a candidate that is already being built
+            self.generator.clear()
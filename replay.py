@@ -0,0 +1,165 @@
+"""
+Experience replay for the adaptive agent.
+
+Answers no longer train the policy on the request path. Each transition is
+queued with `ReplayTrainer.add()`. The trainer thread appends it to a
+fixed-size ring buffer and replays random minibatches from that buffer
+through `learn_batch`. A real answer is then learned from about
+`replay_ratio` times instead of once, so the policy needs fewer sessions
+to settle.
+"""
+import math
+import threading
+
+import numpy as np
+
+import metrics
+from persistence import WriteBehindWriter
+from rl_agent import DIFFICULTIES
+
+
+class ReplayBuffer:
+    """
+    The last `capacity` transitions as NumPy columns (a ring: the oldest are
+    overwritten). States are kept as (category, difficulty, tier) columns,
+    with categories and tiers numbered by the buffer itself: an agent's state
+    codes change when it grows a tier or loads another table, so they are
+    only computed when a minibatch is sampled.
+    """
+
+    def __init__(self, capacity=100_000):
+        self.capacity = capacity
+        # Column 0 is the state, column 1 the next state
+        self.categories = np.zeros((capacity, 2), dtype=np.int16)
+        self.difficulties = np.zeros((capacity, 2), dtype=np.int8)
+        self.tiers = np.zeros((capacity, 2), dtype=np.int16)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.category_names = []
+        self.tier_names = []
+        self._category_codes = {}
+        self._tier_codes = {}
+        self.size = 0
+        self.position = 0  # Next slot to write
+        self.added = 0     # Transitions ever added
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state):
+        self.add_batch([state], [action], [reward], [next_state])
+
+    def add_batch(self, states, actions, rewards, next_states):
+        """
+        Appends transitions; states are (category, difficulty, tier) tuples.
+        """
+        n = len(states)
+        if n > self.capacity:  # Only the newest fit
+            states, actions, rewards, next_states = (list(c)[-self.capacity:]
+                                                     for c in (states, actions, rewards, next_states))
+            self.added += n - self.capacity
+            n = self.capacity
+        pairs = list(zip(states, next_states))
+        if any(not 1 <= s[1] <= len(DIFFICULTIES) for pair in pairs for s in pair):
+            raise ValueError(f"difficulty must be 1-{len(DIFFICULTIES)}")
+        slots = (self.position + np.arange(n)) % self.capacity
+        self.categories[slots] = [[self._code(self._category_codes, self.category_names, s[0]) for s in pair]
+                                  for pair in pairs]
+        self.difficulties[slots] = [[s[1] for s in pair] for pair in pairs]
+        self.tiers[slots] = [[self._code(self._tier_codes, self.tier_names, s[2]) for s in pair]
+                             for pair in pairs]
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+        self.added += n
+
+    @staticmethod
+    def _code(codes, names, name):
+        if name not in codes:
+            codes[name] = len(names)
+            names.append(name)
+        return codes[name]
+
+    def sample(self, n, agent, rng):
+        """
+        Returns (states, actions, rewards, next_states) for `n` transitions
+        drawn uniformly with replacement, states as `agent`'s current codes.
+        The caller holds the agent's lock: encoding may grow its table.
+        """
+        idx = rng.integers(0, self.size, n)
+        # 1. Translate the buffer's numbering into the agent's (growing it for
+        #    names it does not know, as encode_state does)
+        for category in self.category_names:
+            agent.encode_state(category, 1, agent.tiers[0])
+        for tier in self.tier_names:
+            agent.encode_state(agent.categories[0], 1, tier)
+        category_idx = np.array([agent.categories.index(c) for c in self.category_names], dtype=np.int64)
+        tier_idx = np.array([agent.tiers.index(t) for t in self.tier_names], dtype=np.int64)
+
+        # 2. Encode both states of the sampled rows in one go
+        codes = agent.encode_codes(category_idx[self.categories[idx]], self.difficulties[idx].astype(np.int64),
+                                   tier_idx[self.tiers[idx]])
+        return codes[:, 0], self.actions[idx], self.rewards[idx], codes[:, 1]
+
+
+class ReplayTrainer(WriteBehindWriter):
+    """
+    Trains `agent` from a replay buffer on a background thread.
+
+    `add()` only queues the transition. Every `train_interval` seconds the
+    thread applies ceil(new transitions * `replay_ratio` / `minibatch`)
+    vectorized updates of `minibatch` sampled transitions each, holding
+    `lock` (the lock the request path uses for the agent) for one update at
+    a time. It stays idle while no new answers arrive. Pass
+    `train_interval=None` to train only when `train()` is called.
+    """
+
+    def __init__(self, agent, lock=None, capacity=100_000, minibatch=32, replay_ratio=8,
+                 train_interval=1.0, flush_interval=0.2, seed=None):
+        self.agent = agent
+        self.lock = lock or threading.Lock()
+        self.buffer = ReplayBuffer(capacity)
+        self.minibatch = minibatch
+        self.replay_ratio = replay_ratio
+        self.rng = np.random.default_rng(seed)
+        self.updates = 0
+        self._untrained = 0  # Transitions added since the last train()
+        self._train_lock = threading.Lock()
+        super().__init__(flush_interval, batch_size=minibatch, tick_interval=train_interval)
+
+    def add(self, state, action, reward, next_state):
+        """
+        Queues one (state, action, reward, next_state) transition; states are
+        (category, difficulty, tier) tuples. Never touches the agent.
+        """
+        self.record((state, action, reward, next_state))
+
+    def _write_batch(self, batch):
+        states, actions, rewards, next_states = zip(*batch)
+        with self._train_lock:
+            self.buffer.add_batch(states, actions, rewards, next_states)
+            self._untrained += len(batch)
+        metrics.inc("replay_transitions_total", len(batch))
+
+    def _tick(self):
+        self.train()
+
+    def train(self):
+        """
+        Runs the updates owed for the transitions added since the last call.
+        Returns how many minibatch updates were applied.
+        """
+        with self._train_lock:
+            if not self.buffer.size:
+                return 0
+            n_updates = math.ceil(self._untrained * self.replay_ratio / self.minibatch)
+            self._untrained = 0
+            with metrics.track("replay_train_seconds"):
+                for _ in range(n_updates):
+                    with self.lock:
+                        states, actions, rewards, next_states = self.buffer.sample(self.minibatch, self.agent,
+                                                                                   self.rng)
+                        self.agent.learn_batch(states, actions, rewards, next_states)
+            self.updates += n_updates
+            return n_updates
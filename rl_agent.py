@@ -1,72 +1,328 @@
+import logging
+import os
 import numpy as np
 import random
-import pickle
-import os
+from collections.abc import MutableMapping
+import metrics
+from persistence import QTableJournal
+from snapshot import Snapshot, SnapshotError
+from performance import TIERS  # Pure scoring module, no side effects on import
+from templates import load_registry
+
+logger = logging.getLogger(__name__)
+
+# The state space is small and known up front (categories come from the
+# task-template registry), so Q-values live in one dense array
+DIFFICULTIES = (1, 2, 3, 4, 5)
+
+# Instincts: Bias values based on performance (anything else is biased to STAY)
+INSTINCTS = {
+    "Excellent": [0.0, 1.0, 10.0],       # Strong push to INCREASE
+    "Needs Practice": [10.0, 1.0, -5.0], # Strong push to DECREASE
+}
+DEFAULT_INSTINCT = [-1.0, 5.0, 2.0]
+
+
+class QTableView(MutableMapping):
+    """
+    Dict-style view over the agent's dense Q array, keyed by
+    (category, difficulty, tier) tuples. Values are writable row views.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def __getitem__(self, state):
+        return self.agent.get_q_values(state)
+
+    def __setitem__(self, state, q_values):
+        self.agent.get_q_values(state)[:] = q_values
+
+    def __delitem__(self, state):
+        # Deleting a state resets it to its instinct
+        category, difficulty, tier = state
+        self[state] = self.agent.instinct(tier)
+
+    def __iter__(self):
+        for category in self.agent.categories:
+            for difficulty in DIFFICULTIES:
+                for tier in self.agent.tiers:
+                    yield (category, difficulty, tier)
+
+    def __len__(self):
+        return self.agent.q_values.shape[0] * len(DIFFICULTIES) * self.agent.q_values.shape[2]
+
 
 class AdaptiveDifficultyAgent:
     """
     Tabular Q-Learning Agent with Heuristic Initialization ("Instincts").
+
+    Q-values are stored in a preallocated float64[n_cat, 5, n_tier, 3] array with
+    the instincts filled in at construction. States can be addressed either as
+    (category, difficulty, tier) tuples or as integer codes from `encode_state`;
+    the integer form is what the batched `choose_actions`/`learn_batch` use.
+    `categories` defaults to those of the task-template registry.
     """
-    def __init__(self, alpha=0.5, gamma=0.8, epsilon=0.2):
-        self.q_table = {} 
-        self.alpha = alpha      
-        self.gamma = gamma      
-        self.epsilon = epsilon  
+    def __init__(self, alpha=0.5, gamma=0.8, epsilon=0.2, autosave=True,
+                 categories=None, tiers=TIERS, seed=None, instincts=None, default_instinct=None):
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        # Initial Q-values per tier (tiers not listed get `default_instinct`)
+        self.instincts = {tier: list(q) for tier, q in (INSTINCTS if instincts is None else instincts).items()}
+        self.default_instinct = list(DEFAULT_INSTINCT if default_instinct is None else default_instinct)
         self.actions = [-1, 0, 1]  # Decrease, Stay, Increase
+        self.autosave = autosave  # Persist every update in the background
+        self.filename = "q_table.qtab"
+        self.store = None         # Write-behind sink: QTableJournal or SharedPolicyStore
+        self.shared = None        # SharedPolicyStore whose view we refresh from
+        self._shared_version = None
+        self.rng = np.random.default_rng(seed)  # Exploration stream for the batch API
 
+        self.categories = list(load_registry().categories() if categories is None else categories)
+        self.tiers = list(tiers)
+        self._category_index = {c: i for i, c in enumerate(self.categories)}
+        self._tier_index = {t: i for i, t in enumerate(self.tiers)}
+        self._action_values = np.array(self.actions)
+        self.q_values = self._instinct_block(len(self.categories), self.tiers)
+        self._flat = self.q_values.reshape(-1, len(self.actions))
+
+    def instinct(self, tier):
+        return self.instincts.get(tier, self.default_instinct)
+
+    def _instinct_block(self, n_categories, tiers):
+        block = np.empty((n_categories, len(DIFFICULTIES), len(tiers), 3), dtype=np.float64)
+        for t, tier in enumerate(tiers):
+            block[:, :, t, :] = self.instinct(tier)
+        return block
+
+    @property
+    def q_table(self):
+        return QTableView(self)
+
+    @q_table.setter
+    def q_table(self, table):
+        # Accepts any {state: [q, q, q]} mapping, e.g. an old pickled dict
+        self.q_values[:] = self._instinct_block(len(self.categories), self.tiers)
+        for state, q in table.items():
+            self.get_q_values(state)[:] = q
+
+    # ---------------------------------------------------------
+    # State encoding
+    # ---------------------------------------------------------
+    def encode_state(self, category, difficulty, tier):
+        """
+        Maps a (category, difficulty, tier) state to its row in the flat table.
+        Unseen categories/tiers grow the table (note: a new tier renumbers codes).
+        """
+        if not 1 <= difficulty <= len(DIFFICULTIES):
+            raise ValueError(f"difficulty must be 1-{len(DIFFICULTIES)}, got {difficulty}")
+        if category not in self._category_index:
+            self._add_category(category)
+        if tier not in self._tier_index:
+            self._add_tier(tier)
+        return self.encode_codes(self._category_index[category], difficulty, self._tier_index[tier])
+
+    def encode_codes(self, category_idx, difficulty, tier_idx):
+        """
+        Vectorized encoding from integer codes; accepts scalars or NumPy arrays.
+        """
+        return (category_idx * len(DIFFICULTIES) + (difficulty - 1)) * len(self.tiers) + tier_idx
+
+    def decode_state(self, code):
+        rest, tier_idx = divmod(int(code), len(self.tiers))
+        category_idx, level_idx = divmod(rest, len(DIFFICULTIES))
+        return (self.categories[category_idx], DIFFICULTIES[level_idx], self.tiers[tier_idx])
+
+    def _add_category(self, category):
+        self._category_index[category] = len(self.categories)
+        self.categories.append(category)
+        self.q_values = np.concatenate([self.q_values, self._instinct_block(1, self.tiers)], axis=0)
+        self._flat = self.q_values.reshape(-1, len(self.actions))
+
+    def _add_tier(self, tier):
+        self._tier_index[tier] = len(self.tiers)
+        self.tiers.append(tier)
+        extra = self._instinct_block(len(self.categories), [tier])
+        self.q_values = np.concatenate([self.q_values, extra], axis=2)
+        self._flat = self.q_values.reshape(-1, len(self.actions))
+
+    # ---------------------------------------------------------
+    # Single-user API (app.py)
+    # ---------------------------------------------------------
     def get_q_values(self, state):
         """
-        Returns Q-values. If state is new, we initialize with 'Instincts'.
-        """
-        if state not in self.q_table:
-            # Unpack 3 values (Category is just a string here, agent doesn't care what it is)
-            category, difficulty, tier = state 
-            
-            # Instincts: Bias values based on performance
-            if tier == "Excellent":
-                self.q_table[state] = [0.0, 1.0, 10.0] # Strong push to INCREASE
-            elif tier == "Needs Practice":
-                self.q_table[state] = [10.0, 1.0, -5.0] # Strong push to DECREASE
-            else: 
-                self.q_table[state] = [-1.0, 5.0, 2.0] # Bias to STAY
-                
-        return self.q_table[state]
+        Returns the (writable) Q-values row for a state.
+        """
+        category, difficulty, tier = state
+        code = self.encode_state(category, difficulty, tier)  # May grow the table
+        return self._flat[code]
 
     def choose_action(self, category, difficulty, tier):
-        state = (category, difficulty, tier) # Create 3-tuple state
-        q_values = self.get_q_values(state)
+        self.refresh()
+        q_values = self.get_q_values((category, difficulty, tier))
 
         # Exploration
         if random.uniform(0, 1) < self.epsilon:
             return random.choice(self.actions)
 
         # Exploitation
-        max_q_index = np.argmax(q_values)
-        return self.actions[max_q_index]
+        return self.actions[int(q_values.argmax())]
 
+    @metrics.timed("agent_learn_seconds")
     def learn(self, state, action, reward, next_state):
         action_idx = self.actions.index(action)
-        current_q = self.get_q_values(state)[action_idx]
-        next_q_values = self.get_q_values(next_state)
-        max_next_q = np.max(next_q_values)
-        
+        q_values = self.get_q_values(state)
+        current_q = q_values[action_idx]
+        max_next_q = self.get_q_values(next_state).max()
+
         # Bellman Equation Update
-        new_q = current_q + self.alpha * (reward + self.gamma * max_next_q - current_q)
-        self.q_table[state][action_idx] = new_q
-        
-        self.save_agent()
-
-    def save_agent(self, filename="q_table.pkl"):
-        try:
-            with open(filename, "wb") as f:
-                pickle.dump(self.q_table, f)
-        except Exception:
-            pass
-
-    def load_agent(self, filename="q_table.pkl"):
+        delta = self.alpha * (reward + self.gamma * max_next_q - current_q)
+        q_values[action_idx] = current_q + delta
+
+        # Queue the write; the store's background thread does the disk I/O
+        if self.autosave:
+            self._get_store().record_update(state, action_idx, delta, q_values)
+
+    # ---------------------------------------------------------
+    # Batched API (many users at once, integer-encoded states)
+    # ---------------------------------------------------------
+    def choose_actions(self, states):
+        """
+        Epsilon-greedy actions (-1/0/+1) for an array of encoded states.
+        """
+        states = np.asarray(states)
+        action_idx = self._flat[states].argmax(axis=1)
+        explore = self.rng.random(states.shape) < self.epsilon
+        n_explore = int(explore.sum())
+        if n_explore:
+            action_idx[explore] = self.rng.integers(0, len(self.actions), n_explore)
+        return self._action_values[action_idx]
+
+    def learn_batch(self, states, actions, rewards, next_states):
+        """
+        Vectorized Bellman update for arrays of transitions.
+
+        All targets are computed from the table as it was before the batch.
+        Transitions that share a (state, action) are averaged into one update,
+        so a thousand users in the same state move it one step, not a thousand.
+        """
+        states = np.asarray(states)
+        next_states = np.asarray(next_states)
+        action_idx = np.searchsorted(self._action_values, actions)
+        current_q = self._flat[states, action_idx]
+        max_next_q = self._flat[next_states].max(axis=1)
+        delta = self.alpha * (np.asarray(rewards, dtype=np.float64) + self.gamma * max_next_q - current_q)
+
+        keys = states * len(self.actions) + action_idx
+        keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        mean_delta = np.bincount(inverse, weights=delta) / counts
+        self._flat.reshape(-1)[keys] += mean_delta
+
+        if self.autosave:
+            store = self._get_store()
+            for key, d in zip(keys.tolist(), mean_delta.tolist()):
+                code, a = divmod(key, len(self.actions))
+                store.record_update(self.decode_state(code), a, d, self._flat[code])
+
+    # ---------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------
+    def _get_store(self):
+        if self.store is None:
+            self.store = self._journal()
+        return self.store
+
+    def _journal(self):
+        layout = {"difficulties": list(DIFFICULTIES), "actions": self.actions,
+                  "hyperparameters": self.hyperparameters()}
+        return QTableJournal.for_file(self.filename, layout=layout)
+
+    def hyperparameters(self):
+        return {"alpha": self.alpha, "gamma": self.gamma, "epsilon": self.epsilon,
+                "instincts": self.instincts, "default_instinct": self.default_instinct}
+
+    def snapshot(self):
+        """
+        The current Q-table as a Snapshot (shares this agent's array).
+        """
+        return Snapshot(self.q_values, self.categories, DIFFICULTIES, self.tiers, self.actions,
+                        self.hyperparameters(), complete=True)
+
+    @metrics.timed("agent_save_seconds")
+    def save_agent(self, filename=None):
+        """
+        Writes a full snapshot now and truncates the journal. Raises on I/O errors.
+        """
+        if filename is not None and filename != self.filename:
+            self.filename = filename
+            self.store = None
+        journal = self.store if isinstance(self.store, QTableJournal) else self._journal()
+        journal.compact(self.snapshot())
+
+    def load_agent(self, filename="q_table.qtab"):
+        """
+        Restores the Q-table from the last snapshot plus the journal behind it.
+
+        The snapshot is memory-mapped copy-on-write, so this does not read the
+        table; pages are faulted in as states are visited. A legacy pickled
+        `<name>.pkl` is migrated to `filename` the first time. Raises
+        SnapshotError if the snapshot is unreadable or encodes other actions.
+        """
+        self.filename = filename
+        self.store = None
+        self.shared = None
+        legacy_path = os.path.splitext(filename)[0] + ".pkl"
+        if not os.path.exists(filename) and os.path.exists(legacy_path):
+            self.q_table = QTableJournal.replay(filename)  # Pickle + journal
+            self.save_agent()
+            logger.info("Migrated %s to %s", legacy_path, filename)
+            return
+
         if os.path.exists(filename):
-            try:
-                with open(filename, "rb") as f:
-                    self.q_table = pickle.load(f)
-            except Exception:
-                pass
\ No newline at end of file
+            self._use_snapshot(Snapshot.read(filename, mode="c"))
+        else:
+            self.q_table = {}
+        for state, q_values in QTableJournal.journal_entries(filename):
+            self.get_q_values(state)[:] = q_values
+
+    def _use_snapshot(self, snapshot):
+        if snapshot.actions != self.actions or snapshot.difficulties != list(DIFFICULTIES):
+            raise SnapshotError(f"snapshot encodes actions {snapshot.actions} and difficulties "
+                                f"{snapshot.difficulties}, this agent uses {self.actions} and {list(DIFFICULTIES)}")
+        self.categories = list(snapshot.categories)
+        self.tiers = list(snapshot.tiers)
+        self._category_index = {c: i for i, c in enumerate(self.categories)}
+        self._tier_index = {t: i for i, t in enumerate(self.tiers)}
+        values = snapshot.values.view(np.ndarray)  # Plain array over the mapping
+        if not snapshot.complete:
+            # States the snapshot does not hold start at their instincts
+            missing = np.isnan(values).any(axis=-1)
+            values[missing] = self._instinct_block(len(self.categories), self.tiers)[missing]
+        self.q_values = values
+        self._flat = self.q_values.reshape(-1, len(self.actions))
+
+    def attach_store(self, store):
+        """
+        Learns into a SharedPolicyStore and follows its periodically refreshed view.
+        """
+        self.store = store
+        self.shared = store
+        self._shared_version = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Copies in the shared store's latest view, if it published a newer one.
+        """
+        if self.shared is None:
+            return
+        version, table = self.shared.view()
+        if version == self._shared_version:
+            return
+        self._shared_version = version
+        self.q_values[:] = self._instinct_block(len(self.categories), self.tiers)
+        for state, row in table.items():
+            q_values = self.get_q_values(state)
+            for action_idx, value in row.items():
+                q_values[action_idx] = value
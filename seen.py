@@ -0,0 +1,98 @@
+import hashlib
+import os
+
+import numpy as np
+
+import metrics
+from persistence import WriteBehindWriter
+
+# 2**17 bits (16 KB) and 7 hashes: ~0.2% false positives after 10,000 questions
+SEEN_BITS = 1 << 17
+SEEN_HASHES = 7
+
+
+class SeenFilter:
+    """
+    Bloom filter of task ids a user has already been shown.
+
+    Memory is fixed (`bits` / 8 bytes) no matter how many questions are added,
+    and lookups cost `hashes` bit probes. There are no false negatives, so a
+    seen task is always caught; a false positive only costs the generator one
+    extra retry.
+    """
+
+    def __init__(self, bits=SEEN_BITS, hashes=SEEN_HASHES, data=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = np.zeros(bits // 8, dtype=np.uint8) if data is None else data
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_bytes(self):
+        header = self.bits.to_bytes(4, "little") + self.hashes.to_bytes(1, "little")
+        return header + self.array.tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw):
+        """
+        Raises ValueError unless `raw` is a whole to_bytes() image.
+        """
+        if len(raw) < 5:
+            raise ValueError(f"Seen-set file has {len(raw)} bytes, shorter than its 5-byte header")
+        bits = int.from_bytes(raw[:4], "little")
+        hashes = raw[4]
+        if bits == 0 or bits % 8 or hashes == 0:
+            raise ValueError(f"Corrupt seen-set header: {bits} bits, {hashes} hashes")
+        if len(raw) - 5 != bits // 8:
+            raise ValueError(f"Truncated seen-set file: {len(raw) - 5} of {bits // 8} filter bytes")
+        return cls(bits, hashes, np.frombuffer(raw, dtype=np.uint8, offset=5).copy())
+
+
+class SeenStore(WriteBehindWriter):
+    """
+    Keeps one SeenFilter file per user in `directory`, written in the background.
+    Saves for the same user within one flush interval collapse into one write.
+    """
+
+    def __init__(self, directory, flush_interval=1.0, batch_size=64):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(flush_interval, batch_size)
+
+    def _path(self, user_id):
+        name = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + ".bloom")
+
+    def load(self, user_id):
+        path = self._path(user_id)
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    return SeenFilter.from_bytes(f.read())
+            except (OSError, ValueError):
+                pass
+        return SeenFilter()
+
+    def save(self, user_id, seen):
+        self.record((user_id, seen.to_bytes()))
+
+    def _write_batch(self, batch):
+        latest = dict(batch)  # Last save per user wins
+        for user_id, raw in latest.items():
+            path = self._path(user_id)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(raw)
+            os.replace(tmp_path, path)
+            metrics.inc("persistence_bytes_written_total", len(raw), store="seen")
@@ -0,0 +1,470 @@
+"""
+Headless simulation of many virtual seniors playing in lockstep.
+
+This is the notebook's "Simulation Loop" vectorized with NumPy: every step,
+all N users answer one question at their current level, the agent picks
+their next level with `choose_actions`, and learns from the whole batch
+with `learn_batch`. Nothing is written to disk.
+
+The loop is a generator pipeline passing one StepBatch per step:
+
+    senior_answers (users answer) -> agent_steps (agent acts, learns) -> sink
+
+`simulate` collects per-step arrays into a SimulationResult. For long runs,
+`stream` keeps only running aggregates (StreamingStats: constant memory in
+the number of steps) and yields a checkpoint every few steps, so a run can
+be watched while it goes.
+
+    python simulation.py --users 10000 --steps 100 --seed 42
+    python simulation.py --stream --users 1000 --steps 100000 --checkpoint-file run.jsonl
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from performance import compute_rewards
+from rl_agent import DIFFICULTIES, AdaptiveDifficultyAgent
+
+# Chance of a correct answer that counts as "in flow": challenged but not failing
+FLOW_BAND = (0.6, 0.9)
+
+
+class SeniorModel:
+    """
+    Virtual user: probability of a correct answer and response-time range per
+    difficulty level. Defaults match the notebook's "Simulated Senior" (comfortable
+    up to Level 3, struggling at Level 4/5). `skill_spread` gives each user a
+    normally-distributed offset on their accuracy so users differ.
+    """
+
+    def __init__(self, accuracy=(0.9, 0.9, 0.9, 0.4, 0.4),
+                 time_low=(10, 10, 10, 35, 35), time_high=(25, 25, 25, 60, 60),
+                 skill_spread=0.0):
+        self.accuracy = np.asarray(accuracy, dtype=np.float64)
+        self.time_low = np.asarray(time_low, dtype=np.float64)
+        self.time_high = np.asarray(time_high, dtype=np.float64)
+        self.skill_spread = skill_spread
+
+    def sample_skills(self, n_users, rng):
+        if self.skill_spread == 0:
+            return np.zeros(n_users)
+        return rng.normal(0.0, self.skill_spread, n_users)
+
+    def p_correct(self, difficulty, skills):
+        return np.clip(self.accuracy[difficulty - 1] + skills, 0.0, 1.0)
+
+    def respond(self, difficulty, skills, rng):
+        """
+        Returns (is_correct, time_taken_sec) arrays for users at `difficulty`.
+        """
+        level = difficulty - 1
+        is_correct = rng.random(difficulty.shape) < self.p_correct(difficulty, skills)
+        time_taken = rng.uniform(self.time_low[level], self.time_high[level])
+        return is_correct, time_taken
+
+
+class StepBatch:
+    """
+    One step of the pipeline for all users. The source fills in what the
+    users did; agent_steps adds the reward and where each user goes next.
+    """
+
+    __slots__ = ("step", "difficulty", "p_correct", "is_correct", "time_taken",
+                 "reward", "actions", "next_difficulty")
+
+    def __init__(self, step, difficulty, p_correct, is_correct, time_taken):
+        self.step = step
+        self.difficulty = difficulty
+        self.p_correct = p_correct
+        self.is_correct = is_correct
+        self.time_taken = time_taken
+        self.reward = None
+        self.actions = None
+        self.next_difficulty = None
+
+
+def senior_answers(n_users, n_steps, model, rng, start_difficulty=1):
+    """
+    Source: yields one StepBatch of answers per step. Users move to the
+    batch's `next_difficulty` once a later stage sets it (and stay put
+    otherwise). `n_steps=None` runs until the consumer stops.
+    """
+    skills = model.sample_skills(n_users, rng)
+    difficulty = np.full(n_users, start_difficulty, dtype=np.int64)
+    step = 0
+    while n_steps is None or step < n_steps:
+        is_correct, time_taken = model.respond(difficulty, skills, rng)
+        batch = StepBatch(step, difficulty, model.p_correct(difficulty, skills), is_correct, time_taken)
+        yield batch
+        if batch.next_difficulty is not None:
+            difficulty = batch.next_difficulty
+        step += 1
+
+
+def agent_steps(batches, agent, category="math"):
+    """
+    Agent stage: scores each batch, picks every user's next level with
+    `choose_actions` and learns from the whole batch with `learn_batch`.
+    """
+    agent.encode_state(category, 1, agent.tiers[0])  # Registers an unseen category
+    category_idx = agent.categories.index(category)
+    excellent = agent.tiers.index("Excellent")
+    needs_practice = agent.tiers.index("Needs Practice")
+    for batch in batches:
+        difficulty = batch.difficulty
+        # 1. Metrics: tier of a one-question session is Excellent (100%) or Needs Practice (0%)
+        tier = np.where(batch.is_correct, excellent, needs_practice)
+        # compute_reward(1, 1, t, d) when correct; the RL reward is -10 otherwise
+        batch.reward = np.where(batch.is_correct, compute_rewards(1, 1, batch.time_taken, difficulty), -10)
+
+        # 2. Agent decision + state transition
+        states = agent.encode_codes(category_idx, difficulty, tier)
+        batch.actions = agent.choose_actions(states)
+        batch.next_difficulty = np.clip(difficulty + batch.actions, 1, len(DIFFICULTIES))
+
+        # 3. Learn from the whole batch
+        next_states = agent.encode_codes(category_idx, batch.next_difficulty, tier)
+        agent.learn_batch(states, batch.actions, batch.reward, next_states)
+        yield batch
+
+
+class RunningStats:
+    """
+    Count, mean, variance, min and max of a stream of arrays (Welford's
+    algorithm, merging a whole batch at a time).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences from the mean
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def update(self, values):
+        n = values.size
+        if not n:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+
+class Downsampler:
+    """
+    A per-step series kept as at most `max_points` bucket means. Buckets
+    start one step wide; whenever the points fill up, neighbours are merged
+    pairwise and buckets double in width, so a run of any length stays
+    plottable in constant memory.
+    """
+
+    def __init__(self, columns, max_points=500):
+        if max_points < 2 or max_points % 2:
+            raise ValueError("max_points must be an even number >= 2")
+        self.columns = tuple(columns)
+        self.max_points = max_points
+        self.width = 1  # Steps per bucket
+        self.points = np.zeros((max_points, len(self.columns)))
+        self.ends = np.zeros(max_points, dtype=np.int64)  # Last step of each bucket
+        self.size = 0
+        self._sum = np.zeros(len(self.columns))
+        self._count = 0
+
+    def add(self, step, values):
+        self._sum += values
+        self._count += 1
+        if self._count < self.width:
+            return
+        if self.size == self.max_points:
+            # Full: merge neighbours; the open bucket now needs twice the steps
+            half = self.max_points // 2
+            self.points[:half] = (self.points[0::2] + self.points[1::2]) / 2
+            self.ends[:half] = self.ends[1::2]
+            self.size = half
+            self.width *= 2
+            if self._count < self.width:
+                return
+        self.points[self.size] = self._sum / self._count
+        self.ends[self.size] = step
+        self.size += 1
+        self._sum[:] = 0
+        self._count = 0
+
+    def rows(self):
+        """
+        One (last_step, {column: mean}) per bucket, the open one included.
+        """
+        rows = [(end, dict(zip(self.columns, point)))
+                for end, point in zip(self.ends[:self.size].tolist(), self.points[:self.size].tolist())]
+        if self._count:
+            last = rows[-1][0] if rows else -1
+            rows.append((last + self._count, dict(zip(self.columns, (self._sum / self._count).tolist()))))
+        return rows
+
+
+class StreamingStats:
+    """
+    Sink: running aggregates over every user-step, in memory that does not
+    grow with the number of steps.
+
+        reward             RunningStats over all user-steps
+        difficulty_counts  user-steps spent at each level (a histogram)
+        change_rates()     share of users moving up/down a level per step,
+                           over the last `window` steps
+        series             Downsampler of the per-step means, for plotting
+    """
+
+    SERIES = ("difficulty", "reward", "accuracy", "flow")
+
+    def __init__(self, flow_band=FLOW_BAND, window=100, max_points=500):
+        self.flow_band = flow_band
+        self.window = window
+        self.reward = RunningStats()
+        self.correct = 0
+        self.in_flow = 0
+        self.difficulty_counts = np.zeros(len(DIFFICULTIES), dtype=np.int64)
+        self.latest_counts = np.zeros(len(DIFFICULTIES), dtype=np.int64)  # At the latest step
+        self.steps = 0
+        self.user_steps = 0
+        self.series = Downsampler(self.SERIES, max_points)
+        self.started = time.perf_counter()
+        self._changes = np.zeros((window, 3), dtype=np.int64)  # Ring of (up, down, users) per step
+        self._window_totals = np.zeros(3, dtype=np.int64)
+
+    def update(self, batch):
+        n = batch.difficulty.size
+        correct = int(np.count_nonzero(batch.is_correct))
+        in_flow = int(np.count_nonzero((batch.p_correct >= self.flow_band[0]) & (batch.p_correct <= self.flow_band[1])))
+        self.reward.update(batch.reward)
+        self.correct += correct
+        self.in_flow += in_flow
+        self.latest_counts = np.bincount(batch.difficulty - 1, minlength=len(DIFFICULTIES))
+        self.difficulty_counts += self.latest_counts
+
+        # Level changes: this step replaces the oldest one in the window
+        moves = batch.next_difficulty - batch.difficulty
+        changes = (np.count_nonzero(moves > 0), np.count_nonzero(moves < 0), n)
+        slot = self.steps % self.window
+        self._window_totals += changes - self._changes[slot]
+        self._changes[slot] = changes
+
+        self.series.add(batch.step, (batch.difficulty.mean(), batch.reward.mean(), correct / n, in_flow / n))
+        self.steps += 1
+        self.user_steps += n
+
+    def change_rates(self):
+        """
+        (up, down, any) share of users changing level per step, over the window.
+        """
+        up, down, users = self._window_totals.tolist()
+        if not users:
+            return 0.0, 0.0, 0.0
+        return up / users, down / users, (up + down) / users
+
+    def checkpoint(self):
+        """
+        The aggregates so far as a JSON-serializable dict.
+        """
+        elapsed = time.perf_counter() - self.started
+        up, down, change = self.change_rates()
+        total = max(self.user_steps, 1)
+        latest = max(int(self.latest_counts.sum()), 1)
+        return {
+            "step": self.steps,
+            "user_steps": self.user_steps,
+            "seconds": round(elapsed, 3),
+            "user_steps_per_sec": round(self.user_steps / max(elapsed, 1e-9)),
+            "reward_mean": round(self.reward.mean, 4),
+            "reward_std": round(self.reward.std, 4),
+            "reward_min": self.reward.min if self.reward.n else None,
+            "reward_max": self.reward.max if self.reward.n else None,
+            "accuracy_percent": round(self.correct / total * 100, 2),
+            "flow_percent": round(self.in_flow / total * 100, 2),
+            "mean_difficulty": round(float(self.latest_counts @ np.asarray(DIFFICULTIES)) / latest, 4),
+            "difficulty_share": [round(c / total, 4) for c in self.difficulty_counts.tolist()],
+            "level_up_rate": round(up, 4),
+            "level_down_rate": round(down, 4),
+            "level_change_rate": round(change, 4),
+        }
+
+
+def stream(n_users=1000, n_steps=None, agent=None, model=None, category="math", start_difficulty=1,
+           seed=None, stats=None, checkpoint_every=1000):
+    """
+    Runs the pipeline into `stats` (a fresh StreamingStats unless given) and
+    yields `stats.checkpoint()` every `checkpoint_every` steps and after the
+    last one. With `n_steps=None` it runs until the caller stops iterating.
+    """
+    rng = np.random.default_rng(seed)
+    if agent is None:
+        agent = AdaptiveDifficultyAgent(autosave=False, seed=rng.integers(2**32))
+    if model is None:
+        model = SeniorModel()
+    if stats is None:
+        stats = StreamingStats()
+    for batch in agent_steps(senior_answers(n_users, n_steps, model, rng, start_difficulty), agent, category):
+        stats.update(batch)
+        if stats.steps % checkpoint_every == 0:
+            yield stats.checkpoint()
+    if stats.steps % checkpoint_every:
+        yield stats.checkpoint()
+
+
+class SimulationResult:
+    """
+    Per-step aggregates over all users, plus one tracked user's trajectory
+    (the same curves the notebook plots for its single user).
+    """
+
+    def __init__(self, n_users, n_steps):
+        self.n_users = n_users
+        self.n_steps = n_steps
+        self.mean_difficulty = np.zeros(n_steps)
+        self.mean_reward = np.zeros(n_steps)
+        self.accuracy = np.zeros(n_steps)
+        self.in_flow = np.zeros(n_steps)  # Share of users inside FLOW_BAND
+        self.difficulty_counts = np.zeros((n_steps, len(DIFFICULTIES)), dtype=np.int64)
+        self.user_difficulty = np.zeros(n_steps, dtype=np.int64)
+        self.user_reward = np.zeros(n_steps)
+        self.elapsed = 0.0
+
+    def record(self, batch, flow_band=FLOW_BAND):
+        difficulty = batch.difficulty
+        self.mean_difficulty[batch.step] = difficulty.mean()
+        self.mean_reward[batch.step] = batch.reward.mean()
+        self.accuracy[batch.step] = batch.is_correct.mean()
+        self.in_flow[batch.step] = ((batch.p_correct >= flow_band[0]) & (batch.p_correct <= flow_band[1])).mean()
+        self.difficulty_counts[batch.step] = np.bincount(difficulty - 1, minlength=len(DIFFICULTIES))
+        self.user_difficulty[batch.step] = difficulty[0]
+        self.user_reward[batch.step] = batch.reward[0]
+
+    def summary(self):
+        return {
+            "users": self.n_users,
+            "steps": self.n_steps,
+            "user_steps": self.n_users * self.n_steps,
+            "seconds": round(self.elapsed, 3),
+            "user_steps_per_sec": round(self.n_users * self.n_steps / max(self.elapsed, 1e-9)),
+            "final_mean_difficulty": round(float(self.mean_difficulty[-1]), 3),
+            "mean_reward": round(float(self.mean_reward.mean()), 3),
+            "accuracy_percent": round(float(self.accuracy.mean() * 100), 1),
+            "flow_percent": round(float(self.in_flow.mean() * 100), 1),
+        }
+
+    def to_rows(self):
+        """
+        Notebook-style history rows (Session, Difficulty, Reward), averaged over users.
+        """
+        return [{"Session": i + 1, "Difficulty": float(self.mean_difficulty[i]),
+                 "Reward": float(self.mean_reward[i])} for i in range(self.n_steps)]
+
+
+def simulate(n_users=1000, n_steps=50, agent=None, model=None, category="math",
+             start_difficulty=1, seed=None, flow_band=FLOW_BAND):
+    """
+    Runs `n_users` virtual users for `n_steps` questions each and returns a
+    SimulationResult. A fresh, non-persisting agent is used unless one is given.
+    """
+    rng = np.random.default_rng(seed)
+    if agent is None:
+        agent = AdaptiveDifficultyAgent(autosave=False, seed=rng.integers(2**32))
+    if model is None:
+        model = SeniorModel()
+
+    result = SimulationResult(n_users, n_steps)
+    start = time.perf_counter()
+    for batch in agent_steps(senior_answers(n_users, n_steps, model, rng, start_difficulty), agent, category):
+        result.record(batch, flow_band)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate virtual seniors against the adaptive agent.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--category", default="math")
+    parser.add_argument("--start", type=int, default=1, help="starting difficulty")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="exploration rate (notebook uses 0.1)")
+    parser.add_argument("--skill-spread", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--csv", help="write the per-step Session/Difficulty/Reward curve here "
+                                      "(downsampled to --points rows with --stream)")
+    parser.add_argument("--stream", action="store_true",
+                        help="keep running aggregates only (constant memory); --steps 0 runs until Ctrl-C")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="steps between --stream checkpoints")
+    parser.add_argument("--checkpoint-file", help="append --stream checkpoints here as JSON lines")
+    parser.add_argument("--window", type=int, default=100, help="steps behind the --stream level-change rates")
+    parser.add_argument("--points", type=int, default=500, help="size of the --stream downsampled curve")
+    args = parser.parse_args(argv)
+
+    agent = AdaptiveDifficultyAgent(epsilon=args.epsilon, autosave=False, seed=args.seed)
+    model = SeniorModel(skill_spread=args.skill_spread)
+    if args.stream:
+        run_stream(args, agent, model)
+        return
+    result = simulate(args.users, args.steps, agent=agent, model=model,
+                      category=args.category, start_difficulty=args.start, seed=args.seed)
+
+    for key, value in result.summary().items():
+        print(f"{key:>22}: {value}")
+    print("difficulty share at last step:",
+          " ".join(f"L{lvl}={n / args.users:.0%}" for lvl, n in zip(DIFFICULTIES, result.difficulty_counts[-1])))
+
+    if args.csv:
+        write_curve(args.csv, ((row["Session"], row["Difficulty"], row["Reward"]) for row in result.to_rows()))
+
+
+def run_stream(args, agent, model):
+    stats = StreamingStats(window=args.window, max_points=args.points)
+    checkpoints = stream(args.users, args.steps if args.steps > 0 else None, agent=agent, model=model,
+                         category=args.category, start_difficulty=args.start, seed=args.seed, stats=stats,
+                         checkpoint_every=args.checkpoint_every)
+    log = open(args.checkpoint_file, "a", encoding="utf-8") if args.checkpoint_file else None
+    checkpoint = None
+    try:
+        for checkpoint in checkpoints:
+            print(f"step {checkpoint['step']:>10,}  reward {checkpoint['reward_mean']:7.2f} "
+                  f"(sd {checkpoint['reward_std']:.2f})  difficulty {checkpoint['mean_difficulty']:.2f}  "
+                  f"changes/step {checkpoint['level_change_rate']:.1%}  "
+                  f"{checkpoint['user_steps_per_sec']:,} user-steps/s", flush=True)
+            if log:
+                log.write(json.dumps(checkpoint) + "\n")
+                log.flush()
+    except KeyboardInterrupt:
+        checkpoint = stats.checkpoint()
+    finally:
+        if log:
+            log.close()
+
+    if checkpoint is not None:
+        for key, value in checkpoint.items():
+            print(f"{key:>22}: {value}")
+    if args.csv:
+        write_curve(args.csv, ((step + 1, row["difficulty"], row["reward"]) for step, row in stats.series.rows()))
+
+
+def write_curve(filename, rows):
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("Session,Difficulty,Reward\n")
+        for session, difficulty, reward in rows:
+            f.write(f"{session},{difficulty:.4f},{reward:.4f}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Binary Q-table snapshots (`.qtab`), readable with np.memmap.
+
+Layout, all little-endian:
+
+    b"QTAB"              magic
+    uint16               format version (VERSION)
+    uint32               header length in bytes
+    header               UTF-8 JSON: state encoding, actions, hyperparameters
+    padding              zeros up to the next multiple of ALIGN
+    float64[shape]       Q-values, C order, axes (category, difficulty, tier, action)
+
+Rows of NaN are states the snapshot does not hold (they load as instincts).
+Opening a snapshot only parses the header; the values are mapped, not read,
+so loading is O(1) in the table size and processes that map the same file
+share its pages until they write to them.
+"""
+import json
+import os
+import pickle
+import struct
+
+import numpy as np
+
+MAGIC = b"QTAB"
+VERSION = 1
+ALIGN = 64
+DTYPE = "<f8"
+_PREFIX = struct.Struct("<4sHI")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class Snapshot:
+    """
+    A Q-table as one dense array plus the encoding that names its axes.
+    """
+
+    def __init__(self, values, categories, difficulties, tiers, actions, hyperparameters=None,
+                 complete=None):
+        self.values = values
+        self.categories = list(categories)
+        self.difficulties = list(difficulties)
+        self.tiers = list(tiers)
+        self.actions = list(actions)
+        self.hyperparameters = dict(hyperparameters or {})
+        self.complete = complete  # True when no row is NaN; None if not known yet
+        expected = (len(self.categories), len(self.difficulties), len(self.tiers), len(self.actions))
+        if tuple(values.shape) != expected:
+            raise SnapshotError(f"values have shape {tuple(values.shape)}, the encoding needs {expected}")
+
+    @classmethod
+    def from_table(cls, q_table, difficulties=None, actions=None, hyperparameters=None):
+        """
+        Packs a {(category, difficulty, tier): [q, ...]} mapping; states it
+        does not mention are stored as NaN rows. Without `difficulties` and
+        `actions` the levels seen and action indices 0..n-1 are used.
+        """
+        categories, tiers = {}, {}
+        for category, _, tier in q_table:
+            categories.setdefault(category, len(categories))
+            tiers.setdefault(tier, len(tiers))
+        if difficulties is None:
+            difficulties = sorted({difficulty for _, difficulty, _ in q_table})
+        if actions is None:
+            actions = range(len(next(iter(q_table.values()), ())))
+        level_index = {d: i for i, d in enumerate(difficulties)}
+        values = np.full((len(categories), len(difficulties), len(tiers), len(actions)), np.nan)
+        for (category, difficulty, tier), q in q_table.items():
+            values[categories[category], level_index[difficulty], tiers[tier]] = q
+        return cls(values, categories, difficulties, tiers, actions, hyperparameters)
+
+    def to_table(self):
+        """
+        Returns the stored states as a {state: [q, ...]} dict.
+        """
+        values = np.asarray(self.values)
+        present = ~np.isnan(values).any(axis=-1)
+        return {(self.categories[c], self.difficulties[d], self.tiers[t]): values[c, d, t].tolist()
+                for c, d, t in zip(*np.nonzero(present))}
+
+    def header(self):
+        return {
+            "encoding": "values[category, difficulty, tier, action]",
+            "categories": self.categories,
+            "difficulties": self.difficulties,
+            "tiers": self.tiers,
+            "actions": self.actions,
+            "shape": list(self.values.shape),
+            "dtype": DTYPE,
+            "complete": bool(self.complete if self.complete is not None else not np.isnan(self.values).any()),
+            "hyperparameters": self.hyperparameters,
+        }
+
+    def write(self, path):
+        """
+        Writes the snapshot to `path` via a temporary file and a rename, so
+        readers see either the old snapshot or the new one, never a mix.
+        Returns the number of bytes written.
+        """
+        header = json.dumps(self.header(), separators=(",", ":")).encode("utf-8")
+        offset = -(-(_PREFIX.size + len(header)) // ALIGN) * ALIGN
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+                f.write(header)
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(np.ascontiguousarray(self.values, dtype=DTYPE).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+                written = f.tell()
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return written
+
+    @classmethod
+    def read(cls, path, mode="r"):
+        """
+        Opens a snapshot with its values memory-mapped. `mode` is np.memmap's:
+        "r" read-only, "c" copy-on-write (writes stay private to this process).
+        Raises SnapshotError if the file is not a complete snapshot.
+        """
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size or prefix[:4] != MAGIC:
+                raise SnapshotError(f"{path} is not a Q-table snapshot")
+            _, version, header_length = _PREFIX.unpack(prefix)
+            if version != VERSION:
+                raise SnapshotError(f"{path} has snapshot format version {version}, expected {VERSION}")
+            try:
+                header = json.loads(f.read(header_length).decode("utf-8"))
+            except ValueError as exc:
+                raise SnapshotError(f"{path} has a corrupt header: {exc}") from None
+            file_size = os.fstat(f.fileno()).st_size
+
+        shape = tuple(header["shape"])
+        offset = -(-(_PREFIX.size + header_length) // ALIGN) * ALIGN
+        if offset + int(np.prod(shape)) * np.dtype(header["dtype"]).itemsize != file_size:
+            raise SnapshotError(f"{path} is truncated or has trailing data")
+        if 0 in shape:
+            values = np.zeros(shape, dtype=header["dtype"])  # mmap cannot map zero bytes
+        else:
+            values = np.memmap(path, dtype=header["dtype"], mode=mode, offset=offset, shape=shape)
+        return cls(values, header["categories"], header["difficulties"], header["tiers"],
+                   header["actions"], header.get("hyperparameters"), header["complete"])
+
+
+class _TableUnpickler(pickle.Unpickler):
+    # A legacy q_table.pkl is a dict of tuples, lists, strings and numbers.
+    # Values the old agent learned are numpy.float64, pickled as a call to
+    # numpy's scalar() with a dtype; those are the only globals allowed, so
+    # no other code can run
+    _ALLOWED = {
+        ("numpy.core.multiarray", "scalar"): np.float64(0).__reduce__()[0],  # numpy 1.x
+        ("numpy._core.multiarray", "scalar"): np.float64(0).__reduce__()[0],  # numpy 2.x
+        ("numpy", "dtype"): np.dtype,
+    }
+
+    def find_class(self, module, name):
+        try:
+            return self._ALLOWED[(module, name)]
+        except KeyError:
+            raise SnapshotError(f"refusing to unpickle {module}.{name} from a legacy Q-table") from None
+
+
+def _plain(value):
+    # numpy scalars in a state key become the Python int/str they stand for
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def read_legacy_pickle(path):
+    """
+    Reads an old pickled {state: [q, ...]} Q-table without executing code from it.
+    Q-values come back as floats, whether they were pickled as floats or numpy scalars.
+    """
+    with open(path, "rb") as f:
+        try:
+            table = _TableUnpickler(f).load()
+        except (pickle.UnpicklingError, EOFError, ValueError, TypeError) as exc:
+            raise SnapshotError(f"{path} is not a readable legacy Q-table: {exc}") from None
+    if not isinstance(table, dict):
+        raise SnapshotError(f"{path} holds a {type(table).__name__}, not a Q-table dict")
+    try:
+        return {tuple(_plain(part) for part in state): [float(q) for q in q_values]
+                for state, q_values in table.items()}
+    except (TypeError, ValueError) as exc:
+        raise SnapshotError(f"{path} is not a readable legacy Q-table: {exc}") from None
+
+
+def read_table(path):
+    """
+    Returns the {state: [q, ...]} dict stored at `path`, in either format.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return Snapshot.read(path).to_table()
+    return read_legacy_pickle(path)
@@ -0,0 +1,169 @@
+"""
+Hyperparameter sweep for the adaptive agent over a process pool.
+
+Each config (alpha, gamma, epsilon and a scale on the instinct priors) is
+scored by simulating `--users` virtual seniors for `--steps` questions under
+each of `--seeds` seeds, and the runner collects one row per config:
+
+    reward       mean reward per answer
+    flow         share of answers given at a level inside simulation.FLOW_BAND
+    converge     first step after which the mean difficulty stays within
+                 `--tolerance` of where it ends up (lower is faster)
+
+Configs are independent, so the pool scales with cores.
+
+    python sweep.py --random 1000 --workers 8 --csv sweep.csv
+    python sweep.py --grid alpha=0.1,0.5 gamma=0.8 epsilon=0.1,0.2 instinct_scale=0,1
+"""
+import argparse
+import itertools
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+
+from rl_agent import DEFAULT_INSTINCT, INSTINCTS, AdaptiveDifficultyAgent
+from simulation import SeniorModel, simulate
+
+# Values a config leaves out (the agent's own defaults)
+DEFAULTS = {"alpha": 0.5, "gamma": 0.8, "epsilon": 0.2, "instinct_scale": 1.0}
+
+# name -> (low, high) for random search
+DEFAULT_SPACE = {
+    "alpha": (0.05, 0.9),
+    "gamma": (0.5, 0.99),
+    "epsilon": (0.0, 0.3),
+    "instinct_scale": (0.0, 2.0),  # 0 = no priors, 1 = rl_agent.INSTINCTS as they are
+}
+COLUMNS = ("alpha", "gamma", "epsilon", "instinct_scale", "reward", "flow", "converge")
+
+
+def parse_space(specs):
+    """
+    ["alpha=0.1,0.5", "gamma=0.5:0.99"] -> {"alpha": [0.1, 0.5], "gamma": (0.5, 0.99)}.
+    Lists are choices, low:high tuples are ranges (random search only).
+    """
+    space = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in DEFAULT_SPACE:
+            raise ValueError(f"unknown parameter {name!r}; expected one of {', '.join(DEFAULT_SPACE)}")
+        if ":" in values:
+            low, high = values.split(":")
+            space[name] = (float(low), float(high))
+        else:
+            space[name] = [float(v) for v in values.split(",")]
+    return space
+
+
+def grid_configs(space):
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            raise ValueError(f"{name} is a range; a grid needs a list of values")
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_configs(space, n, rng):
+    configs = []
+    for _ in range(n):
+        config = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                config[name] = float(rng.uniform(*values))
+            else:
+                config[name] = float(rng.choice(values))
+        configs.append(config)
+    return configs
+
+
+def converged_step(mean_difficulty, tolerance):
+    final = mean_difficulty[-max(1, len(mean_difficulty) // 10):].mean()
+    outside = np.flatnonzero(np.abs(mean_difficulty - final) > tolerance)
+    return int(outside[-1]) + 1 if len(outside) else 0
+
+
+def evaluate(job):
+    """
+    Scores one config (runs in a pool worker). Returns its results row.
+    """
+    config, seeds, n_users, n_steps, skill_spread, tolerance = job
+    params = {name: config.get(name, DEFAULTS[name]) for name in DEFAULT_SPACE}
+    scale = params["instinct_scale"]
+    model = SeniorModel(skill_spread=skill_spread)
+    rewards, flows, converge = [], [], []
+    for seed in seeds:
+        agent = AdaptiveDifficultyAgent(
+            alpha=params["alpha"], gamma=params["gamma"], epsilon=params["epsilon"], autosave=False, seed=seed,
+            instincts={tier: [scale * q for q in values] for tier, values in INSTINCTS.items()},
+            default_instinct=[scale * q for q in DEFAULT_INSTINCT])
+        result = simulate(n_users, n_steps, agent=agent, model=model, seed=seed)
+        rewards.append(result.mean_reward.mean())
+        flows.append(result.in_flow.mean())
+        converge.append(converged_step(result.mean_difficulty, tolerance))
+    return dict(params, reward=float(np.mean(rewards)), flow=float(np.mean(flows)),
+                converge=float(np.mean(converge)))
+
+
+def run_sweep(configs, seeds=(0, 1, 2), n_users=1000, n_steps=100, skill_spread=0.1, tolerance=0.1,
+              workers=None):
+    """
+    Evaluates every config and returns the rows in config order.
+    """
+    jobs = [(config, tuple(seeds), n_users, n_steps, skill_spread, tolerance) for config in configs]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [evaluate(job) for job in jobs]
+    # Small chunks keep every worker busy until the end of the sweep
+    chunksize = max(1, len(jobs) // (workers * 8))
+    with mp.Pool(workers) as pool:
+        return pool.map(evaluate, jobs, chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--grid", nargs="+", metavar="NAME=V1,V2", help="evaluate every combination")
+    mode.add_argument("--random", type=int, metavar="N", help="evaluate N random configs (default 100)")
+    parser.add_argument("--space", nargs="+", default=[], metavar="NAME=LOW:HIGH",
+                        help="random search ranges or choices (default: DEFAULT_SPACE)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--skill-spread", type=float, default=0.1)
+    parser.add_argument("--tolerance", type=float, default=0.1, help="difficulty band for 'converge'")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--sort", choices=("reward", "flow", "converge"), default="reward")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random search")
+    parser.add_argument("--csv", help="write every row here")
+    args = parser.parse_args(argv)
+
+    if args.grid:
+        configs = grid_configs(parse_space(args.grid))
+    else:
+        space = dict(DEFAULT_SPACE, **parse_space(args.space))
+        configs = random_configs(space, args.random or 100, np.random.default_rng(args.seed))
+
+    workers = args.workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    rows = run_sweep(configs, range(args.seeds), args.users, args.steps, args.skill_spread, args.tolerance, workers)
+    elapsed = time.perf_counter() - start
+    print(f"{len(rows)} configs x {args.seeds} seeds x {args.users} users x {args.steps} steps "
+          f"on {workers} worker(s): {elapsed:.1f}s ({len(rows) / elapsed:.1f} configs/s)")
+
+    rows_sorted = sorted(rows, key=lambda row: row[args.sort], reverse=args.sort != "converge")
+    print("  ".join(f"{c:>14}" for c in COLUMNS))
+    for row in rows_sorted[:args.top]:
+        print("  ".join(f"{row[c]:>14.3f}" for c in COLUMNS))
+
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8") as f:
+            f.write(",".join(COLUMNS) + "\n")
+            for row in rows:
+                f.write(",".join(f"{row[c]:.6g}" for c in COLUMNS) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Task templates: what each (category, difficulty) asks, as data.
+
+data/task_templates.json declares per category an answer format and, per
+level, either a formula template:
+
+    params       name -> distribution, drawn as arrays in declared order:
+                 {"int": [low, high], "times": k}, {"choice": [...]},
+                 {"word": "<vocabulary>", "distinct_from": "<param>"}
+                 or a constant
+    let          name -> expression over earlier names (optional)
+    answer       expression
+    distractors  expressions; may use `answer`
+    question     text with {name} fields
+    hint         text with {name} fields
+
+or a sequence-recall template ({"kind": "sequence", "length": n, ...}) for
+memory-style categories. Expressions are arithmetic only (+ - * / // %,
+parentheses, numbers, names), checked when the file is loaded. Every
+expression and text is compiled once into a function, so rendering a batch
+is a few vectorized NumPy operations plus one string build per question.
+Adding a category means adding an entry to the data file (at the end: its
+position is the category's code in the answer-event log); the app's menu,
+the agent and the event log all take their categories from the registry.
+SWASTHMANAS_TEMPLATES_FILE=path serves another data file.
+"""
+import ast
+import json
+import keyword
+import os
+import string
+from functools import lru_cache
+
+import numpy as np
+
+TEMPLATES_FILE = (os.environ.get("SWASTHMANAS_TEMPLATES_FILE")
+                  or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "task_templates.json"))
+
+# Every category must define all the levels the agent moves between (rl_agent.DIFFICULTIES)
+LEVELS = (1, 2, 3, 4, 5)
+
+ORDINALS = {1: "1st", 2: "2nd", 3: "3rd", 4: "4th", 5: "5th", 6: "6th", 7: "7th", 8: "8th", 9: "9th"}
+
+_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.USub, ast.UAdd)
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def check_expression(source, names, where):
+    """
+    Validates an arithmetic expression over `names` and returns it as
+    normalized source. Anything but arithmetic raises TemplateError.
+    """
+    try:
+        tree = ast.parse(str(source), mode="eval")
+    except SyntaxError as exc:
+        raise TemplateError(f"{where}: invalid expression {source!r}: {exc.msg}") from None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if node.id not in names:
+                raise TemplateError(f"{where}: unknown name {node.id!r} in {source!r}")
+        elif isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float):
+                raise TemplateError(f"{where}: only numbers are allowed, got {node.value!r}")
+        elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Load) + _OPERATORS):
+            raise TemplateError(f"{where}: {type(node).__name__} is not allowed in {source!r}")
+    return ast.unparse(tree)
+
+
+def compile_text(text, names, where):
+    """
+    Compiles "{name}" text into (fields, function): the function takes one
+    value per field and builds the string as an f-string would.
+    """
+    parts = []
+    fields = []
+    for literal, field, spec, conversion in string.Formatter().parse(text):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field not in names or spec or conversion:
+            raise TemplateError(f"{where}: unknown or formatted field {{{field}}} in {text!r}")
+        if field not in fields:
+            fields.append(field)
+        parts.append("{" + field + "}")
+    if not fields:
+        return (), lambda: text
+    source = f"lambda {', '.join(fields)}: f{''.join(parts)!r}"
+    return tuple(fields), eval(compile(source, f"<{where}>", "eval"), {"__builtins__": {}})
+
+
+def render_texts(compiled, columns, n):
+    fields, build = compiled
+    if not fields:
+        return [build()] * n
+    return list(map(build, *(columns[field] for field in fields)))
+
+
+def _column(value, n):
+    # Expressions over constants only give a scalar
+    return value if isinstance(value, np.ndarray) else np.full(n, value)
+
+
+class FormulaTemplate:
+    """
+    A level of a formula category; `render` draws `n` tasks at once.
+    """
+
+    def __init__(self, spec, vocabularies, where):
+        self.params = []  # (name, kind, argument, extra)
+        names = set()     # Usable in texts
+        numbers = set()   # Usable in expressions (words are not)
+        words = {}        # Word parameter -> its vocabulary
+        for name, dist in spec.get("params", {}).items():
+            if not name.isidentifier() or keyword.iskeyword(name) or name == "answer":
+                raise TemplateError(f"{where}: bad parameter name {name!r}")
+            self.params.append((name,) + self._distribution(dist, vocabularies, words, f"{where}.{name}"))
+            if self.params[-1][1] == "word":
+                words[name] = dist["word"]
+            names.add(name)
+            if not isinstance(self.params[-1][2], (str, np.ndarray)):  # Not a word or text
+                numbers.add(name)
+
+        # 1. Checked expressions, in evaluation order
+        lines = []
+        for name, source in spec.get("let", {}).items():
+            if not name.isidentifier() or keyword.iskeyword(name) or name in names or name == "answer":
+                raise TemplateError(f"{where}: bad name {name!r} in let")
+            lines.append(f"{name} = {check_expression(source, numbers, f'{where}.let.{name}')}")
+            names.add(name)
+            numbers.add(name)
+        lines.append(f"answer = {check_expression(spec['answer'], numbers, f'{where}.answer')}")
+        names.add("answer")
+        numbers.add("answer")
+        distractors = spec.get("distractors", [])
+        if not 1 <= len(distractors) <= 3:
+            raise TemplateError(f"{where}: needs 1-3 distractors, got {len(distractors)}")
+        distractors = [check_expression(d, numbers, f"{where}.distractors") for d in distractors]
+
+        self.question = compile_text(spec["question"], names, f"{where}.question")
+        self.hint = compile_text(spec.get("hint", ""), names, f"{where}.hint")
+        # Only values that appear in a text are converted to Python lists
+        used = dict.fromkeys(self.question[0] + self.hint[0])
+        self.text_fields = [name for name in used if name in numbers]
+        self.text_constants = [(name, argument) for name, kind, argument, _ in self.params
+                               if name in used and kind == "constant" and name not in numbers]
+
+        # 2. One function computing everything from the drawn numbers
+        self.inputs = [name for name, kind, _, _ in self.params if name in numbers]
+        source = (f"def formula({', '.join(self.inputs)}):\n"
+                  + "".join(f"    {line}\n" for line in lines)
+                  + f"    return answer, ({''.join(d + ', ' for d in distractors)}), "
+                  + f"({''.join(f + ', ' for f in self.text_fields)})\n")
+        namespace = {}
+        exec(compile(source, f"<{where}>", "exec"), {"__builtins__": {}}, namespace)
+        self.formula = namespace["formula"]
+
+    @staticmethod
+    def _distribution(dist, vocabularies, earlier_words, where):
+        if isinstance(dist, (int, float, str)):
+            return ("constant", dist, None)
+        if "int" in dist:
+            low, high = dist["int"]
+            return ("int", (int(low), int(high) + 1), dist.get("times", 1))
+        if "choice" in dist:
+            return ("choice", list(dist["choice"]), None)
+        if "word" in dist:
+            words = vocabularies.get(dist["word"])
+            if words is None:
+                raise TemplateError(f"{where}: unknown vocabulary {dist['word']!r}")
+            other = dist.get("distinct_from")
+            if other is not None and earlier_words.get(other) != dist["word"]:
+                raise TemplateError(f"{where}: distinct_from {other!r} is not an earlier word of {dist['word']!r}")
+            return ("word", np.array(words, dtype=object), other)
+        raise TemplateError(f"{where}: unknown distribution {dist!r}")
+
+    def render(self, n, rng):
+        """
+        Returns (memorize_contents, questions, answers[n], options[n, k], hints);
+        options[:, 0] is the answer.
+        """
+        values = {}   # For expressions: arrays, or scalars for constants
+        columns = {}  # For texts: one Python value per task
+        for name, kind, argument, extra in self.params:
+            if kind == "constant":
+                values[name] = argument
+            elif kind == "int":
+                values[name] = rng.integers(*argument, n) * extra
+            elif kind == "choice":
+                values[name] = rng.choice(argument, n)
+            else:
+                if extra is None:
+                    index = rng.integers(0, len(argument), n)
+                else:  # Offset from the other word, so the two always differ
+                    index = (values[extra + "#"] + rng.integers(1, len(argument), n)) % len(argument)
+                values[name + "#"] = index
+                columns[name] = argument[index].tolist()
+
+        answer, distractors, fields = self.formula(*[values[name] for name in self.inputs])
+        answer = _column(answer, n)
+        options = np.stack([answer] + [_column(d, n) for d in distractors], axis=1)
+        for name, value in zip(self.text_fields, fields):
+            columns[name] = value.tolist() if isinstance(value, np.ndarray) else [value] * n
+        for name, value in self.text_constants:
+            columns[name] = [value] * n
+        return ([None] * n, render_texts(self.question, columns, n), answer, options,
+                render_texts(self.hint, columns, n))
+
+
+class SequenceTemplate:
+    """
+    Sequence recall: memorize `length` digits, then name the one at a position.
+    """
+
+    def __init__(self, spec, where):
+        self.length = int(spec["length"])
+        if not 1 <= self.length <= len(ORDINALS):
+            raise TemplateError(f"{where}: length must be 1-{len(ORDINALS)}")
+        fields, build = compile_text(spec["question"], {"position"}, f"{where}.question")
+        # One question per position, rendered up front
+        self.questions = [build(*[ORDINALS[i + 1]] * len(fields)) for i in range(self.length)]
+        self.hint = compile_text(spec.get("hint", ""), set(), f"{where}.hint")[1]()
+
+    def render(self, n, rng):
+        rows = np.arange(n)
+        digits = rng.integers(0, 10, (n, self.length))
+        idx = rng.integers(0, self.length, n)
+        answers = digits[rows, idx]
+
+        # Three distinct wrong digits per task: random sort keys, answer pushed last
+        keys = rng.random((n, 10))
+        keys[rows, answers] = 2.0
+        distractors = keys.argsort(axis=1)[:, :3]
+        options = np.concatenate([answers[:, None], distractors], axis=1)
+
+        contents = [" - ".join(map(str, row)) for row in digits.tolist()]
+        questions = [self.questions[i] for i in idx.tolist()]
+        return contents, questions, answers, options, [self.hint] * n
+
+
+class TemplateRegistry:
+    """
+    Compiled templates keyed by (category, difficulty), plus per-category
+    `titles`, `icons` (a static/icons.svg sprite name) and `formats` (the
+    answer format, e.g. "₹{}").
+    """
+
+    def __init__(self, spec):
+        self.templates = {}
+        self.titles = {}
+        self.icons = {}
+        self.formats = {}
+        vocabularies = spec.get("vocabularies", {})
+        for category, category_spec in spec["categories"].items():
+            self.titles[category] = category_spec.get("title", category.title())
+            self.icons[category] = category_spec.get("icon", "logo")
+            answer_format = category_spec.get("answer_format", "{}")
+            self.formats[category] = str if answer_format == "{}" else answer_format.format
+            defaults = category_spec.get("defaults", {})
+            levels = {int(level): dict(defaults, **level_spec)
+                      for level, level_spec in category_spec["levels"].items()}
+            missing = set(LEVELS) - set(levels)
+            if missing:
+                raise TemplateError(f"{category}: levels {sorted(missing)} are not defined")
+            for level, level_spec in levels.items():
+                where = f"{category}.{level}"
+                if level_spec.get("kind", "formula") == "sequence":
+                    self.templates[(category, level)] = SequenceTemplate(level_spec, where)
+                else:
+                    self.templates[(category, level)] = FormulaTemplate(level_spec, vocabularies, where)
+
+    def categories(self):
+        return list(self.titles)
+
+    def template(self, category, difficulty):
+        template = self.templates.get((category, difficulty))
+        if template is None:
+            raise ValueError(f"Unknown {category} difficulty: {difficulty}")
+        return template
+
+
+def load_registry(path=None):
+    """
+    The registry compiled from `path` (default TEMPLATES_FILE), once per file.
+    """
+    return _load_registry(path or TEMPLATES_FILE)
+
+
+@lru_cache(maxsize=None)
+def _load_registry(path):
+    with open(path, encoding="utf-8") as f:
+        return TemplateRegistry(json.load(f))
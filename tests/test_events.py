@@ -0,0 +1,85 @@
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+import events
+from events import AnswerEventLog, EventBuffer, user_key
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def append(buffer, user):
+    return buffer.append(user, "math", 3, "Average", 1, 10.0, True, 12.5, False, timestamp=0.0)
+
+
+def test_uuid_hex_is_stored_as_is():
+    uid = uuid.uuid4().hex
+    buffer = EventBuffer()
+    append(buffer, uid)
+    assert buffer["user"][0] == uid.encode("ascii")
+
+
+def test_other_ids_get_a_fixed_width_digest():
+    buffer = EventBuffer()
+    long_a, long_b = "x" * 32 + "-a", "x" * 32 + "-b"  # Equal in their first 32 bytes
+    for user in ("bücher", long_a, long_b):
+        append(buffer, user)
+    users = buffer["user"].tolist()
+    assert len(set(users)) == 3
+    assert all(len(user) == 32 for user in users)
+    assert users == [user_key("bücher"), user_key(long_a), user_key(long_b)]
+    np.testing.assert_array_equal(buffer["duration_ms"], [12500] * 3)
+
+
+def test_categories_outside_the_registry_are_rejected():
+    buffer = EventBuffer()
+    assert append(buffer, "u")[2] == 0  # Position of "math" in the registry
+    with pytest.raises(ValueError):
+        buffer.append("u", "chess", 3, "Average", 1, 10.0, True, 12.5, False)
+    assert len(buffer) == 1
+
+
+def test_app_replaces_invalid_uid(tmp_path, monkeypatch):
+    from streamlit.testing.v1 import AppTest
+
+    monkeypatch.chdir(tmp_path)  # The app's databases
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.query_params["uid"] = "ünïcode-" + "x" * 40
+    at.run()
+    assert not at.exception
+    uid = at.session_state["user_id"]
+    assert len(uid) == 32 and int(uid, 16) >= 0
+    assert at.query_params["uid"] == uid
+
+
+def segment(timestamp):
+    buffer = EventBuffer()
+    buffer.append(uuid.uuid4().hex, "math", 3, "Average", 1, 10.0, True, 12.5, False, timestamp=timestamp)
+    return {name: buffer[name] for name in buffer.columns}
+
+
+def test_segment_names_never_go_backwards(monkeypatch):
+    clock = iter([3_000, 2_000, 2_000, 1_000])
+    monkeypatch.setattr(events.time, "time_ns", lambda: next(clock))
+    names = [AnswerEventLog._next_name() for _ in range(4)]
+    assert names == sorted(names) and len(set(names)) == 4
+
+
+def test_compacted_segment_keeps_write_order(tmp_path, monkeypatch):
+    log = AnswerEventLog(str(tmp_path), flush_interval=0.01)
+    try:
+        log._write_segment(segment(1.0))
+        log._write_segment(segment(2.0))
+        listed = AnswerEventLog.segments(str(tmp_path))
+        late = log._write_segment(segment(3.0))  # Another process, while the compaction runs
+        monkeypatch.setattr(AnswerEventLog, "segments", staticmethod(lambda directory: listed))
+        log.compact()
+        monkeypatch.undo()
+        log._write_segment(segment(4.0))
+    finally:
+        log.close()
+    segments = AnswerEventLog.segments(str(tmp_path))
+    assert len(segments) == 3 and segments[1] == late
+    assert AnswerEventLog.read(str(tmp_path), ("timestamp",))["timestamp"].tolist() == [1.0, 2.0, 3.0, 4.0]
@@ -0,0 +1,117 @@
+import math
+import os
+import subprocess
+import sys
+
+import numpy as np
+from hypothesis import given, settings, strategies as st
+
+from performance import (TIER_LABELS, calculate_accuracies, calculate_accuracy, compute_reward,
+                         compute_rewards, generate_session_report, generate_session_reports,
+                         get_performance_tier, get_performance_tiers)
+
+
+@st.composite
+def attempts(draw, max_total=10**6):
+    # Multiples of 2000 questions are where round(x, 1) and NumPy rounding part ways
+    totals = st.integers(0, max_total)
+    if max_total >= 2000:
+        totals |= st.integers(1, max_total // 2000).map(lambda k: 2000 * k)
+    total = draw(totals)
+    return draw(st.integers(0, total)), total
+
+
+@st.composite
+def sessions(draw):
+    """
+    Per-session rows (correct, total, avg_time_sec, difficulty).
+    """
+    correct, total = draw(attempts(max_total=50))
+    avg_time = draw(st.one_of(st.floats(-60, 600), st.integers(0, 120).map(float), st.just(math.nan)))
+    return correct, total, avg_time, draw(st.integers(1, 5))
+
+
+@st.composite
+def answer_frames(draw):
+    """
+    Per-answer rows as events.py columns would hold them; each (user,
+    session) is played at one level, as the app does within a session.
+    """
+    # NumPy str arrays drop trailing NULs, so ids are drawn without them
+    names = st.text(st.characters(exclude_characters="\x00"), min_size=1, max_size=8)
+    users = draw(st.lists(names, min_size=1, max_size=4, unique=True))
+    rows = draw(st.lists(st.tuples(st.sampled_from(users), st.integers(0, 5), st.booleans(),
+                                   st.floats(0.1, 300)), min_size=1, max_size=200))
+    levels = {}
+    for user, session, _, _ in rows:
+        levels.setdefault((user, session), draw(st.integers(1, 5)))
+    return rows, levels
+
+
+def same(a, b):
+    return a == b or (isinstance(a, float) and math.isnan(a) and math.isnan(b))
+
+
+def test_import_has_no_side_effects():
+    # Scoring must not pull in the agent, its persistence or metrics' exporter
+    code = "import sys, performance; print(sorted({'rl_agent', 'metrics', 'persistence'} & set(sys.modules)))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root)
+    assert out.stdout.strip() == "[]"
+
+
+def test_accuracy_rounding_ties():
+    # Every pair up to 200 questions, and 2000 and 4000: up to 5000 the only
+    # totals whose .x5 ties NumPy and round() round differently
+    pairs = [(c, t) for t in list(range(201)) + [2000, 4000] for c in range(t + 1)]
+    correct, total = np.array(pairs).T
+    assert calculate_accuracies(correct, total).tolist() == [calculate_accuracy(c, t) for c, t in pairs]
+
+
+@given(st.lists(attempts(), min_size=1, max_size=100))
+def test_calculate_accuracies(pairs):
+    correct, total = np.array(pairs).T
+    assert calculate_accuracies(correct, total).tolist() == [calculate_accuracy(c, t) for c, t in pairs]
+
+
+@given(st.lists(st.one_of(st.floats(allow_nan=True, allow_infinity=True),
+                          st.sampled_from([59.9, 60.0, 60.1, 84.9, 85.0, 85.1])), min_size=1, max_size=100))
+def test_get_performance_tiers(accuracy):
+    got = TIER_LABELS[get_performance_tiers(np.array(accuracy))].tolist()
+    assert got == [get_performance_tier(a) for a in accuracy]
+
+
+@given(st.lists(sessions(), min_size=1, max_size=100))
+def test_compute_rewards(rows):
+    correct, total, avg_time, difficulty = (np.array(column) for column in zip(*rows))
+    assert compute_rewards(correct, total, avg_time, difficulty).tolist() == [compute_reward(*row) for row in rows]
+
+
+@settings(max_examples=200)
+@given(answer_frames())
+def test_generate_session_reports(frame):
+    rows, levels = frame
+    users, session_ids, answers, times = (np.array(column) for column in zip(*rows))
+    level = np.array([levels[(user, session)] for user, session, _, _ in rows])
+    reports = generate_session_reports(users, session_ids, answers, times, level)
+
+    groups = {}
+    for user, session, correct, time_sec in rows:
+        groups.setdefault((user, session), []).append((correct, time_sec))
+    keys = list(zip(reports["user"].tolist(), reports["session"].tolist()))
+    assert keys == sorted(groups)
+    for i, key in enumerate(keys):
+        answered = groups[key]
+        hits = sum(correct for correct, _ in answered)
+        avg_time = sum(time_sec for _, time_sec in answered) / len(answered)
+        want = generate_session_report(hits, len(answered), avg_time, levels[key])
+        got = {
+            "total_questions": int(reports["total_questions"][i]),
+            "correct_answers": int(reports["correct_answers"][i]),
+            "accuracy_percent": float(reports["accuracy_percent"][i]),
+            "performance_tier": TIER_LABELS[reports["performance_tier"][i]],
+            "average_time": f"{float(reports['average_time'][i])}s",
+            "difficulty_level": float(reports["difficulty_level"][i]),
+            "total_score": int(reports["total_score"][i]),
+        }
+        assert all(same(want[field], got[field]) for field in want), (key, want, got)
@@ -0,0 +1,92 @@
+import threading
+
+import numpy as np
+
+from persistence import QTableJournal
+from rl_agent import DIFFICULTIES, AdaptiveDifficultyAgent
+from snapshot import Snapshot
+
+LAYOUT = {"difficulties": list(DIFFICULTIES), "actions": [-1, 0, 1]}
+
+
+def learn_some(agent, n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    tiers = ["Needs Practice", "Average", "Good Job", "Excellent"]
+    for _ in range(n):
+        state = (str(rng.choice(["math", "memory"])), int(rng.integers(1, 6)), str(rng.choice(tiers)))
+        next_state = (state[0], int(rng.integers(1, 6)), str(rng.choice(tiers)))
+        agent.learn(state, int(rng.choice([-1, 0, 1])), float(rng.normal(5, 3)), next_state)
+
+
+def test_journal_replay_keeps_last_update(tmp_path):
+    filename = str(tmp_path / "q.qtab")
+    journal = QTableJournal(filename, flush_interval=0.01, layout=LAYOUT)
+    try:
+        journal.record_update(("math", 1, "Average"), 0, 1.0, [1.0, 2.0, 3.0])
+        journal.record_update(("math", 2, "Average"), 1, 1.0, [4.0, 5.0, 6.0])
+        journal.record_update(("math", 1, "Average"), 2, 1.0, [1.0, 2.0, 9.0])
+        assert journal.flush(timeout=5)
+    finally:
+        journal.close()
+    assert QTableJournal.replay(filename) == {("math", 1, "Average"): [1.0, 2.0, 9.0],
+                                              ("math", 2, "Average"): [4.0, 5.0, 6.0]}
+
+
+def test_journal_replay_skips_torn_line(tmp_path):
+    filename = str(tmp_path / "q.qtab")
+    Snapshot.from_table({("math", 1, "Average"): [1.0, 2.0, 3.0]}, **LAYOUT).write(filename)
+    with open(tmp_path / "q.journal", "w") as f:
+        f.write('["math", 2, "Average", [4.0, 5.0, 6.0]]\n["math", 1, "Aver')
+    assert QTableJournal.replay(filename) == {("math", 1, "Average"): [1.0, 2.0, 3.0],
+                                              ("math", 2, "Average"): [4.0, 5.0, 6.0]}
+
+
+def test_journal_compaction_preserves_table(tmp_path):
+    filename = str(tmp_path / "q.qtab")
+    journal = QTableJournal(filename, flush_interval=0.01, batch_size=4, compact_every=10, layout=LAYOUT)
+    expected = {}
+    try:
+        for i in range(25):
+            state = ("memory", i % 5 + 1, "Good Job")
+            expected[state] = [float(i), float(i + 1), float(i + 2)]
+            journal.record_update(state, 0, 1.0, expected[state])
+        assert journal.flush(timeout=5)
+    finally:
+        journal.close()
+    assert (tmp_path / "q.qtab").exists()
+    assert sum(1 for _ in open(tmp_path / "q.journal")) < 10
+    assert QTableJournal.replay(filename) == expected
+
+
+def test_existing_journal_is_counted_on_the_writer_thread(tmp_path, monkeypatch):
+    filename = str(tmp_path / "q.qtab")
+    with open(tmp_path / "q.journal", "w") as f:
+        f.writelines(f'["math", {i % 5 + 1}, "Average", [{i}.0, 0.0, 0.0]]\n' for i in range(9))
+    counted_on = []
+    count_lines = QTableJournal._count_lines
+    monkeypatch.setattr(QTableJournal, "_count_lines",
+                        staticmethod(lambda path: counted_on.append(threading.current_thread()) or count_lines(path)))
+    journal = QTableJournal(filename, flush_interval=0.01, compact_every=10, layout=LAYOUT)
+    try:
+        assert counted_on == []
+        journal.record_update(("memory", 1, "Average"), 0, 1.0, [1.0, 2.0, 3.0])
+        assert journal.flush(timeout=5)
+    finally:
+        journal.close()
+    assert counted_on == [journal._thread]
+    assert (tmp_path / "q.qtab").exists() and (tmp_path / "q.journal").stat().st_size == 0  # 9 + 1 compacts
+    assert QTableJournal.replay(filename)[("memory", 1, "Average")] == [1.0, 2.0, 3.0]
+
+
+def test_agent_round_trip_through_snapshot_and_journal(tmp_path):
+    filename = str(tmp_path / "q_table.qtab")
+    agent = AdaptiveDifficultyAgent(seed=1)
+    agent.filename = filename
+    learn_some(agent, 100, seed=1)
+    agent.save_agent()            # Snapshot
+    learn_some(agent, 100, seed=2)  # ...then journal only
+    assert agent.store.flush(timeout=5)
+
+    restored = AdaptiveDifficultyAgent()
+    restored.load_agent(filename)
+    np.testing.assert_array_equal(restored.q_values, agent.q_values)
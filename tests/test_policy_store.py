@@ -0,0 +1,85 @@
+import threading
+
+import numpy as np
+
+from policy_store import SharedPolicyStore
+from rl_agent import AdaptiveDifficultyAgent
+
+STATE = ("math", 3, "Average")
+
+
+def open_store(path, **kwargs):
+    return SharedPolicyStore(str(path), refresh_interval=0.05, flush_interval=0.01, **kwargs)
+
+
+def test_deltas_start_from_base_and_add_up(tmp_path):
+    store = open_store(tmp_path / "q.db")
+    try:
+        store.record_update(STATE, 1, 0.5, [-1.0, 5.5, 2.0])   # base 5.0
+        store.record_update(STATE, 1, 0.25, [-1.0, 5.75, 2.0])
+        store.record_update(STATE, 2, -1.0, [-1.0, 5.75, 1.0])  # base 2.0
+        assert store.flush(timeout=5)
+        _, view = store.view()
+    finally:
+        store.close()
+    assert view == {STATE: {1: 5.75, 2: 1.0}}
+
+
+def test_concurrent_stores_never_lose_deltas(tmp_path):
+    # Two stores on one file stand in for two processes
+    stores = [open_store(tmp_path / "q.db") for _ in range(2)]
+
+    def learner(store, delta, n):
+        for _ in range(n):
+            store.record_update(STATE, 0, delta, [7.0 + delta, 0.0, 0.0])  # base 7.0
+
+    threads = [threading.Thread(target=learner, args=(stores[0], 1.0, 500)),
+               threading.Thread(target=learner, args=(stores[1], 2.0, 250)),
+               threading.Thread(target=learner, args=(stores[1], 0.5, 200))]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for store in stores:
+            assert store.flush(timeout=10)
+    finally:
+        for store in stores:
+            store.close()
+
+    reopened = open_store(tmp_path / "q.db")
+    try:
+        _, view = reopened.view()
+    finally:
+        reopened.close()
+    assert view[STATE][0] == 7.0 + 500 * 1.0 + 250 * 2.0 + 200 * 0.5
+
+
+def test_agents_share_learned_values(tmp_path):
+    store = open_store(tmp_path / "q.db")
+    try:
+        teacher = AdaptiveDifficultyAgent()
+        teacher.attach_store(store)
+        for reward in (10.0, -3.0, 4.0, 8.0):
+            teacher.learn(STATE, 1, reward, ("math", 4, "Good Job"))
+        assert store.flush(timeout=5)
+
+        student = AdaptiveDifficultyAgent()
+        student.attach_store(store)
+        np.testing.assert_allclose(student.get_q_values(STATE), teacher.get_q_values(STATE))
+    finally:
+        store.close()
+
+
+def test_reopened_store_keeps_table(tmp_path):
+    store = open_store(tmp_path / "q.db")
+    try:
+        store.record_update(STATE, 2, 3.0, [0.0, 1.0, 13.0])
+        assert store.flush(timeout=5)
+    finally:
+        store.close()
+    reopened = open_store(tmp_path / "q.db")
+    try:
+        assert reopened.view()[1] == {STATE: {2: 13.0}}
+    finally:
+        reopened.close()
@@ -0,0 +1,35 @@
+import numpy as np
+
+from replay import ReplayBuffer, ReplayTrainer
+from rl_agent import AdaptiveDifficultyAgent
+
+
+def test_samples_follow_the_agents_current_codes():
+    agent = AdaptiveDifficultyAgent(autosave=False, seed=0)
+    buffer = ReplayBuffer(capacity=8)
+    transitions = [(("math", 3, "Average"), 1, 10.0, ("math", 4, "Good Job")),
+                   (("memory", 5, "Excellent"), -1, -2.0, ("puzzles", 4, "Needs Practice"))]
+    for transition in transitions:
+        buffer.add(*transition)
+
+    # A new tier renumbers every code after the buffer was filled
+    agent.encode_state("math", 1, "Outstanding")
+    states, actions, rewards, next_states = buffer.sample(64, agent, np.random.default_rng(0))
+    sampled = {(agent.decode_state(s), int(a), float(r), agent.decode_state(n))
+               for s, a, r, n in zip(states, actions, rewards, next_states)}
+    assert sampled == set(transitions)
+    assert "puzzles" in agent.categories
+
+
+def test_trainer_updates_the_answered_state():
+    agent = AdaptiveDifficultyAgent(autosave=False, seed=0)
+    trainer = ReplayTrainer(agent, minibatch=4, replay_ratio=4, train_interval=None, seed=0)
+    try:
+        trainer._write_batch([(("math", 2, "Average"), 1, 10.0, ("math", 3, "Average"))])
+        before = agent.get_q_values(("math", 2, "Average")).copy()
+        agent.encode_state("memory", 1, "Outstanding")
+        assert trainer.train() == 1
+    finally:
+        trainer.close()
+    after = agent.get_q_values(("math", 2, "Average"))
+    assert after[2] > before[2] and np.array_equal(after[:2], before[:2])
@@ -0,0 +1,35 @@
+import pytest
+
+from seen import SeenFilter, SeenStore
+
+
+def test_round_trip():
+    seen = SeenFilter(bits=1024, hashes=3)
+    seen.add("math:2:12 + 7")
+    loaded = SeenFilter.from_bytes(seen.to_bytes())
+    assert "math:2:12 + 7" in loaded
+    assert (loaded.bits, loaded.hashes) == (1024, 3)
+
+
+@pytest.mark.parametrize("size", [0, 1, 4, 5, 6, 5 + 127])
+def test_truncated_bytes_are_rejected(size):
+    raw = SeenFilter(bits=1024, hashes=3).to_bytes()
+    with pytest.raises(ValueError):
+        SeenFilter.from_bytes(raw[:size])
+
+
+def test_corrupt_header_is_rejected():
+    with pytest.raises(ValueError):
+        SeenFilter.from_bytes((0).to_bytes(4, "little") + b"\x03")
+
+
+@pytest.mark.parametrize("content", [b"", b"\x00\x04", b"\x00\x04\x00\x00\x07" + b"\x00" * 10])
+def test_store_loads_a_fresh_filter_from_a_damaged_file(tmp_path, content):
+    store = SeenStore(str(tmp_path))
+    try:
+        with open(store._path("ana"), "wb") as f:
+            f.write(content)
+        seen = store.load("ana")
+    finally:
+        store.close()
+    assert seen.bits > 0 and "anything" not in seen
@@ -0,0 +1,110 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from policy_store import SharedPolicyStore
+from rl_agent import DIFFICULTIES, AdaptiveDifficultyAgent
+from snapshot import Snapshot, SnapshotError, read_legacy_pickle, read_table
+
+
+def baseline_q_table():
+    """
+    The dict the pre-snapshot agent pickled: instinct lists of floats, with
+    learned entries replaced by the numpy.float64 its Bellman update produced.
+    """
+    q_table = {("math", 3, "Excellent"): [0.0, 1.0, 10.0], ("math", 4, "Average"): [-1.0, 5.0, 2.0],
+               ("memory", 1, "Needs Practice"): [10.0, 1.0, -5.0]}
+    current_q = q_table[("math", 3, "Excellent")][2]
+    q_table[("math", 3, "Excellent")][2] = current_q + 0.5 * (10.0 + 0.8 * np.max(q_table[("math", 4, "Average")]) - current_q)
+    assert isinstance(q_table[("math", 3, "Excellent")][2], np.float64)
+    return q_table
+
+
+def write_baseline_pickle(path, numpy_module=None):
+    # What the baseline rl_agent.save_agent did: pickle.dump(self.q_table, f)
+    if numpy_module is None:
+        data = pickle.dumps(baseline_q_table())
+    else:
+        # Name the scalar's module the way another numpy version would have;
+        # protocol 3 (Python < 3.8's default) spells globals as text lines
+        data = pickle.dumps(baseline_q_table(), protocol=3)
+        data = data.replace(b"cnumpy._core.multiarray\n", b"c" + numpy_module.encode("ascii") + b"\n")
+    path.write_bytes(data)
+
+
+def test_snapshot_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(2, len(DIFFICULTIES), 4, 3))
+    values[1, 2, 3] = np.nan
+    snapshot = Snapshot(values, ["math", "memory"], DIFFICULTIES, ["a", "b", "c", "d"], [-1, 0, 1],
+                        {"alpha": 0.5})
+    snapshot.write(tmp_path / "t.qtab")
+
+    loaded = Snapshot.read(tmp_path / "t.qtab")
+    np.testing.assert_array_equal(np.asarray(loaded.values), values)
+    assert (loaded.categories, loaded.difficulties, loaded.tiers, loaded.actions) == (
+        ["math", "memory"], list(DIFFICULTIES), ["a", "b", "c", "d"], [-1, 0, 1])
+    assert loaded.hyperparameters == {"alpha": 0.5}
+    assert loaded.complete is False
+    assert ("memory", 3, "d") not in loaded.to_table()
+    assert read_table(tmp_path / "t.qtab") == snapshot.to_table()
+
+
+def test_snapshot_from_table_round_trip(tmp_path):
+    table = {("math", 2, "Good Job"): [1.0, 2.0, 3.0], ("memory", 5, "Average"): [-4.0, 0.5, 0.25]}
+    Snapshot.from_table(table, difficulties=DIFFICULTIES, actions=[-1, 0, 1]).write(tmp_path / "t.qtab")
+    assert read_table(tmp_path / "t.qtab") == table
+
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "t.qtab"
+    Snapshot.from_table({("math", 1, "Average"): [1.0, 2.0, 3.0]}).write(path)
+    path.write_bytes(path.read_bytes()[:-8])
+    with pytest.raises(SnapshotError):
+        Snapshot.read(path)
+
+
+@pytest.mark.parametrize("numpy_module", [None, "numpy.core.multiarray"])  # numpy 2.x, 1.x
+def test_legacy_pickle_with_numpy_scalars(tmp_path, numpy_module):
+    path = tmp_path / "q_table.pkl"
+    write_baseline_pickle(path, numpy_module)
+    if numpy_module is not None:
+        assert numpy_module.encode("ascii") in path.read_bytes()
+    table = read_legacy_pickle(path)
+    assert table == {state: [float(q) for q in values] for state, values in baseline_q_table().items()}
+    assert all(type(q) is float for values in table.values() for q in values)
+
+
+def test_agent_migrates_baseline_pickle(tmp_path):
+    write_baseline_pickle(tmp_path / "q_table.pkl")
+    agent = AdaptiveDifficultyAgent()
+    agent.load_agent(str(tmp_path / "q_table.qtab"))
+
+    for state, values in baseline_q_table().items():
+        assert agent.get_q_values(state).tolist() == [float(q) for q in values]
+    assert (tmp_path / "q_table.qtab").exists()
+    reloaded = AdaptiveDifficultyAgent()
+    reloaded.load_agent(str(tmp_path / "q_table.qtab"))
+    np.testing.assert_array_equal(reloaded.q_values, agent.q_values)
+
+
+def test_policy_store_seeds_from_baseline_pickle(tmp_path):
+    write_baseline_pickle(tmp_path / "q_table.pkl")
+    store = SharedPolicyStore(str(tmp_path / "q_table.db"), seed_from=str(tmp_path / "q_table.qtab"))
+    try:
+        _, view = store.view()
+        assert view == {state: dict(enumerate(float(q) for q in values))
+                        for state, values in baseline_q_table().items()}
+    finally:
+        store.close()
+
+
+def test_legacy_pickle_refuses_code(tmp_path):
+    class Exploit:
+        def __reduce__(self):
+            return (print, ("unpickled code ran",))
+
+    (tmp_path / "q_table.pkl").write_bytes(pickle.dumps({("math", 1, "Average"): Exploit()}))
+    with pytest.raises(SnapshotError, match="refusing to unpickle"):
+        read_legacy_pickle(tmp_path / "q_table.pkl")
@@ -0,0 +1,69 @@
+import json
+import os
+
+import numpy as np
+
+import templates
+from events import AnswerEventLog
+from seen import SeenStore
+from tasks import CognitiveTaskGenerator
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+PUZZLES = {
+    "title": "Puzzles",
+    "defaults": {
+        "params": {"a": {"int": [1, 9]}, "b": {"int": [1, 9]}},
+        "answer": "a + b",
+        "distractors": ["answer + 1", "answer + 2", "answer + 3"],
+        "question": "What is {a} + {b}?",
+        "hint": "Count on from {a}.",
+    },
+    "levels": {str(level): {} for level in templates.LEVELS},
+}
+
+
+def add_category(tmp_path, monkeypatch):
+    with open(templates.TEMPLATES_FILE, encoding="utf-8") as f:
+        spec = json.load(f)
+    spec["categories"]["puzzles"] = PUZZLES
+    path = tmp_path / "task_templates.json"
+    path.write_text(json.dumps(spec), encoding="utf-8")
+    monkeypatch.setattr(templates, "TEMPLATES_FILE", str(path))
+
+
+def test_registry_from_another_file(tmp_path, monkeypatch):
+    add_category(tmp_path, monkeypatch)
+    registry = templates.load_registry()
+    assert registry.categories() == ["math", "memory", "puzzles"]
+    assert registry.icons["puzzles"] == "logo" and registry.icons["math"] == "calculator"
+    task = CognitiveTaskGenerator(seed=0, registry=registry).generate_task("puzzles", 2)
+    a, b = map(int, task["question"][len("What is "):-1].split(" + "))
+    assert task["correct_answer"] == str(a + b)
+
+
+def test_app_plays_a_category_added_to_the_data_file(tmp_path, monkeypatch):
+    from streamlit.testing.v1 import AppTest
+
+    add_category(tmp_path, monkeypatch)
+    monkeypatch.chdir(tmp_path)  # The app's databases
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    assert [radio.label for radio in at.radio] == ["Math Comfort", "Memory Comfort", "Puzzles Comfort"]
+    at.radio[2].set_value("Not sure")
+    at.button[0].click().run()  # Create plan
+    assert at.session_state["user_levels"] == {"math": 5, "memory": 5, "puzzles": 3}
+
+    next(button for button in at.button if button.label == "Puzzles").click().run()
+    for _ in range(5):
+        assert not at.exception, at.exception
+        assert at.session_state["current_task"]["category"] == "puzzles"
+        next(button for button in at.button if button.key == "o0").click().run()
+        next(button for button in at.button if button.label.startswith("Next")).click().run()
+    assert not at.exception, at.exception
+    assert at.session_state["page"] == "score"
+
+    # Both write relative to the app's directory, so finish before leaving it
+    assert SeenStore.for_file("seen").flush(timeout=10)
+    assert AnswerEventLog.for_file("events").flush(timeout=10)
+    categories = AnswerEventLog.read(str(tmp_path / "events"), ("category",))["category"]
+    np.testing.assert_array_equal(categories, [2] * 5)
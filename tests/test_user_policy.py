@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from rl_agent import AdaptiveDifficultyAgent
+from user_policy import UserPolicyStore
+
+STATE = ("math", 3, "Average")
+NEXT_STATE = ("math", 4, "Good Job")
+
+
+def open_store(path, base, **kwargs):
+    return UserPolicyStore(str(path), base, checkpoint_interval=60, flush_interval=0.01, **kwargs)
+
+
+def test_user_table_round_trip(tmp_path):
+    base = AdaptiveDifficultyAgent(autosave=False)
+    store = open_store(tmp_path / "u.db", base, capacity=1)
+    try:
+        store.learn("ana", STATE, 1, 10.0, NEXT_STATE)
+        store.learn("raj", ("memory", 2, "Excellent"), -1, -4.0, ("memory", 1, "Average"))  # Evicts ana
+        learned = {"ana": store.q_values("ana", STATE), "raj": store.q_values("raj", ("memory", 2, "Excellent"))}
+    finally:
+        store.close()
+
+    store = open_store(tmp_path / "u.db", base)
+    try:
+        np.testing.assert_array_equal(store.q_values("ana", STATE), learned["ana"])
+        np.testing.assert_array_equal(store.q_values("raj", ("memory", 2, "Excellent")), learned["raj"])
+        np.testing.assert_array_equal(store.q_values("ana", NEXT_STATE), base.get_q_values(NEXT_STATE))
+        assert store.users() == 2
+    finally:
+        store.close()
+
+
+def test_new_category_and_tier_keep_stored_tables(tmp_path):
+    store = open_store(tmp_path / "u.db", AdaptiveDifficultyAgent(autosave=False))
+    try:
+        store.learn("ana", STATE, 1, 10.0, NEXT_STATE)
+        learned = store.q_values("ana", STATE)
+    finally:
+        store.close()
+
+    # A template-registry category and a new tier renumber the agent's state codes
+    grown = AdaptiveDifficultyAgent(autosave=False, categories=("math", "memory", "attention"),
+                                    tiers=("Needs Practice", "Average", "Good Job", "Excellent", "Outstanding"))
+    store = open_store(tmp_path / "u.db", grown)
+    try:
+        np.testing.assert_array_equal(store.q_values("ana", STATE), learned)
+        store.learn("ana", ("attention", 1, "Outstanding"), 0, 3.0, ("attention", 1, "Outstanding"))
+        grown.get_q_values(("speed", 1, "Average"))  # ...and one more at runtime
+        np.testing.assert_array_equal(store.q_values("ana", STATE), learned)
+    finally:
+        store.close()
+
+    store = open_store(tmp_path / "u.db", AdaptiveDifficultyAgent(autosave=False))
+    try:
+        np.testing.assert_array_equal(store.q_values("ana", STATE), learned)
+        assert store.q_values("ana", ("attention", 1, "Outstanding"))[1] != store.base.instinct("Outstanding")[1]
+    finally:
+        store.close()
+
+
+def test_migrates_rows_keyed_by_state_code(tmp_path):
+    # A file from before states were numbered: rows keyed by the agent's codes
+    base = AdaptiveDifficultyAgent(autosave=False)
+    conn = sqlite3.connect(tmp_path / "u.db")
+    conn.execute("CREATE TABLE user_q (user TEXT PRIMARY KEY, codes BLOB NOT NULL, q BLOB NOT NULL) WITHOUT ROWID")
+    conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    conn.execute("INSERT INTO meta VALUES ('encoding', ?)", (json.dumps(
+        {"categories": base.categories, "tiers": base.tiers, "actions": base.actions}),))
+    states = [STATE, ("memory", 5, "Excellent")]
+    codes = np.array([base.encode_state(*state) for state in states], dtype=np.int32)
+    q = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    conn.execute("INSERT INTO user_q VALUES ('ana', ?, ?)", (codes.tobytes(), q.tobytes()))
+    conn.commit()
+    conn.close()
+
+    grown = AdaptiveDifficultyAgent(autosave=False, tiers=("Needs Practice", "Average", "Good Job", "Excellent", "New"))
+    store = open_store(tmp_path / "u.db", grown)
+    try:
+        for state, row in zip(states, q):
+            np.testing.assert_array_equal(store.q_values("ana", state), row)
+    finally:
+        store.close()
+
+
+def test_other_actions_are_rejected(tmp_path):
+    open_store(tmp_path / "u.db", AdaptiveDifficultyAgent(autosave=False)).close()
+    base = AdaptiveDifficultyAgent(autosave=False)
+    base.actions = [-2, 0, 2]
+    with pytest.raises(ValueError, match="actions"):
+        open_store(tmp_path / "u.db", base)
+
+
+def test_states_numbered_by_another_store(tmp_path):
+    # Two stores on one file stand in for two processes
+    base = AdaptiveDifficultyAgent(autosave=False)
+    reader = open_store(tmp_path / "u.db", base)
+    writer = open_store(tmp_path / "u.db", base)
+    try:
+        writer.learn("ana", ("memory", 4, "Excellent"), 1, 8.0, ("memory", 5, "Excellent"))
+        writer.checkpoint()
+        np.testing.assert_array_equal(reader.q_values("ana", ("memory", 4, "Excellent")),
+                                      writer.q_values("ana", ("memory", 4, "Excellent")))
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_metrics_cover_the_policy_stores(tmp_path):
+    # Metrics are switched on at import time, so this runs in a fresh process
+    code = f"""
+import metrics
+from policy_store import SharedPolicyStore
+from rl_agent import AdaptiveDifficultyAgent
+from user_policy import UserPolicyStore
+
+base = AdaptiveDifficultyAgent(autosave=False)
+base.attach_store(SharedPolicyStore({str(tmp_path / "p.db")!r}, flush_interval=0.01))
+store = UserPolicyStore({str(tmp_path / "u.db")!r}, base, flush_interval=0.01)
+store.choose_action("ana", *{STATE!r})
+store.learn("ana", {STATE!r}, 1, 10.0, {NEXT_STATE!r})
+base.store.record_update({STATE!r}, 2, 1.0, base.get_q_values({STATE!r}))
+print(store.stats()["rows"])
+store.close()
+base.store.close()
+print(metrics.REGISTRY.render())
+"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, SWASTHMANAS_METRICS_FILE=str(tmp_path / "metrics.prom"))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=root, env=env).stdout
+    assert out.split("\n")[0] == "1"
+    for series in ("agent_choose_seconds_count 1", "agent_learn_seconds_count 1",
+                   'policy_store_write_seconds_count{store="policy"} 1',
+                   'policy_store_write_seconds_count{store="user_policy"} 1',
+                   'persistence_bytes_written_total{store="policy"}',
+                   'persistence_bytes_written_total{store="user_policy"}'):
+        assert "swasthmanas_" + series in out
@@ -1,24 +1,162 @@
+import json
+import math
+import os
 import random
+import re
+from functools import lru_cache
+
+import numpy as np
+
+STRATEGIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "strategies.json")
+
+# Distinct queries remembered per process (questions differ only in numbers, so few are distinct)
+QUERY_CACHE_SIZE = 4096
+
+STOPWORDS = frozenset("a an and are at do does for how if in is it of on the this to what which with you your".split())
+
+
+def tokenize(text):
+    return [word for word in re.findall(r"[a-z]+", text.lower()) if word not in STOPWORDS]
+
+
+def error_pattern(task, user_answer):
+    """
+    Names the likely mistake behind a wrong answer, e.g. ('off_by_10',) when the
+    chosen option was the answer plus 10, or ('stopped_early',) when it was the
+    intermediate result of a two-step question. Returns a tuple of tags.
+    Tasks are told apart by their shape (a sequence to memorize, or amounts),
+    not their category, so categories added to the template file work too.
+    """
+    if task.get('memorize_content'):
+        digits = task['memorize_content'].split(" - ")
+        return ("wrong_position",) if str(user_answer) in digits else ("not_in_sequence",)
+
+    try:
+        chosen = int(str(user_answer).lstrip("₹"))
+        correct = int(str(task['correct_answer']).lstrip("₹"))
+    except ValueError:
+        return ()
+    amounts = [int(a) for a in re.findall(r"₹(\d+)", task['question'])]
+    difference = abs(chosen - correct)
+    level = task['difficulty']
+
+    tags = []
+    if difference in (5, 10, 20, 50, 100):
+        tags.append(f"off_by_{difference}")
+    if level == 3 and amounts and difference == amounts[0]:
+        tags.append("miscounted_quantity")  # One pack too many or too few
+    if level in (4, 5) and amounts and chosen == amounts[-1] - correct:
+        tags.append("stopped_early")        # The total / discounted price, not what is left
+    return tuple(tags)
+
+
+class StrategyIndex:
+    """
+    BM25 index over the strategy corpus, built once per process.
+
+    Each strategy is indexed by the words of its text plus `level:N` and
+    `error:<tag>` terms from its metadata. The inverted index maps a term to
+    NumPy arrays of (strategy ids, precomputed BM25 weights), so scoring a
+    query is one vector add per query term. Results are cached per query.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, strategies):
+        self.strategies = strategies
+        self.texts = [s["text"] for s in strategies]
+        categories = np.array([s.get("category", "any") for s in strategies])
+        self.allowed = {c: np.flatnonzero((categories == c) | (categories == "any")) for c in set(categories.tolist())}
+        self.fallback = self.allowed.get("any", np.zeros(0, dtype=np.intp))
+
+        # 1. Term frequencies per strategy
+        documents = [self._terms(s) for s in strategies]
+        lengths = np.array([len(d) for d in documents], dtype=np.float64)
+        avg_length = lengths.mean() if len(lengths) else 1.0
+        postings = {}
+        for doc_id, terms in enumerate(documents):
+            for term in terms:
+                counts = postings.setdefault(term, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        # 2. BM25 weight of every (term, strategy) pair
+        n = len(documents)
+        self.index = {}
+        for term, counts in postings.items():
+            ids = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[ids] / avg_length)
+            self.index[term] = (ids, idf * tf * (self.k1 + 1) / (tf + norm))
+
+        self.search = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._search)
+
+    @staticmethod
+    def _terms(strategy):
+        return (tokenize(strategy["text"])
+                + [f"level:{level}" for level in strategy.get("levels", ())]
+                + [f"error:{error}" for error in strategy.get("errors", ())])
+
+    @staticmethod
+    def query_terms(task, errors=()):
+        # Sorted and de-duplicated, so equivalent queries share a cache entry
+        terms = set(tokenize(task['question']))
+        terms.add(f"level:{task['difficulty']}")
+        terms.update(f"error:{error}" for error in errors)
+        return tuple(sorted(terms))
+
+    def _search(self, category, terms, k=3):
+        """
+        Returns the ids of up to `k` best strategies for `category` (those within
+        half the top score); every strategy of the category if nothing matched.
+        """
+        candidates = self.allowed.get(category, self.fallback)
+        if len(candidates) == 0:
+            return ()
+        scores = np.zeros(len(self.strategies))
+        for term in terms:
+            posting = self.index.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+
+        candidate_scores = scores[candidates]
+        best = candidate_scores.max()
+        if best <= 0:
+            return tuple(candidates.tolist())
+        top = np.argpartition(-candidate_scores, k - 1)[:k] if len(candidates) > k else np.arange(len(candidates))
+        top = top[np.argsort(-candidate_scores[top], kind="stable")]
+        top = top[candidate_scores[top] >= 0.5 * best]
+        return tuple(candidates[top].tolist())
+
+
+@lru_cache(maxsize=None)
+def load_index(path=STRATEGIES_FILE):
+    with open(path, encoding="utf-8") as f:
+        return StrategyIndex(json.load(f))
+
 
 class CognitiveTutor:
     """
     RAG-Lite system for intelligent feedback.
+
+    Wrong answers are classified into an error pattern (`error_pattern`) and a
+    strategy is retrieved from data/strategies.json by the question's words,
+    its level and that pattern.
     """
-    
-    def __init__(self):
-        self.strategy_db = {
-            "math": [
-                "**Chunking:** Break large numbers into smaller parts (e.g., 15+8 -> 15+5+3).",
-                "**Estimation:** Round numbers first to guess the ballpark answer.",
-                "**Visualization:** Imagine physical objects like coins or apples.",
-                "**Money Method:** Think of numbers as currency (quarters, dollars)."
-            ],
-            "memory": [
-                "**Story Method:** Create a quick funny story connecting the items.",
-                "**Grouping:** Remember numbers in chunks (e.g., 25-14 instead of 2-5-1-4).",
-                "**Visualization:** Close your eyes and create a mental image of the list."
-            ]
-        }
+
+    def __init__(self, strategies_file=STRATEGIES_FILE):
+        self.index = load_index(strategies_file)
+
+    def retrieve(self, task, user_answer):
+        """
+        Returns the strategy tip for a wrong answer, picked among the best matches.
+        """
+        terms = StrategyIndex.query_terms(task, error_pattern(task, user_answer))
+        matches = self.index.search(task['category'], terms)
+        if not matches:
+            return "Take a deep breath and try again."
+        return self.index.texts[random.choice(matches)]
 
     def generate_feedback(self, task, user_answer, is_correct):
         """
@@ -32,22 +170,19 @@ class CognitiveTutor:
                 "Great work! That was quick and accurate."
             ])
             return msg, None  # No tip needed for correct answers
-        
-        category = task['category']
+
         correct_ans = task['correct_answer']
-        
+
         # 1. Retrieve the Strategy (The Tip)
-        strategy = random.choice(self.strategy_db.get(category, ["Take a deep breath and try again."]))
-        
+        strategy = self.retrieve(task, user_answer)
+
         # 2. Generate the Explanation
         explanation = ""
-        if category == "math":
-            explanation = f"The answer was **{correct_ans}**."
-        elif category == "memory":
-             explanation = f"The missing item was **{correct_ans}**."
+        if task.get('memorize_content'):
+            explanation = f"The missing item was **{correct_ans}**."
         else:
-             explanation = f"The correct answer was **{correct_ans}**."
+            explanation = f"The answer was **{correct_ans}**."
 
         feedback_msg = f"**Not quite.** {explanation}"
-        
-        return feedback_msg, strategy
\ No newline at end of file
+
+        return feedback_msg, strategy
@@ -0,0 +1,356 @@
+"""
+Per-user Q-tables on top of the global policy.
+
+Every user starts out on the global (cohort) agent's Q-values and only owns
+the rows they have learned on: the first update to a state copies the global
+row into the user's table (copy-on-write), and every other state keeps
+reading the live global row. Tables of recently active users sit in an LRU
+of `capacity` entries; the rest live in a SQLite file, one row per user, so
+registered users cost disk, not RAM. States are numbered on disk by the file
+itself, not by the agent's state codes, so adding a category or tier to the
+agent leaves stored tables valid.
+"""
+import json
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+from persistence import WriteBehindWriter
+from rl_agent import DIFFICULTIES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_q (
+    user  TEXT PRIMARY KEY,
+    codes BLOB NOT NULL,   -- int32 ids from `states`
+    q     BLOB NOT NULL    -- float64 [len(codes), n_actions]
+) WITHOUT ROWID
+"""
+STATES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS states (
+    id         INTEGER PRIMARY KEY,  -- Never renumbered
+    category   TEXT    NOT NULL,
+    difficulty INTEGER NOT NULL,
+    tier       TEXT    NOT NULL,
+    UNIQUE (category, difficulty, tier)
+)
+"""
+META_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+
+
+class UserTable:
+    """
+    The rows one user owns, {(category, difficulty, tier): float64[n_actions]}. `version` counts
+    updates, so a checkpoint can tell whether the table changed while it was
+    being written.
+    """
+
+    __slots__ = ("rows", "version", "saved_version")
+
+    def __init__(self, rows=None):
+        self.rows = rows or {}
+        self.version = 0
+        self.saved_version = 0
+
+    @property
+    def dirty(self):
+        return self.version != self.saved_version
+
+    def to_blobs(self, state_ids):
+        codes = np.array([state_ids[state] for state in self.rows], dtype=np.int32)
+        return codes.tobytes(), np.array(list(self.rows.values()), dtype=np.float64).tobytes()
+
+    @classmethod
+    def from_blobs(cls, codes, q, n_actions, states):
+        """
+        Raises KeyError for an id missing from `states` ({id: state}).
+        """
+        states = [states[code] for code in np.frombuffer(codes, dtype=np.int32).tolist()]
+        q = np.frombuffer(q, dtype=np.float64).reshape(-1, n_actions).copy()
+        return cls(dict(zip(states, q)))
+
+
+class UserPolicyStore(WriteBehindWriter):
+    """
+    Keyed, disk-backed per-user policies with an LRU of active users.
+
+    `base` is the global AdaptiveDifficultyAgent; its state encoding, actions,
+    alpha, gamma and epsilon are used for every user. With `blend` < 1 a
+    user's own rows are mixed with the global ones (`blend` * user +
+    (1 - blend) * global), so sparse personal data leans on the cohort.
+
+    Evicting a dirty table hands it to the writer thread; a table evicted
+    and requested again before that write lands is taken back from the
+    queue, never re-read stale from disk. Dirty tables still in the cache
+    are checkpointed every `checkpoint_interval` seconds. Several processes
+    may share the file, but a user should be served by one process at a
+    time (the last write of a user's table wins).
+    """
+
+    def __init__(self, filename, base, capacity=10_000, blend=1.0, checkpoint_interval=5.0,
+                 flush_interval=1.0, batch_size=256, timeout=30.0):
+        self.filename = filename
+        self.base = base
+        self.capacity = capacity
+        self.blend = blend
+        self.timeout = timeout
+        self.n_actions = len(base.actions)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cached_rows = 0        # Rows owned by the tables in _cache
+        self._cache = OrderedDict()  # user -> UserTable, least recently used first
+        self._evicted = {}           # user -> dirty UserTable queued for writing
+        self._state_ids = {}         # state -> id in the `states` table
+        self._states = {}            # id -> state
+        self._lock = threading.Lock()
+        self._read_conn = self._connect(check_same_thread=False)  # Used under _lock
+        self._open(self._read_conn)
+        self._conn = None  # Owned by the writer thread
+        super().__init__(flush_interval, batch_size, tick_interval=checkpoint_interval)
+
+    def _connect(self, check_same_thread=True):
+        conn = sqlite3.connect(self.filename, timeout=self.timeout, isolation_level=None,
+                               check_same_thread=check_same_thread)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(SCHEMA)
+        conn.execute(STATES_SCHEMA)
+        conn.execute(META_SCHEMA)
+        return conn
+
+    def _open(self, conn):
+        # Q-value columns follow the actions, which cannot be remapped
+        actions = json.dumps(self.base.actions)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            encoding = conn.execute("SELECT value FROM meta WHERE key = 'encoding'").fetchone()
+            if encoding is not None:
+                self._migrate_codes(conn, json.loads(encoding[0]))
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('actions', ?)", (actions,))
+            stored = conn.execute("SELECT value FROM meta WHERE key = 'actions'").fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if stored != actions:
+            raise ValueError(f"{self.filename} was written for actions {stored}, the base agent uses {actions}")
+        self._use_state_ids(self._number_states(conn, []))
+
+    def _migrate_codes(self, conn, encoding):
+        """
+        Renumbers a file whose rows were keyed by the base agent's state codes
+        (valid only for the categories and tiers in `encoding`).
+        """
+        if encoding["actions"] != self.base.actions:
+            raise ValueError(f"{self.filename} was written for actions {encoding['actions']}, "
+                             f"the base agent uses {self.base.actions}")
+        categories, tiers = encoding["categories"], encoding["tiers"]
+
+        def decode(code):
+            rest, tier_idx = divmod(code, len(tiers))
+            category_idx, level_idx = divmod(rest, len(DIFFICULTIES))
+            return (categories[category_idx], DIFFICULTIES[level_idx], tiers[tier_idx])
+
+        tables = {user: [decode(code) for code in np.frombuffer(codes, dtype=np.int32).tolist()]
+                  for user, codes in conn.execute("SELECT user, codes FROM user_q")}
+        state_ids = self._number_states(conn, sorted({state for states in tables.values() for state in states}))
+        conn.executemany("UPDATE user_q SET codes = ? WHERE user = ?",
+                         [(np.array([state_ids[state] for state in states], dtype=np.int32).tobytes(), user)
+                          for user, states in tables.items()])
+        conn.execute("DELETE FROM meta WHERE key = 'encoding'")
+
+    @staticmethod
+    def _number_states(conn, states):
+        """
+        Gives ids to the `states` that have none yet and returns {state: id}
+        for every numbered state. Ids are never reused or renumbered.
+        """
+        conn.executemany("INSERT OR IGNORE INTO states (category, difficulty, tier) VALUES (?, ?, ?)", states)
+        return {(category, difficulty, tier): state_id for state_id, category, difficulty, tier
+                in conn.execute("SELECT id, category, difficulty, tier FROM states")}
+
+    def _use_state_ids(self, state_ids):
+        # Caller holds _lock (or is __init__)
+        self._state_ids = state_ids
+        self._states = {state_id: state for state, state_id in state_ids.items()}
+
+    # ---------------------------------------------------------
+    # Request path
+    # ---------------------------------------------------------
+    def _table(self, user):
+        # Caller holds _lock
+        table = self._cache.get(user)
+        if table is not None:
+            self._cache.move_to_end(user)
+            self.hits += 1
+            return table
+
+        self.misses += 1
+        table = self._evicted.pop(user, None)  # Still dirty; requeued if evicted again
+        if table is None:
+            row = self._read_conn.execute("SELECT codes, q FROM user_q WHERE user = ?", (user,)).fetchone()
+            if row is None:
+                table = UserTable()
+            else:
+                try:
+                    table = UserTable.from_blobs(*row, self.n_actions, self._states)
+                except KeyError:  # A state another process numbered since we last looked
+                    self._use_state_ids(self._number_states(self._read_conn, []))
+                    table = UserTable.from_blobs(*row, self.n_actions, self._states)
+        self._cache[user] = table
+        self._cached_rows += len(table.rows)
+        if len(self._cache) > self.capacity:
+            self._evict()
+        return table
+
+    def _evict(self):
+        user, table = self._cache.popitem(last=False)
+        self._cached_rows -= len(table.rows)
+        self.evictions += 1
+        if table.dirty:
+            self._evicted[user] = table
+            self.record(user)
+
+    def _q_values(self, table, state):
+        own = table.rows.get(state)
+        shared = self.base.get_q_values(state)
+        if own is None:
+            return shared
+        if self.blend >= 1.0:
+            return own
+        return self.blend * own + (1.0 - self.blend) * shared
+
+    def q_values(self, user, state):
+        """
+        The Q-values `user` acts on in `state` (a copy).
+        """
+        state = _state_key(state)
+        with self._lock:
+            return np.array(self._q_values(self._table(user), state))
+
+    @metrics.timed("agent_choose_seconds")
+    def choose_action(self, user, category, difficulty, tier):
+        self.base.refresh()
+        q_values = self.q_values(user, (category, difficulty, tier))
+        if random.uniform(0, 1) < self.base.epsilon:
+            return random.choice(self.base.actions)
+        return self.base.actions[int(q_values.argmax())]
+
+    @metrics.timed("agent_learn_seconds")
+    def learn(self, user, state, action, reward, next_state):
+        """
+        Bellman update of the user's own copy of `state`.
+        """
+        action_idx = self.base.actions.index(action)
+        state = _state_key(state)
+        next_state = _state_key(next_state)
+        with self._lock:
+            table = self._table(user)
+            max_next_q = self._q_values(table, next_state).max()
+            q_values = table.rows.get(state)
+            if q_values is None:
+                q_values = table.rows[state] = self.base.get_q_values(state).copy()  # Copy on write
+                if self._cache.get(user) is table:
+                    self._cached_rows += 1
+            current_q = q_values[action_idx]
+            q_values[action_idx] = current_q + self.base.alpha * (reward + self.base.gamma * max_next_q - current_q)
+            table.version += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"cached": len(self._cache), "rows": self._cached_rows,
+                    "bytes": self._cached_rows * self.n_actions * 8, "queued": len(self._evicted), "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def users(self):
+        """
+        Number of users with a table on disk.
+        """
+        with self._lock:
+            return self._read_conn.execute("SELECT COUNT(*) FROM user_q").fetchone()[0]
+
+    # ---------------------------------------------------------
+    # Writer thread
+    # ---------------------------------------------------------
+    def checkpoint(self):
+        """
+        Writes every dirty table now and waits for it.
+        """
+        with self._lock:
+            dirty = [user for user, table in self._cache.items() if table.dirty]
+        for user in dirty:
+            self.record(user)
+        self.flush()
+
+    def close(self):
+        if not self._closed:
+            self.checkpoint()  # Dirty tables still in the cache
+        super().close()
+
+    def _write_batch(self, batch):
+        with self._lock:
+            tables = {user: self._evicted.get(user) or self._cache.get(user) for user in set(batch)}
+        self._save({user: table for user, table in tables.items() if table is not None and table.dirty})
+        with self._lock:
+            for user, table in tables.items():
+                if self._evicted.get(user) is table and not table.dirty:
+                    del self._evicted[user]
+
+    def _tick(self):
+        with self._lock:
+            tables = {user: table for user, table in self._cache.items() if table.dirty}
+        self._save(tables)
+
+    def _save(self, tables):
+        if not tables:
+            return
+        conn = self._thread_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 1. Number states first seen since the last save, then serialise
+            #    under the lock, so no update is half-copied
+            while True:
+                with self._lock:
+                    unnumbered = {state for table in tables.values() for state in table.rows} - self._state_ids.keys()
+                    if not unnumbered:
+                        rows = [(user, *table.to_blobs(self._state_ids)) for user, table in tables.items()]
+                        versions = {user: table.version for user, table in tables.items()}
+                        break
+                state_ids = self._number_states(conn, sorted(unnumbered))
+                with self._lock:
+                    self._use_state_ids(state_ids)
+
+            # 2. Write outside it; requests only wait on the lock for cache hits
+            with metrics.track("policy_store_write_seconds", store="user_policy"):
+                conn.executemany("INSERT OR REPLACE INTO user_q VALUES (?, ?, ?)", rows)
+                conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            with self._lock:  # Forget ids the rollback took back
+                self._use_state_ids(self._number_states(conn, []))
+            raise
+
+        metrics.inc("persistence_bytes_written_total", sum(len(user.encode()) + len(codes) + len(q)
+                                                           for user, codes, q in rows), store="user_policy")
+
+        # 3. Clean unless updated meanwhile
+        with self._lock:
+            for user, table in tables.items():
+                table.saved_version = max(table.saved_version, versions[user])
+
+    def _thread_conn(self):
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+
+def _state_key(state):
+    # Plain Python values, so states from NumPy code key and store the same
+    category, difficulty, tier = state
+    return (category, int(difficulty), tier)